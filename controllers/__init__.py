@@ -1,3 +1,8 @@
 from .data_controller import DataController
 from .project_controller import ProjectController
-from .process_controller import ProcessController
\ No newline at end of file
+from .process_controller import ProcessController
+from .search_controller import SearchController
+from .snapshot_controller import SnapshotController
+from .rag_controller import RAGController
+from .conversation_controller import ConversationController
+from .summary_controller import SummaryController
@@ -9,6 +9,7 @@ class BaseController:
         self.app_settings = get_settings()
         self.base_dir = os.path.dirname((os.path.dirname(__file__)))
         self.file_dir = os.path.join(self.base_dir, "assets/files")
+        self.index_dir = os.path.join(self.base_dir, "assets/indexes")
 
     def generate_random_string(self, length: int=12):
         return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+from .base_controller import BaseController
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationController(BaseController):
+    """
+    Bounded conversation memory on top of `ConversationModel`.
+
+    The last `recent_turns` exchanges (user + assistant message) are kept
+    verbatim; older ones are folded into a rolling summary of at most
+    `summary_token_budget` tokens by the generation LLM. Summarising runs in
+    the background after a response, and only once `recent_turns // 2`
+    exchanges have overflowed, so it neither delays answers nor costs an LLM
+    call per turn. The prompt history therefore stays bounded however long
+    the conversation gets.
+    """
+
+    SUMMARY_PROMPT = (
+        "Update the running summary of a conversation with the new messages below. "
+        "Keep facts, names, decisions and open questions; drop small talk. "
+        "Answer with the updated summary only.\n\n"
+        "Current summary:\n{summary}\n\n"
+        "New messages:\n{transcript}"
+    )
+    SUMMARY_PREFIX = "Summary of our conversation so far:\n"
+    SUMMARY_ACKNOWLEDGEMENT = "Understood."
+
+    # Conversations being summarised, by (project id, conversation id), shared by every controller of the process
+    _summarising: dict[tuple[str, str], asyncio.Task] = {}
+
+    def __init__(self, conversation_model, summarizer_llm, recent_turns: int = None, summary_token_budget: int = None):
+        super().__init__()
+
+        self.conversation_model = conversation_model
+        self.summarizer_llm = summarizer_llm
+        self.recent_turns = recent_turns or self.app_settings.CONVERSATION_RECENT_TURNS
+        self.summary_token_budget = summary_token_budget or self.app_settings.CONVERSATION_SUMMARY_TOKENS
+
+    @property
+    def recent_messages(self) -> int:
+        return self.recent_turns * 2
+
+    @property
+    def summarize_threshold(self) -> int:
+        return self.recent_messages + 2 * max(1, self.recent_turns // 2)
+
+    async def load_history(self, conversation_id: str, project_id: str) -> list[dict]:
+        """
+        Build the prompt history of a conversation with one query.
+
+        The summary is sent as a user message acknowledged by the assistant,
+        which every driver accepts (some drop `system` messages from history).
+
+        :param conversation_id: The conversation id chosen by the client.
+        :param project_id: The project the conversation belongs to.
+        :return: Messages with `role` and `content`, oldest first.
+        """
+        conversation = await self.conversation_model.get_conversation(conversation_id, project_id)
+        if conversation is None:
+            return []
+
+        messages = []
+        if conversation.get("summary"):
+            messages.append({"role": "user", "content": self.SUMMARY_PREFIX + conversation["summary"]})
+            messages.append({"role": "assistant", "content": self.SUMMARY_ACKNOWLEDGEMENT})
+        messages.extend(
+            {"role": turn["role"], "content": turn["content"]} for turn in conversation.get("turns", [])
+        )
+        return messages
+
+    async def record_exchange(self, conversation_id: str, project_id: str, user_message: str, assistant_message: str):
+        """
+        Store a question and its answer, summarising older turns in the background when due.
+        """
+        await self.conversation_model.append_turns(
+            conversation_id=conversation_id,
+            project_id=project_id,
+            turns=[
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": assistant_message},
+            ]
+        )
+        key = (project_id, conversation_id)
+        if key not in self._summarising:
+            task = asyncio.create_task(self.summarize_if_due(conversation_id, project_id))
+            self._summarising[key] = task
+            task.add_done_callback(lambda _: self._summarising.pop(key, None))
+
+    def truncate_summary(self, summary: str) -> str:
+        summary = summary.strip()
+        if count_tokens(summary) <= self.summary_token_budget:
+            return summary
+        return summary[:self.summary_token_budget * 4].rsplit(" ", 1)[0]
+
+    async def summarize_if_due(self, conversation_id: str, project_id: str) -> bool:
+        """
+        Fold the turns beyond the recent window into the summary.
+
+        :return: True if a new summary was stored.
+        """
+        try:
+            conversation = await self.conversation_model.get_conversation(conversation_id, project_id)
+            turns = (conversation or {}).get("turns", [])
+            if len(turns) < self.summarize_threshold:
+                return False
+
+            overflow = turns[:len(turns) - self.recent_messages]
+            transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in overflow)
+            response = await self.summarizer_llm.generate_text(
+                user_message=self.SUMMARY_PROMPT.format(
+                    summary=conversation.get("summary") or "(none)",
+                    transcript=transcript
+                ),
+                temperature=0.0,
+                max_output_tokens=self.summary_token_budget
+            )
+            return await self.conversation_model.apply_summary(
+                conversation_id=conversation_id,
+                project_id=project_id,
+                summary=self.truncate_summary(response["text"] or ""),
+                summarized_turn_ids=[turn["turn_id"] for turn in overflow],
+                expected_version=conversation.get("summary_version", 0)
+            )
+        except Exception as e:
+            # The turns stay verbatim and are summarised on a later exchange
+            logger.error(f"Summarising conversation {conversation_id} failed: {e}")
+            return False
@@ -68,7 +68,9 @@ class ProcessController(BaseController):
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=overlap_size,
-            length_function=len
+            length_function=len,
+            # Record where each chunk starts so overlapping neighbours can be trimmed at packing time
+            add_start_index=True
         )
 
         file_content = self.get_file_content(file_name=file_name)
@@ -79,4 +81,9 @@ class ProcessController(BaseController):
             metadatas=fime_meta_data
         )
 
+        # Tag chunks with their file type so search can filter on it
+        file_type = self.get_file_type(file_name=file_name)
+        for chunk in chunks:
+            chunk.metadata["content_type"] = file_type
+
         return chunks
\ No newline at end of file
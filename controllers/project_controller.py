@@ -15,3 +15,10 @@ class ProjectController(BaseController):
 
         return project_dir
 
+    def get_project_index_path(self, project_id: str):
+        index_dir = os.path.join(self.index_dir, project_id)
+
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        return index_dir
@@ -0,0 +1,188 @@
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from .base_controller import BaseController
+from .search_controller import SearchController
+from retrieval import (
+    ContextPacker, PackedContext, SearchMode, build_chunk_windows, context_token_budget, expand_ranked_chunks,
+    make_retrieval_cache_key
+)
+from utils.token_counter import count_tokens
+
+
+@dataclass
+class RAGContext:
+    prompt: str
+    packed: PackedContext
+    scores: dict[str, float]
+    messages: list[dict] = None
+    timings: dict[str, float] = field(default_factory=dict)
+    retrieval_cache_hit: bool = False
+    search_mode: str = None
+
+    def sources(self) -> list[dict]:
+        """The packed sections, numbered as they are cited in the prompt."""
+        return [
+            {
+                "source": number,
+                "file_id": section.file_id,
+                "chunk_ids": section.chunk_ids,
+                "first_order": section.first_order,
+                "last_order": section.last_order,
+                "score": max(self.scores.get(chunk_id, 0.0) for chunk_id in section.chunk_ids),
+            }
+            for number, section in enumerate(self.packed.sections, start=1)
+        ]
+
+
+class RAGController(BaseController):
+    PROMPT_TEMPLATE = (
+        "Answer the question using only the numbered context passages below. "
+        "Cite the passages you use as [n]. If the context does not contain the answer, say so.\n\n"
+        "Context:\n{context}\n\n"
+        "Question: {query}"
+    )
+
+    def __init__(self, project_id: str):
+        super().__init__()
+
+        self.project_id = project_id
+        self.search_controller = SearchController(project_id=project_id)
+        self.context_packer = ContextPacker()
+
+    def build_prompt(self, query: str, packed: PackedContext) -> str:
+        context = ContextPacker.SEPARATOR.join(
+            f"[{number}] {section.content}" for number, section in enumerate(packed.sections, start=1)
+        )
+        return self.PROMPT_TEMPLATE.format(context=context, query=query)
+
+    async def prepare(
+            self,
+            query: str,
+            embed_query: Callable[[str], Awaitable[list[float]]],
+            chunk_model,
+            generation_llm,
+            mode: str = SearchMode.HYBRID.value,
+            top_k: int = 8,
+            candidate_k: int = None,
+            filters: dict = None,
+            neighbours: int = 0,
+            messages: list[dict] = None,
+            max_output_tokens: int = None,
+            retrieval_cache=None,
+            section_k: int = None
+    ) -> RAGContext:
+        """
+        Run the retrieval half of a RAG query: retrieve, fetch and pack.
+
+        Lexical retrieval overlaps the query embedding (see
+        `SearchController.search_concurrently`), the chunk bodies are fetched in
+        one `$in` query without their embeddings, and the context is packed
+        into what is left of the model's context window once the answer, the
+        question and the history are reserved.
+
+        With `neighbours`, each hit is expanded to its ±`neighbours` chunks with
+        one extra range query, so the packer can merge them into whole passages.
+
+        The in-process index is first synced with the project's index version
+        (see `SearchController.sync_index_version`). With a `retrieval_cache`,
+        hits are looked up under the version that index has applied, skipping
+        the embedding and the search; results of an index behind the project's
+        version stay out of the shared tier, so other workers never serve them.
+
+        :param query: The user question.
+        :param embed_query: Coroutine function returning the query embedding.
+        :param chunk_model: A `ChunkModel` bound to the request's database.
+        :param generation_llm: The `LLMBase` driver that will answer, used for its context window.
+        :param mode: The `SearchMode` to use.
+        :param top_k: The number of chunks to retrieve.
+        :param candidate_k: Per-leg candidate count for hybrid search.
+        :param filters: Optional metadata filter.
+        :param neighbours: Number of neighbouring chunks to add on each side of a hit.
+        :param messages: Optional chat history sent with the prompt.
+        :param max_output_tokens: Tokens reserved for the answer (default: the driver's).
+        :param retrieval_cache: Optional `RetrievalCache`.
+        :param section_k: Number of summary index sections to retrieve from, see `SearchController.search_concurrently`.
+        :return: The prompt, the packed context, the retrieval scores, the stage timings in milliseconds
+            and the search mode that ran (None on a retrieval cache hit).
+        """
+        started = time.perf_counter()
+        hits, cache_key, search_mode = None, None, None
+        leg_timings = {"embed_ms": 0.0, "sections_ms": 0.0, "lexical_ms": 0.0, "vector_ms": 0.0}
+        section_k = self.search_controller.resolve_section_k(section_k)
+        index_version, index_current = await self.search_controller.sync_index_version(chunk_model.project_model)
+        if retrieval_cache is not None:
+            cache_key = make_retrieval_cache_key(
+                project_id=self.project_id,
+                query=query,
+                params={
+                    "mode": mode, "top_k": top_k, "candidate_k": candidate_k, "filters": filters, "section_k": section_k
+                },
+                index_version=index_version
+            )
+            hits = await retrieval_cache.get(cache_key)
+        cache_hit = hits is not None
+
+        if not cache_hit:
+            hits, leg_timings, search_mode = await self.search_controller.search_concurrently(
+                query=query,
+                embed_query=embed_query,
+                mode=mode,
+                top_k=top_k,
+                candidate_k=candidate_k,
+                filters=filters,
+                section_k=section_k
+            )
+            if cache_key is not None:
+                await retrieval_cache.put(cache_key, hits, project_id=self.project_id, shared=index_current)
+        retrieve_ms = (time.perf_counter() - started) * 1000.0
+
+        started = time.perf_counter()
+        chunks = await chunk_model.get_chunks_by_ids(
+            self.project_id,
+            [chunk_id for chunk_id, _ in hits],
+            projection={"chunk_embedding": 0}
+        )
+        chunks_by_id = {str(chunk["_id"]): chunk for chunk in chunks}
+        ranked_chunks = [chunks_by_id[chunk_id] for chunk_id, _ in hits if chunk_id in chunks_by_id]
+        if neighbours > 0 and ranked_chunks:
+            window_chunks = await chunk_model.get_chunk_windows(
+                project_id=self.project_id,
+                windows=build_chunk_windows(ranked_chunks, radius=neighbours),
+                projection={"chunk_embedding": 0}
+            )
+            ranked_chunks = expand_ranked_chunks(ranked_chunks, window_chunks, radius=neighbours)
+        fetch_ms = (time.perf_counter() - started) * 1000.0
+
+        started = time.perf_counter()
+        prompt_tokens = count_tokens(
+            self.PROMPT_TEMPLATE.format(context="", query=query)
+            + "".join(str(message.get("content", "")) for message in messages or [])
+        )
+        token_budget = context_token_budget(
+            context_window=generation_llm.get_model_context_window(),
+            reserved_output_tokens=max_output_tokens or generation_llm.max_output_tokens,
+            prompt_tokens=prompt_tokens
+        )
+        packed = self.context_packer.pack(ranked_chunks, token_budget=token_budget)
+        prompt = self.build_prompt(query, packed)
+        pack_ms = (time.perf_counter() - started) * 1000.0
+
+        return RAGContext(
+            prompt=prompt,
+            packed=packed,
+            scores=dict(hits),
+            messages=messages,
+            timings={
+                "embed_ms": leg_timings["embed_ms"],
+                "sections_ms": leg_timings["sections_ms"],
+                "lexical_ms": leg_timings["lexical_ms"],
+                "vector_ms": leg_timings["vector_ms"],
+                "retrieve_ms": retrieve_ms,
+                "fetch_ms": fetch_ms,
+                "pack_ms": pack_ms,
+            },
+            retrieval_cache_hit=cache_hit,
+            search_mode=search_mode
+        )
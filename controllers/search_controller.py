@@ -0,0 +1,344 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .base_controller import BaseController
+from .project_controller import ProjectController
+from llm.llm_enums import EmbeddingInputType
+from retrieval import (
+    Bitmap, MinHasher, ProjectIndex, SearchMode, get_index_saver, get_project_index, get_project_lsh_index,
+    get_project_summary_index, reciprocal_rank_fusion
+)
+from retrieval.project_index import set_project_index
+
+
+class SearchController(BaseController):
+    def __init__(self, project_id: str):
+        super().__init__()
+
+        self.project_id = project_id
+        self.index_path = ProjectController().get_project_index_path(project_id=self.project_id)
+        self.project_index = get_project_index(project_id=self.project_id, index_dir=self.index_path)
+
+    async def embed_chunks(self, embedding_llm, chunks: list[Document]) -> Optional[np.ndarray]:
+        """
+        Embed chunk contents as documents, in provider calls of `EMBEDDING_BATCH_MAX_SIZE` texts.
+
+        :param embedding_llm: The app's embedding `LLMBase`.
+        :param chunks: The chunk documents to embed.
+        :return: A (len(chunks), dim) float32 matrix, row-aligned with `chunks`, or None when there are no chunks.
+        """
+        if not chunks:
+            return None
+        batch_size = self.app_settings.EMBEDDING_BATCH_MAX_SIZE
+        embeddings = []
+        for start in range(0, len(chunks), batch_size):
+            response = await embedding_llm.embed_text(
+                [chunk.page_content for chunk in chunks[start:start + batch_size]],
+                input_type=EmbeddingInputType.DOCUMENT.value
+            )
+            embeddings.extend(response["embeddings"])
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def schedule_save(self):
+        """Persist the project index once the `INDEX_SAVE_DELAY_SECONDS` debounce elapses, off the event loop."""
+        get_index_saver(self.app_settings.INDEX_SAVE_DELAY_SECONDS).schedule(
+            ("index", self.project_id), self.project_index.save
+        )
+
+    async def index_chunks(self, chunk_ids: list[str], file_id: str, chunks: list[Document], vectors=None):
+        """
+        Add freshly inserted chunks to the project's indexes and schedule their persistence.
+
+        Tokenizing and indexing run in a worker thread under the index's write
+        lock, so searches of other projects (and the event loop) keep going.
+
+        :param chunk_ids: MongoDB ids returned by `ChunkModel.insert_chunk`.
+        :param file_id: The file the chunks belong to.
+        :param chunks: The chunk documents, in the same order as `chunk_ids`.
+        :param vectors: Optional embeddings, one per chunk.
+        """
+        await asyncio.to_thread(
+            self.project_index.add_chunks,
+            chunk_ids=chunk_ids,
+            contents=[chunk.page_content for chunk in chunks],
+            metadatas=[{**chunk.metadata, "file_id": file_id} for chunk in chunks],
+            vectors=vectors
+        )
+        self.schedule_save()
+
+    def mark_applied(self, base_version: int, index_version: int, own_bumps: int):
+        """
+        Record that the in-process index now contains every chunk change up to `index_version`.
+
+        Only when the index had applied `base_version`, the version read before
+        this request's writes, and the version moved by exactly this request's
+        own bumps: a change made meanwhile by another worker is not in this
+        index, so it stays behind and `sync_index_version` treats it as stale.
+        """
+        if self.project_index.applied_version == base_version and index_version == base_version + own_bumps:
+            self.project_index.applied_version = index_version
+
+    async def sync_index_version(self, project_model) -> tuple[int, bool]:
+        """
+        Compare the in-process index with the project's current `index_version`.
+
+        Chunks ingested by another worker are only in that worker's index (and,
+        once its debounced save ran, on disk): when the saved index is ahead of
+        this one it is reloaded.
+
+        :return: The version the searched index has applied, and whether it is current.
+        """
+        current_version = await project_model.get_index_version(self.project_id)
+        if self.project_index.applied_version < current_version:
+            saved_version = await asyncio.to_thread(ProjectIndex.read_saved_version, self.index_path)
+            if saved_version > self.project_index.applied_version:
+                self.project_index = await asyncio.to_thread(ProjectIndex.load, self.index_path)
+                set_project_index(project_id=self.project_id, project_index=self.project_index)
+        applied_version = self.project_index.applied_version
+        return applied_version, applied_version >= current_version
+
+    async def rebuild_vector_index(self, chunk_model) -> int:
+        """
+        Rebuild the project's vector index from the packed embeddings stored in MongoDB.
+
+        :param chunk_model: A `ChunkModel` bound to the request's database.
+        :return: The number of vectors loaded.
+        """
+        chunk_ids, vectors = await chunk_model.load_project_vectors(project_id=self.project_id)
+        if not chunk_ids:
+            return 0
+        await asyncio.to_thread(self.project_index.rebuild_vectors, chunk_ids=chunk_ids, vectors=vectors)
+        self.schedule_save()
+        return len(chunk_ids)
+
+    async def remove_chunks(self, chunk_ids: list[str]) -> int:
+        removed = await asyncio.to_thread(self.project_index.remove_chunks, chunk_ids)
+        if removed:
+            self.schedule_save()
+        if await asyncio.to_thread(self._remove_signatures, chunk_ids):
+            self.save_near_duplicates()
+        return removed
+
+    def get_lsh_index(self):
+        return get_project_lsh_index(
+            project_id=self.project_id,
+            index_dir=self.index_path,
+            threshold=self.app_settings.INGEST_DEDUP_THRESHOLD,
+            num_perm=self.app_settings.INGEST_DEDUP_NUM_PERM
+        )
+
+    def _match_near_duplicates(self, chunk_ids: list[str], chunks: list[Document],
+                               replaced_chunk_ids: Optional[set] = None) -> list[Optional[str]]:
+        lsh_index = self.get_lsh_index()
+        signatures = MinHasher(num_perm=lsh_index.num_perm).signatures([chunk.page_content for chunk in chunks])
+
+        duplicate_of = []
+        with lsh_index.lock:
+            for chunk_id, signature in zip(chunk_ids, signatures):
+                match = lsh_index.query(signature, exclude=replaced_chunk_ids)
+                if match is None:
+                    lsh_index.insert(chunk_id, signature)
+                duplicate_of.append(match[0] if match is not None else None)
+        return duplicate_of
+
+    async def find_near_duplicates(self, chunk_ids: list[str], chunks: list[Document],
+                                   replaced_chunk_ids: list[str] = None) -> list[Optional[str]]:
+        """
+        Match new chunks against the project's earlier chunks and each other.
+
+        Chunks without a match are registered in the project's LSH index under
+        their (pre-assigned) id, so later chunks of the same file match them
+        too. Call `save_near_duplicates` once the chunks are stored, or
+        `discard_near_duplicates` if storing them failed. Hashing and matching
+        run in a worker thread.
+
+        :param chunk_ids: The ids the chunks will be stored under.
+        :param chunks: The chunk documents, in file order.
+        :param replaced_chunk_ids: Chunks the new ones replace (a file's previous version), never matched.
+        :return: Per chunk, the id of the chunk it duplicates, or None.
+        """
+        return await asyncio.to_thread(
+            self._match_near_duplicates, chunk_ids, chunks, set(replaced_chunk_ids or [])
+        )
+
+    def _remove_signatures(self, chunk_ids: list[str]) -> int:
+        lsh_index = self.get_lsh_index()
+        with lsh_index.lock:
+            return sum(lsh_index.remove(chunk_id) for chunk_id in chunk_ids)
+
+    def _save_signatures(self):
+        lsh_index = self.get_lsh_index()
+        with lsh_index.lock:
+            lsh_index.save(self.index_path)
+
+    def save_near_duplicates(self):
+        """Schedule persistence of the project's LSH index, debounced like the project index."""
+        get_index_saver(self.app_settings.INDEX_SAVE_DELAY_SECONDS).schedule(
+            ("near_duplicates", self.project_id), self._save_signatures
+        )
+
+    async def discard_near_duplicates(self, chunk_ids: list[str]):
+        await asyncio.to_thread(self._remove_signatures, chunk_ids)
+
+    def get_summary_index(self):
+        return get_project_summary_index(
+            project_id=self.project_id,
+            index_dir=self.index_path,
+            section_size=self.app_settings.SUMMARY_INDEX_SECTION_CHUNKS
+        )
+
+    def resolve_section_k(self, section_k: Optional[int]) -> int:
+        if section_k is not None:
+            return section_k
+        return self.app_settings.SUMMARY_INDEX_SECTION_K if self.app_settings.SUMMARY_INDEX_ENABLED else 0
+
+    def section_mask(self, query: str, query_vector=None, section_k: int = 0) -> Optional[Bitmap]:
+        """
+        Restrict a search to the chunks of the `section_k` sections whose summaries best match the query.
+
+        :return: The allowed chunks, or None (search everything) when the project has no
+            summary index yet or no section matches.
+        """
+        summary_index = self.get_summary_index()
+        if not section_k or not len(summary_index):
+            return None
+        sections = summary_index.select_sections(
+            query,
+            query_vector=query_vector,
+            section_k=section_k,
+            file_k=self.app_settings.SUMMARY_INDEX_FILE_K
+        )
+        if not sections:
+            return None
+        return summary_index.chunk_mask(self.project_index, [section_id for section_id, _ in sections]) or None
+
+    def search(
+            self,
+            query: str,
+            mode: str = SearchMode.HYBRID.value,
+            top_k: int = 10,
+            query_vector: list[float] = None,
+            filters: dict = None,
+            section_k: int = None
+    ) -> list[tuple[str, float]]:
+        return self.project_index.search(
+            query=query,
+            query_vector=query_vector,
+            mode=SearchMode(mode),
+            top_k=top_k,
+            filters=filters,
+            restrict=self.section_mask(query, query_vector, self.resolve_section_k(section_k))
+        )
+
+    def search_batch(
+            self,
+            queries: list[str],
+            mode: str = SearchMode.HYBRID.value,
+            top_k: int = 10,
+            query_vectors=None,
+            candidate_k: int = None,
+            filters: dict = None
+    ) -> list[list[tuple[str, float]]]:
+        return self.project_index.search_batch(
+            queries=queries,
+            query_vectors=query_vectors,
+            mode=SearchMode(mode),
+            top_k=top_k,
+            candidate_k=candidate_k,
+            filters=filters
+        )
+
+    async def search_concurrently(
+            self,
+            query: str,
+            embed_query: Callable[[str], Awaitable[list[float]]],
+            mode: str = SearchMode.HYBRID.value,
+            top_k: int = 10,
+            candidate_k: int = None,
+            filters: dict = None,
+            section_k: int = None
+    ) -> tuple[list[tuple[str, float]], dict, Optional[str]]:
+        """
+        Search with the lexical leg running while the query is being embedded.
+
+        The filter is resolved once and shared by both legs. The lexical leg
+        starts right away in a worker thread; the vector leg embeds the query
+        and then scores it in another thread, so BM25 scoring overlaps the
+        embedding round trip. The vector leg (and its embedding call) is
+        skipped when the project has no vectors, so a hybrid search may run
+        lexical only: the mode that actually ran is returned with the hits.
+
+        With `section_k` (default: `SUMMARY_INDEX_SECTION_K` when the summary
+        index is enabled) both legs only score the chunks of the best matching
+        sections of the summary index. When the summaries are embedded the
+        query is embedded first, since section selection needs the vector.
+
+        :param query: The query text.
+        :param embed_query: Coroutine function returning the query embedding.
+        :param mode: The `SearchMode` to use.
+        :param top_k: The number of results to return.
+        :param candidate_k: Per-leg candidate count for hybrid search (default: 4 * top_k).
+        :param filters: Optional metadata filter, see `MetadataIndex`.
+        :param section_k: Number of summary index sections to search in, 0 to search every chunk.
+        :return: The (chunk id, score) hits, the per-leg timings in milliseconds and
+            the `SearchMode` value that ran (None when no leg ran).
+        """
+        mode = SearchMode(mode)
+        index = self.project_index
+        timings = {"embed_ms": 0.0, "sections_ms": 0.0, "lexical_ms": 0.0, "vector_ms": 0.0}
+
+        restrict, query_vector = None, None
+        section_k = self.resolve_section_k(section_k)
+        summary_index = self.get_summary_index() if section_k else None
+        if summary_index is not None and len(summary_index):
+            if mode != SearchMode.LEXICAL and len(summary_index.sections.vector) > 0:
+                started = time.perf_counter()
+                query_vector = await embed_query(query)
+                timings["embed_ms"] = (time.perf_counter() - started) * 1000.0
+            started = time.perf_counter()
+            restrict = await asyncio.to_thread(self.section_mask, query, query_vector, section_k)
+            timings["sections_ms"] = (time.perf_counter() - started) * 1000.0
+
+        run_lexical = mode != SearchMode.VECTOR
+        run_vector = mode != SearchMode.LEXICAL and len(index.vector) > 0
+        if not run_vector:
+            ran_mode = SearchMode.LEXICAL.value if run_lexical else None
+        else:
+            ran_mode = SearchMode.HYBRID.value if run_lexical else SearchMode.VECTOR.value
+        if ran_mode is None:
+            return [], timings, None
+
+        mask = await asyncio.to_thread(index.resolve_filters, filters, restrict)
+        if mask is not None and not mask:
+            return [], timings, ran_mode
+        leg_k = (candidate_k or top_k * 4) if run_lexical and run_vector else top_k
+
+        async def lexical_leg():
+            if not run_lexical:
+                return None
+            started = time.perf_counter()
+            results = await asyncio.to_thread(index.lexical_search, query, leg_k, mask)
+            timings["lexical_ms"] = (time.perf_counter() - started) * 1000.0
+            return results
+
+        async def vector_leg():
+            if not run_vector:
+                return None
+            vector = query_vector
+            if vector is None:
+                started = time.perf_counter()
+                vector = await embed_query(query)
+                timings["embed_ms"] = (time.perf_counter() - started) * 1000.0
+
+            started = time.perf_counter()
+            results = await asyncio.to_thread(index.vector_search, vector, leg_k, mask)
+            timings["vector_ms"] = (time.perf_counter() - started) * 1000.0
+            return results
+
+        legs = [results for results in await asyncio.gather(lexical_leg(), vector_leg()) if results is not None]
+        results = reciprocal_rank_fusion(legs, top_k=top_k) if len(legs) > 1 else legs[0][:top_k]
+        return index.to_chunk_ids(results), timings, ran_mode
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .base_controller import BaseController
+from .project_controller import ProjectController
+from retrieval import ProjectIndex
+from retrieval.project_index import set_project_index
+from utils.vector_codec import unpack_vector
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotController(BaseController):
+    """
+    Exports a project's chunks to a columnar Arrow snapshot and bootstraps a node's index from it.
+
+    A snapshot directory holds `chunks.arrow` (Arrow IPC file, memory-mappable)
+    and `manifest.json` with the row count, vector dimension, the server-time
+    watermark the export started at and a SHA-256 checksum of the data file.
+    Only searchable chunks are exported: linked near-duplicates
+    (`duplicate_of` in their metadata) stay out of the indexes.
+    """
+
+    SNAPSHOT_FORMAT_VERSION = 2
+    DATA_FILE = "chunks.arrow"
+    MANIFEST_FILE = "manifest.json"
+    # Catch-up re-reads writes this long before the watermark, covering stamps racing the export
+    WATERMARK_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self, project_id: str):
+        super().__init__()
+
+        self.project_id = project_id
+        self.index_path = ProjectController().get_project_index_path(project_id=self.project_id)
+
+    @staticmethod
+    def _file_checksum(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _is_searchable(metadata: dict) -> bool:
+        return "duplicate_of" not in metadata
+
+    async def export_snapshot(self, chunk_model, snapshot_dir: str) -> dict:
+        """
+        Write the project's chunk ids, file ids, orders, contents, metadata and vectors to a snapshot.
+
+        The watermark is the server's clock before the scan starts, so every
+        chunk written (`updated_at`) after it is caught up on import, whatever
+        its id.
+
+        :param chunk_model: A `ChunkModel` bound to the database.
+        :param snapshot_dir: Directory to write the snapshot into.
+        :return: The snapshot manifest.
+        """
+        os.makedirs(snapshot_dir, exist_ok=True)
+        watermark = await chunk_model.get_server_time()
+        total = await chunk_model.count_project_chunks(project_id=self.project_id)
+
+        chunk_ids, file_ids, contents, metadatas = [], [], [], []
+        chunk_orders = np.zeros(total, dtype=np.int32)
+        has_vector = np.zeros(total, dtype=bool)
+        vectors = None
+        row = 0
+
+        async for doc in chunk_model.iter_project_chunks(project_id=self.project_id):
+            if row == total:
+                break
+            metadata = dict(doc["chunk_metadata"])
+            if not self._is_searchable(metadata):
+                continue
+            chunk_ids.append(str(doc["_id"]))
+            file_ids.append(doc["file_id"])
+            contents.append(doc["chunk_content"])
+            metadatas.append(json.dumps(metadata, default=str))
+            chunk_orders[row] = doc["chunk_order"]
+
+            embedding = doc.get("chunk_embedding")
+            if embedding is not None:
+                vector = unpack_vector(embedding)
+                if vectors is None:
+                    vectors = np.zeros((total, vector.shape[0]), dtype=np.float32)
+                vectors[row] = vector
+                has_vector[row] = True
+            row += 1
+
+        dimension = vectors.shape[1] if vectors is not None else 0
+        # Projects without embeddings still get a (zero-filled) width-1 vector column
+        flat_vectors = vectors[:row].reshape(-1) if vectors is not None else np.zeros(row, dtype=np.float32)
+        table = pa.table({
+            "chunk_id": pa.array(chunk_ids, type=pa.string()),
+            "file_id": pa.array(file_ids, type=pa.string()),
+            "chunk_order": pa.array(chunk_orders[:row]),
+            "chunk_content": pa.array(contents, type=pa.large_string()),
+            "chunk_metadata": pa.array(metadatas, type=pa.string()),
+            "has_vector": pa.array(has_vector[:row]),
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(flat_vectors), max(dimension, 1)),
+        })
+
+        data_path = os.path.join(snapshot_dir, self.DATA_FILE)
+        with pa.OSFile(data_path, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        manifest = {
+            "format_version": self.SNAPSHOT_FORMAT_VERSION,
+            "project_id": self.project_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "row_count": row,
+            "dimension": dimension,
+            "watermark": watermark.isoformat(),
+            "data_file": self.DATA_FILE,
+            "sha256": self._file_checksum(data_path),
+        }
+        with open(os.path.join(snapshot_dir, self.MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"Exported snapshot of project {self.project_id} with {row} chunks to {snapshot_dir}")
+        return manifest
+
+    async def import_snapshot(self, chunk_model, snapshot_dir: str, verify_checksum: bool = True) -> dict:
+        """
+        Build the project's index from a snapshot, then catch up from MongoDB.
+
+        The Arrow file is memory-mapped and the vector column is read as a
+        NumPy view without a copy; the vector index still copies the rows into
+        its own normalised matrix, and the BM25 postings are rebuilt from the
+        content column. What the snapshot saves is the MongoDB scan and the
+        BSON decoding, not the indexing. Chunks written at or after the
+        snapshot's watermark (less `WATERMARK_OVERLAP`) are then re-read from
+        MongoDB and re-indexed, and chunks deleted since are dropped.
+
+        :param chunk_model: A `ChunkModel` bound to the database.
+        :param snapshot_dir: Directory written by `export_snapshot`.
+        :param verify_checksum: Check the data file against the manifest checksum first.
+        :return: Counts of snapshot rows and caught-up writes and deletes.
+        """
+        with open(os.path.join(snapshot_dir, self.MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != self.SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+        if manifest.get("project_id") != self.project_id:
+            raise ValueError(f"Snapshot belongs to project {manifest.get('project_id')}, not {self.project_id}")
+
+        data_path = os.path.join(snapshot_dir, manifest["data_file"])
+        if verify_checksum and self._file_checksum(data_path) != manifest["sha256"]:
+            raise ValueError(f"Snapshot checksum mismatch for {data_path}")
+
+        project_index = ProjectIndex(self.index_path)
+        with pa.memory_map(data_path, "r") as source:
+            table = ipc.open_file(source).read_all()
+
+            chunk_ids = table.column("chunk_id").to_pylist()
+            metadatas = [
+                {**json.loads(metadata), "file_id": file_id}
+                for metadata, file_id in zip(
+                    table.column("chunk_metadata").to_pylist(),
+                    table.column("file_id").to_pylist()
+                )
+            ]
+            # Exports skip linked near-duplicates; keep them out even if a snapshot carries some
+            keep = [i for i, metadata in enumerate(metadatas) if self._is_searchable(metadata)]
+            contents = table.column("chunk_content").to_pylist()
+            project_index.add_chunks(
+                chunk_ids=[chunk_ids[i] for i in keep],
+                contents=[contents[i] for i in keep],
+                metadatas=[metadatas[i] for i in keep]
+            )
+
+            dimension = manifest["dimension"]
+            if dimension:
+                has_vector = table.column("has_vector").to_numpy()
+                flat = table.column("vector").combine_chunks().flatten().to_numpy(zero_copy_only=True)
+                vectors = flat.reshape(-1, dimension)
+                rows = np.asarray([i for i in keep if has_vector[i]], dtype=np.int64)
+                project_index.add_vectors([chunk_ids[i] for i in rows], vectors[rows])
+
+        # Read before catching up: every change after this read bumps the version past it
+        project_index.applied_version = await chunk_model.project_model.get_index_version(self.project_id)
+        watermark = datetime.fromisoformat(manifest["watermark"]) - self.WATERMARK_OVERLAP
+        written = await self._catch_up_writes(chunk_model, project_index, watermark)
+        deleted = await self._catch_up_deletes(chunk_model, project_index, chunk_ids)
+
+        project_index.save()
+        set_project_index(project_id=self.project_id, project_index=project_index)
+
+        logger.info(
+            f"Imported snapshot of project {self.project_id}: {len(chunk_ids)} rows, "
+            f"{written} writes and {deleted} deletes caught up"
+        )
+        return {
+            "snapshot_rows": len(chunk_ids),
+            "caught_up_writes": written,
+            "caught_up_deletes": deleted,
+        }
+
+    async def _catch_up_writes(self, chunk_model, project_index: ProjectIndex, updated_since: datetime) -> int:
+        chunk_ids, contents, metadatas = [], [], []
+        vector_ids, vectors = [], []
+        async for doc in chunk_model.iter_project_chunks(project_id=self.project_id, updated_since=updated_since):
+            chunk_id = str(doc["_id"])
+            metadata = dict(doc["chunk_metadata"])
+            if not self._is_searchable(metadata):
+                continue
+            chunk_ids.append(chunk_id)
+            contents.append(doc["chunk_content"])
+            metadatas.append({**metadata, "file_id": doc["file_id"]})
+            embedding = doc.get("chunk_embedding")
+            if embedding is not None:
+                vector_ids.append(chunk_id)
+                vectors.append(unpack_vector(embedding))
+
+        project_index.add_chunks(chunk_ids=chunk_ids, contents=contents, metadatas=metadatas)
+        if vector_ids:
+            project_index.add_vectors(vector_ids, np.stack(vectors))
+        return len(chunk_ids)
+
+    async def _catch_up_deletes(self, chunk_model, project_index: ProjectIndex, snapshot_chunk_ids: list[str]) -> int:
+        live_ids = await chunk_model.get_project_chunk_ids(project_id=self.project_id)
+        return project_index.remove_chunks([chunk_id for chunk_id in snapshot_chunk_ids if chunk_id not in live_ids])
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from typing import Optional
+
+import numpy as np
+
+from .base_controller import BaseController
+from .project_controller import ProjectController
+from retrieval import SummarizerBackend, extractive_summary, get_index_saver, get_project_summary_index
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryController(BaseController):
+    """
+    Builds a project's hierarchical summary index (see `SummaryIndex`).
+
+    Section summaries are written by `summarizer_llm`, or extractively when
+    it is None, and embedded with `embedding_llm` when one is given. A file
+    summary is written from its section summaries. Only sections whose chunk
+    text changed since the last build are summarised again, and the file
+    summary only when one of its sections changed.
+    """
+
+    SECTION_PROMPT = (
+        "Summarise the following consecutive passages of a document in at most {max_tokens} tokens. "
+        "Name the topics, entities and facts they cover so the summary can be searched. "
+        "Answer with the summary only.\n\n{text}"
+    )
+    FILE_PROMPT = (
+        "Summarise a document from the summaries of its sections below in at most {max_tokens} tokens. "
+        "Name the topics, entities and facts it covers so the summary can be searched. "
+        "Answer with the summary only.\n\n{text}"
+    )
+
+    def __init__(self, project_id: str, summarizer_llm=None, embedding_llm=None):
+        super().__init__()
+
+        self.project_id = project_id
+        self.summarizer_llm = summarizer_llm
+        self.embedding_llm = embedding_llm
+        self.max_tokens = self.app_settings.SUMMARY_INDEX_SUMMARY_TOKENS
+        self.summary_index = get_project_summary_index(
+            project_id=project_id,
+            index_dir=ProjectController().get_project_index_path(project_id=project_id),
+            section_size=self.app_settings.SUMMARY_INDEX_SECTION_CHUNKS
+        )
+
+    @classmethod
+    def from_app(cls, app, project_id: str) -> "SummaryController":
+        """
+        Build a controller with the app's LLMs, as configured by the `SUMMARY_INDEX_*` settings.
+        """
+        controller = cls(project_id=project_id)
+        settings = controller.app_settings
+        if settings.SUMMARY_INDEX_SUMMARIZER == SummarizerBackend.LLM.value:
+            controller.summarizer_llm = app.generation_llm
+        if settings.SUMMARY_INDEX_EMBED:
+            controller.embedding_llm = app.embedding_llm
+        return controller
+
+    def schedule_save(self):
+        get_index_saver(self.app_settings.INDEX_SAVE_DELAY_SECONDS).schedule(
+            ("summaries", self.project_id), self.summary_index.save
+        )
+
+    async def summarize(self, prompt: str, texts: list[str]) -> str:
+        if self.summarizer_llm is None:
+            return extractive_summary(texts, max_tokens=self.max_tokens)
+        response = await self.summarizer_llm.generate_text(
+            user_message=prompt.format(max_tokens=self.max_tokens, text="\n\n".join(texts)),
+            temperature=0.0,
+            max_output_tokens=self.max_tokens
+        )
+        summary = (response["text"] or "").strip()
+        if count_tokens(summary) > self.max_tokens:
+            summary = summary[:self.max_tokens * 4].rsplit(" ", 1)[0]
+        return summary
+
+    async def embed(self, texts: list[str]) -> Optional[np.ndarray]:
+        if self.embedding_llm is None or not texts:
+            return None
+        try:
+            response = await self.embedding_llm.embed_text(texts)
+        except Exception as e:
+            # Summaries stay searchable lexically; the next build of the file embeds them
+            logger.error(f"Embedding summaries of project {self.project_id} failed: {e}")
+            return None
+        return np.asarray(response["embeddings"], dtype=np.float32)
+
+    async def build_file(self, file_id: str, chunk_ids: list[str], contents: list[str],
+                         chunk_orders: list[int]) -> dict:
+        """
+        (Re)build the summaries of one file and schedule saving the index.
+
+        :param file_id: The file the chunks belong to.
+        :param chunk_ids: The file's searchable chunk ids, in file order.
+        :param contents: The chunk contents, in file order.
+        :param chunk_orders: The chunks' `chunk_order`.
+        :return: Counts of sections, re-summarised sections and whether the file summary changed.
+        """
+        index = self.summary_index
+        if not chunk_ids:
+            removed = index.remove_file(file_id)
+            if removed:
+                self.schedule_save()
+            return {"section_count": 0, "summarized_count": 0, "file_summarized": False}
+
+        sections = index.split_sections(file_id, chunk_ids, contents, chunk_orders)
+        changed = index.plan_file(sections)
+
+        semaphore = asyncio.Semaphore(self.app_settings.SUMMARY_INDEX_CONCURRENCY)
+
+        async def summarize_section(section):
+            async with semaphore:
+                section.summary = await self.summarize(self.SECTION_PROMPT, section.contents)
+
+        await asyncio.gather(*(summarize_section(section) for section in changed))
+
+        file_summary = None
+        if index.file_changed(file_id, index.file_fingerprint(sections)):
+            file_summary = sections[0].summary if len(sections) == 1 else await self.summarize(
+                self.FILE_PROMPT, [section.summary for section in sections]
+            )
+
+        # One embedding call for every new summary of the file
+        new_summaries = [section.summary for section in changed] + ([file_summary] if file_summary is not None else [])
+        vectors = await self.embed(new_summaries)
+        index.update_file(
+            file_id=file_id,
+            sections=sections,
+            changed=changed,
+            section_vectors=vectors[:len(changed)] if vectors is not None and changed else None,
+            file_summary=file_summary,
+            file_vector=vectors[-1] if vectors is not None and file_summary is not None else None
+        )
+        self.schedule_save()
+        return {
+            "section_count": len(sections),
+            "summarized_count": len(changed),
+            "file_summarized": file_summary is not None,
+        }
+
+    async def build_project(self, chunk_model, file_ids: list[str]) -> dict:
+        """
+        Bring the summaries of every file of the project up to date from the stored chunks.
+
+        Linked near-duplicates (`duplicate_of` in their metadata) are not searchable and are skipped.
+
+        :param chunk_model: A `ChunkModel` bound to the request's database.
+        :param file_ids: The project's file ids.
+        :return: Per-file build stats, see `build_file`.
+        """
+        stats = {}
+        for file_id in file_ids:
+            chunks = await chunk_model.get_chunks_by_file_id(project_id=self.project_id, file_id=file_id)
+            chunks = [chunk for chunk in chunks if "duplicate_of" not in chunk.get("chunk_metadata", {})]
+            stats[file_id] = await self.build_file(
+                file_id=file_id,
+                chunk_ids=[str(chunk["_id"]) for chunk in chunks],
+                contents=[chunk["chunk_content"] for chunk in chunks],
+                chunk_orders=[chunk["chunk_order"] for chunk in chunks]
+            )
+        for file_id in set(self.summary_index.file_entries) - set(file_ids):
+            self.summary_index.remove_file(file_id)
+        self.schedule_save()
+        return stats
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,6 +14,89 @@ class Settings(BaseSettings):
     DB_URL: str
     DB_NAME: str
 
+    COHERE_API_KEY: Optional[str] = None
+    ANTHROPIC_API_KEY: Optional[str] = None
+    MISTRAL_API_KEY: Optional[str] = None
+    GOOGLE_API_KEY: Optional[str] = None
+
+    GENERATION_PROVIDER: str = "openai"
+    GENERATION_MODEL_NAME: Optional[str] = None
+    GENERATION_MODEL_VERSION: Optional[str] = None
+    EMBEDDING_PROVIDER: str = "openai"
+
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+
+    GENERATION_ROUTER_ENABLED: bool = False
+    GENERATION_ROUTER_HEDGE_ENABLED: bool = True
+    GENERATION_ROUTER_MIN_HEDGE_DELAY_MS: float = 200.0
+    GENERATION_ROUTER_ERROR_THRESHOLD: float = 0.5
+    GENERATION_ROUTER_COOLDOWN_SECONDS: float = 30.0
+
+    GENERATION_CACHE_ENABLED: bool = False
+    GENERATION_CACHE_SIZE: int = 10000
+    GENERATION_CACHE_TTL_SECONDS: int = 3600
+    GENERATION_CACHE_SEMANTIC_THRESHOLD: Optional[float] = None
+    GENERATION_CACHE_SHARED: bool = False
+
+    RETRIEVAL_CACHE_ENABLED: bool = True
+    RETRIEVAL_CACHE_SIZE: int = 10000
+    RETRIEVAL_CACHE_TTL_SECONDS: int = 3600
+    RETRIEVAL_CACHE_SHARED: bool = False
+
+    INGEST_DEDUP_MODE: Optional[str] = None
+    INGEST_DEDUP_THRESHOLD: float = 0.8
+    INGEST_DEDUP_NUM_PERM: int = 128
+
+    # Hierarchical summary index: built at ingest, used by search when section_k is set (or by default when enabled)
+    SUMMARY_INDEX_ENABLED: bool = False
+    SUMMARY_INDEX_SUMMARIZER: str = "llm"
+    SUMMARY_INDEX_EMBED: bool = True
+    SUMMARY_INDEX_SECTION_CHUNKS: int = 16
+    SUMMARY_INDEX_SUMMARY_TOKENS: int = 160
+    SUMMARY_INDEX_CONCURRENCY: int = 4
+    SUMMARY_INDEX_SECTION_K: int = 8
+    SUMMARY_INDEX_FILE_K: int = 16
+
+    CONVERSATION_RECENT_TURNS: int = 4
+    CONVERSATION_SUMMARY_TOKENS: int = 512
+
+    VECTOR_STORAGE_DTYPE: str = "float32"
+    BATCH_SEARCH_GROUP_SIZE: int = 128
+    INDEX_SNAPSHOT_DIR: Optional[str] = None
+    # Project indexes are written to disk at most once per delay, off the event loop
+    INDEX_SAVE_DELAY_SECONDS: float = 2.0
+    # Seconds between passes correcting drift in the project counters; 0 disables the reconciler
+    PROJECT_STATS_RECONCILE_INTERVAL_SECONDS: float = 3600.0
+
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 64
+    ADMISSION_MAX_BULK_CONCURRENCY: int = 16
+    ADMISSION_TENANT_QUERY_CONCURRENCY: int = 16
+    ADMISSION_TENANT_BULK_CONCURRENCY: int = 4
+    ADMISSION_TENANT_QUEUE_LIMIT: int = 64
+    ADMISSION_MAX_QUEUE_WAIT_SECONDS: float = 30.0
+    # Fair-queue weights per project id, e.g. {"42": 2.0}; unlisted projects weigh 1
+    ADMISSION_TENANT_WEIGHTS: dict[str, float] = {}
+
+    RERANK_BACKEND: str = "local"
+    RERANK_BUDGET_MS: int = 300
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_CACHE_SIZE: int = 10000
+
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_READ_TIMEOUT: float = 60.0
+
+    # Per-provider budgets, e.g. {"openai": {"requests_per_minute": 500, "tokens_per_minute": 150000}}
+    LLM_RATE_LIMITS: dict[str, dict[str, float]] = {}
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 20.0
+
     class Config:
         env_file = ".env"
 
@@ -1,4 +1,46 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from .llm_enums import EmbeddingInputType
+
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+
+def _run_sync(coroutine):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    All sync calls share one background event loop, so the async provider
+    clients (and their connection pools) stay bound to a single loop.
+    """
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-sync-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _sync_loop).result()
+
+
+@dataclass
+class StreamEvent:
+    """
+    One item of `LLMBase.stream`.
+
+    Text events carry a delta in `text`. The last event of every stream has an
+    empty `text` and carries `finish_reason` and `usage` ({prompt_tokens,
+    completion_tokens, total_tokens}, same shape as `generate_text`).
+    """
+    text: str = ""
+    finish_reason: Optional[str] = None
+    usage: Optional[dict] = None
+
+    @property
+    def is_final(self) -> bool:
+        return self.usage is not None
 
 
 class LLMBase(ABC):
@@ -11,7 +53,8 @@ class LLMBase(ABC):
 
             temperature: float = 0.7,
             max_input_tokens: int = 2048,
-            max_output_tokens: int = 512
+            max_output_tokens: int = 512,
+            client_registry=None
     ):
         """
         Initializes the LLMBase model.
@@ -23,7 +66,9 @@ class LLMBase(ABC):
             temperature (float): The sampling temperature for text generation.
             max_input_tokens (int): The maximum number of input tokens.
             max_output_tokens (int): The maximum number of output tokens.
+            client_registry (LLMClientRegistry): Optional shared registry supplying pooled provider clients.
         """
+        self.client_registry = client_registry
         self.model_name = model_name
         self.model_version = model_version
         self.api_key = api_key
@@ -63,32 +108,79 @@ class LLMBase(ABC):
         pass
 
     @abstractmethod
-    def generate_text(
+    async def generate_text(
             self,
             user_message: str,
             temperature: float = None,
             max_output_tokens: int = None,
-            messages: list[dict] = None
+            messages: list[dict] = None,
+            conversation_id: str = None
             # top_p: float = 0.95,
             # top_k: int = 50,
             # repetition_penalty: float = 1.1,
-    ):
+    ) -> dict:
         """
         Generates text using specified parameters and messages.
 
         Args:
+            user_message (str): The new user message to answer.
             temperature (float): Controls randomness. Higher values generate 
                 more random outputs. Defaults to the class-level temperature.
             max_output_tokens (int): Maximum tokens in the generated output. 
                 Defaults to the class-level max_output_tokens.
-            messages (list[dict]): List of prompt messages for text generation.
+            messages (list[dict]): Previous conversation messages, as
+                {"role": ..., "content": ...} dicts. Not modified.
+            conversation_id (str): Optional id of the conversation the
+                message belongs to. Drivers with client-side session state
+                (Gemini) may reuse it across turns; the others ignore it.
 
         Returns:
-            str: Generated text based on the provided prompts and parameters.
-            :param user_message:
+            dict: {"text", "model", "finish_reason", "usage": {"prompt_tokens",
+                "completion_tokens", "total_tokens"}}.
+        """
+        pass
+
+    @abstractmethod
+    async def embed_text(
+            self,
+            texts: list[str],
+            input_type: str = EmbeddingInputType.DOCUMENT.value
+    ) -> dict:
+        """
+        Embeds a batch of texts.
+
+        Args:
+            texts (list[str]): The texts to embed.
+            input_type (str): An `EmbeddingInputType` value; providers that
+                embed queries and documents differently use it.
+
+        Returns:
+            dict: {"embeddings": list of vectors, "model", "usage"}.
+        """
+        pass
+
+    @abstractmethod
+    def stream(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            conversation_id: str = None
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Streams generated text. Implemented as an async generator.
+
+        Closing the generator early (e.g. when the client disconnects) must
+        close the provider stream as well.
+
+        Args:
+            Same as `generate_text`.
+
+        Yields:
+            StreamEvent: Text deltas as they are produced, then one final event
+                with the finish reason and token usage.
         """
-        temperature = temperature if temperature is not None else self.temperature
-        max_output_tokens = max_output_tokens if max_output_tokens is not None else self.max_output_tokens
         pass
 
     @abstractmethod
@@ -100,16 +192,18 @@ class LLMBase(ABC):
     def prepare_message(self, role: str, content: str):
         pass
 
-    # @abstractmethod
-    # def embed_text(self, document_type: str):
-    #     """
-    #     Embeds text based on the specified document type.
-    #
-    #     Args:
-    #         document_type (str): The type of document to embed.
-    #     """
-    #     pass
-    #
+    def get_model_context_window(self) -> int:
+        """Get the context window size for the current model."""
+        return self.max_input_tokens
+
+    def generate_text_sync(self, *args, **kwargs) -> dict:
+        """Blocking wrapper around `generate_text` for scripts. Do not call it from async code."""
+        return _run_sync(self.generate_text(*args, **kwargs))
+
+    def embed_text_sync(self, *args, **kwargs) -> dict:
+        """Blocking wrapper around `embed_text` for scripts. Do not call it from async code."""
+        return _run_sync(self.embed_text(*args, **kwargs))
+
     # @abstractmethod
     # def get_embedding(self, text: str):
     #     """
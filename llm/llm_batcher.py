@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import numpy as np
+
+from .llm_base import LLMBase
+from .llm_enums import EmbeddingInputType
+
+logger = logging.getLogger(__name__)
+
+
+class BatchMetrics:
+    """
+    Rolling batch-size and queue-wait statistics of a `MicroBatcher`.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.batch_count = 0
+        self.item_count = 0
+        self.batch_sizes: deque[int] = deque(maxlen=window)
+        self.queue_waits_ms: deque[float] = deque(maxlen=window)
+
+    def record(self, batch_size: int, queue_waits_ms: list[float]):
+        self.batch_count += 1
+        self.item_count += batch_size
+        self.batch_sizes.append(batch_size)
+        self.queue_waits_ms.extend(queue_waits_ms)
+
+    @staticmethod
+    def _percentile(values: deque, q: float) -> Optional[float]:
+        return float(np.percentile(np.fromiter(values, dtype=np.float64), q)) if values else None
+
+    def snapshot(self) -> dict:
+        return {
+            "batch_count": self.batch_count,
+            "item_count": self.item_count,
+            "batch_size_mean": float(np.mean(self.batch_sizes)) if self.batch_sizes else None,
+            "batch_size_p50": self._percentile(self.batch_sizes, 50),
+            "batch_size_max": max(self.batch_sizes) if self.batch_sizes else None,
+            "queue_wait_ms_p50": self._percentile(self.queue_waits_ms, 50),
+            "queue_wait_ms_p95": self._percentile(self.queue_waits_ms, 95),
+        }
+
+
+@dataclass
+class _PendingRequest:
+    payload: Any
+    size: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to `max_wait_ms` or `max_batch_size` items and runs them as one call.
+
+    Requests are batched per group (e.g. the embedding input type), since only
+    requests with the same parameters can share a provider call. `batch_fn`
+    receives the group and the list of payloads and must return one result per
+    payload, in order. A failed batch fails every request in it.
+    """
+
+    def __init__(
+            self,
+            batch_fn: Callable[[Hashable, list[Any]], Awaitable[list[Any]]],
+            max_batch_size: int = 64,
+            max_wait_ms: float = 5.0,
+            size_fn: Callable[[Any], int] = lambda payload: 1
+    ):
+        """
+        Args:
+            batch_fn: Coroutine function running one batch.
+            max_batch_size (int): Items per batch; a batch is sent as soon as it is full.
+            max_wait_ms (float): How long the first request of a batch waits for company.
+            size_fn: Number of items a payload counts for (e.g. its number of texts).
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.size_fn = size_fn
+        self.metrics = BatchMetrics()
+        self._pending: dict[Hashable, list[_PendingRequest]] = {}
+        self._pending_sizes: dict[Hashable, int] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, payload: Any, group: Hashable = None) -> Any:
+        """
+        Queue a request and wait for its share of the batch result.
+
+        :param payload: The request payload handed to `batch_fn`.
+        :param group: Requests are only batched with requests of the same group.
+        :return: This request's result.
+        """
+        loop = asyncio.get_running_loop()
+        size = self.size_fn(payload)
+        if self._pending.get(group) and self._pending_sizes[group] + size > self.max_batch_size:
+            self._flush(group)
+
+        request = _PendingRequest(payload=payload, size=size, future=loop.create_future())
+        pending = self._pending.setdefault(group, [])
+        pending.append(request)
+        self._pending_sizes[group] = self._pending_sizes.get(group, 0) + size
+
+        if self._pending_sizes[group] >= self.max_batch_size:
+            self._flush(group)
+        elif len(pending) == 1:
+            self._timers[group] = loop.call_later(self.max_wait_ms / 1000.0, self._flush, group)
+
+        return await request.future
+
+    def _flush(self, group: Hashable):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(group, [])
+        self._pending_sizes.pop(group, None)
+        if requests:
+            task = asyncio.get_running_loop().create_task(self._run(group, requests))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, group: Hashable, requests: list[_PendingRequest]):
+        started = time.perf_counter()
+        self.metrics.record(
+            batch_size=sum(request.size for request in requests),
+            queue_waits_ms=[(started - request.enqueued_at) * 1000.0 for request in requests]
+        )
+        try:
+            results = await self.batch_fn(group, [request.payload for request in requests])
+            if len(results) != len(requests):
+                raise ValueError(f"Batch returned {len(results)} results for {len(requests)} requests")
+        except Exception as e:
+            logger.error(f"Micro-batch of {len(requests)} requests failed: {e}")
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        for request, result in zip(requests, results):
+            if not request.future.done():
+                request.future.set_result(result)
+
+
+class BatchingLLM(LLMBase):
+    """
+    `LLMBase` wrapper that micro-batches concurrent `embed_text` calls into one provider call.
+
+    The texts of concurrent calls with the same input type are concatenated
+    (up to `max_batch_size` texts), embedded together and split back per
+    caller; each caller's usage is its share of the batch usage. None of the
+    drivers' generation endpoints accept several prompts per request, so
+    generation is passed through.
+    """
+
+    def __init__(self, llm: LLMBase, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.llm = llm
+        self.embedding_batcher = MicroBatcher(
+            batch_fn=self._embed_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            size_fn=len
+        )
+        super().__init__(
+            model_name=llm.model_name,
+            model_version=llm.model_version,
+            api_key=llm.api_key,
+            temperature=llm.temperature,
+            max_input_tokens=llm.max_input_tokens,
+            max_output_tokens=llm.max_output_tokens
+        )
+        self.provider = getattr(llm, "provider", None)
+
+    def _initialize_client(self):
+        """The wrapped driver owns the provider client."""
+        self.client = self.llm.client
+
+    @property
+    def generation_model(self) -> str:
+        return getattr(self.llm, "generation_model", self.llm.model_name)
+
+    @property
+    async def available_models(self) -> list[str]:
+        return await self.llm.available_models
+
+    def set_generation_model(self, model_version: str):
+        self.llm.set_generation_model(model_version)
+
+    def set_embedding_model(self, model_version: str):
+        self.llm.set_embedding_model(model_version)
+
+    async def _embed_batch(self, input_type: str, text_lists: list[list[str]]) -> list[dict]:
+        texts = [text for text_list in text_lists for text in text_list]
+        response = await self.llm.embed_text(texts, input_type=input_type)
+        usage = response.get("usage") or {}
+
+        results, offset = [], 0
+        for text_list in text_lists:
+            share = len(text_list) / len(texts) if texts else 0.0
+            results.append({
+                "embeddings": response["embeddings"][offset:offset + len(text_list)],
+                "model": response.get("model"),
+                "usage": {
+                    key: round(value * share) if isinstance(value, (int, float)) else value
+                    for key, value in usage.items()
+                },
+                "batch_size": len(texts),
+            })
+            offset += len(text_list)
+        return results
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> dict:
+        if len(texts) >= self.embedding_batcher.max_batch_size:
+            # Already a full batch (e.g. ingestion): send it straight away
+            return await self.llm.embed_text(texts, input_type=input_type)
+        return await self.embedding_batcher.submit(list(texts), group=input_type)
+
+    async def generate_text(self, *args, **kwargs) -> dict:
+        return await self.llm.generate_text(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        return self.llm.stream(*args, **kwargs)
+
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]):
+        return self.llm.prepare_history_messages(new_message, messages)
+
+    def prepare_message(self, role: str, content: str):
+        return self.llm.prepare_message(role, content)
+
+    def get_model_context_window(self) -> int:
+        return self.llm.get_model_context_window()
+
+    def get_metrics(self) -> dict:
+        return {"embedding": self.embedding_batcher.metrics.snapshot()}
@@ -0,0 +1,424 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+import numpy as np
+
+from .llm_base import LLMBase, StreamEvent
+from .llm_enums import EmbeddingInputType
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+        model: str,
+        temperature: float,
+        max_output_tokens: int,
+        messages: list[dict],
+        chunk_ids: list[str] = None
+) -> str:
+    """
+    Hash everything that determines a generation into an exact cache key.
+
+    Args:
+        model (str): The generation model.
+        temperature (float): The resolved sampling temperature.
+        max_output_tokens (int): The resolved output token limit.
+        messages (list[dict]): The full conversation, new user message last.
+        chunk_ids (list[str]): Ids of the retrieved chunks the prompt was built from, in prompt order.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+            "chunk_ids": list(chunk_ids or []),
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Two-tier cache of generation responses.
+
+    The exact tier is an in-process LRU with a TTL, optionally backed by a
+    shared MongoDB tier (`GenerationCacheModel`) so workers reuse each
+    other's answers. The semantic tier, enabled by a similarity threshold,
+    reuses an answer when a new query's embedding is close enough to a cached
+    one within the same scope (model, sampling parameters, history, project,
+    retrieved chunks).
+
+    Both tiers depend on the retrieved chunk ids, so re-ingesting a file (which
+    gives its chunks new ids) naturally misses; `invalidate_project` still
+    drops answers grounded on chunks that were deleted without replacement.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 10000,
+            ttl_seconds: float = 3600,
+            semantic_threshold: Optional[float] = None,
+            store=None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self.store = store
+
+        # key -> (expires_at, project_id, response)
+        self._entries: OrderedDict[str, tuple[float, Optional[str], dict]] = OrderedDict()
+        # scope -> key -> (expires_at, project_id, unit query vector, response)
+        self._semantic: dict[str, OrderedDict[str, tuple[float, Optional[str], np.ndarray, dict]]] = {}
+        self._semantic_order: OrderedDict[tuple[str, str], None] = OrderedDict()
+
+        self.hits = {"exact": 0, "shared": 0, "semantic": 0}
+        self.misses = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.semantic_threshold is not None
+
+    def _put_local(self, key: str, response: dict, project_id: Optional[str]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, project_id, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[dict]:
+        """
+        Look a key up in the local tier, then in the shared tier.
+
+        :param key: A key from `make_cache_key`.
+        :return: The cached response, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, _, response = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return response
+            del self._entries[key]
+
+        if self.store is not None:
+            try:
+                record = await self.store.get_entry(key)
+            except Exception as e:
+                logger.error(f"Shared generation cache lookup failed: {e}")
+                record = None
+            if record is not None:
+                self._put_local(key, record["response"], record.get("project_id"))
+                self.hits["shared"] += 1
+                return record["response"]
+
+        return None
+
+    def get_semantic(self, scope: str, query_vector: np.ndarray) -> Optional[dict]:
+        """
+        Find the cached response whose query is most similar to `query_vector`.
+
+        :param scope: The semantic scope, see `CachedLLM`.
+        :param query_vector: The new query's embedding.
+        :return: The response when the best cosine similarity reaches the threshold, else None.
+        """
+        entries = self._semantic.get(scope)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        for key in [key for key, entry in entries.items() if entry[0] <= now]:
+            self._drop_semantic(scope, key)
+        if not entries:
+            return None
+
+        keys = list(entries)
+        matrix = np.stack([entries[key][2] for key in keys])
+        similarities = matrix @ _unit(query_vector)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+
+        self._semantic_order.move_to_end((scope, keys[best]))
+        self.hits["semantic"] += 1
+        return entries[keys[best]][3]
+
+    def _drop_semantic(self, scope: str, key: str):
+        entries = self._semantic.get(scope)
+        if entries is not None:
+            entries.pop(key, None)
+            if not entries:
+                del self._semantic[scope]
+        self._semantic_order.pop((scope, key), None)
+
+    async def put(
+            self,
+            key: str,
+            response: dict,
+            project_id: Optional[str] = None,
+            scope: Optional[str] = None,
+            query_vector: Optional[np.ndarray] = None
+    ):
+        """
+        Store a response in every enabled tier.
+
+        :param key: A key from `make_cache_key`.
+        :param response: The `generate_text` response.
+        :param project_id: The project the answer was grounded on, used for invalidation.
+        :param scope: Semantic scope; with `query_vector` it adds a semantic entry.
+        :param query_vector: The query embedding.
+        """
+        self._put_local(key, response, project_id)
+
+        if self.semantic_enabled and scope is not None and query_vector is not None:
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._semantic.setdefault(scope, OrderedDict())[key] = (expires_at, project_id, _unit(query_vector), response)
+            self._semantic_order[(scope, key)] = None
+            self._semantic_order.move_to_end((scope, key))
+            while len(self._semantic_order) > self.max_entries:
+                (old_scope, old_key), _ = self._semantic_order.popitem(last=False)
+                self._drop_semantic(old_scope, old_key)
+
+        if self.store is not None:
+            try:
+                await self.store.put_entry(key, response, project_id, self.ttl_seconds)
+            except Exception as e:
+                logger.error(f"Shared generation cache write failed: {e}")
+
+    async def invalidate_project(self, project_id: str) -> int:
+        """
+        Drop every cached answer grounded on a project. Call it when the project's chunks change.
+
+        :return: The number of local entries dropped.
+        """
+        keys = [key for key, (_, entry_project, _) in self._entries.items() if entry_project == project_id]
+        for key in keys:
+            del self._entries[key]
+
+        semantic_keys = [
+            (scope, key)
+            for scope, entries in self._semantic.items()
+            for key, entry in entries.items()
+            if entry[1] == project_id
+        ]
+        for scope, key in semantic_keys:
+            self._drop_semantic(scope, key)
+
+        if self.store is not None:
+            try:
+                await self.store.delete_project_entries(project_id)
+            except Exception as e:
+                logger.error(f"Shared generation cache invalidation failed: {e}")
+
+        return len(keys) + len(semantic_keys)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "semantic_entries": len(self._semantic_order),
+            "hits": dict(self.hits),
+            "misses": self.misses,
+        }
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class CachedLLM(LLMBase):
+    """
+    `LLMBase` wrapper that serves repeated generations from a `GenerationCache`.
+
+    `generate_text` and `stream` accept three extra keyword arguments:
+    `project_id` (for invalidation and semantic scoping), `chunk_ids` (the
+    retrieved chunks the prompt was built from, part of both keys) and
+    `cache_query` (the raw user question embedded for the semantic tier;
+    defaults to `user_message`, which for RAG is the whole packed prompt).
+    Responses carry a `cache` field: "exact", "semantic" or None on a miss.
+    Cache hits on `stream` are replayed as one delta followed by the final event.
+    """
+
+    def __init__(self, llm: LLMBase, cache: GenerationCache, embedder: LLMBase = None):
+        """
+        Args:
+            llm (LLMBase): The driver to wrap.
+            cache (GenerationCache): The cache to read and fill.
+            embedder (LLMBase): Driver used to embed queries for the semantic
+                tier. Defaults to `llm`.
+        """
+        self.llm = llm
+        self.cache = cache
+        self.embedder = embedder or llm
+        super().__init__(
+            model_name=llm.model_name,
+            model_version=llm.model_version,
+            api_key=llm.api_key,
+            temperature=llm.temperature,
+            max_input_tokens=llm.max_input_tokens,
+            max_output_tokens=llm.max_output_tokens
+        )
+        self.provider = getattr(llm, "provider", None)
+
+    def _initialize_client(self):
+        """The wrapped driver owns the provider client."""
+        self.client = self.llm.client
+
+    @property
+    def generation_model(self) -> str:
+        return getattr(self.llm, "generation_model", self.llm.model_name)
+
+    @property
+    async def available_models(self) -> list[str]:
+        return await self.llm.available_models
+
+    def set_generation_model(self, model_version: str):
+        self.llm.set_generation_model(model_version)
+
+    def set_embedding_model(self, model_version: str):
+        self.llm.set_embedding_model(model_version)
+
+    def _cache_keys(
+            self,
+            user_message: str,
+            temperature: Optional[float],
+            max_output_tokens: Optional[int],
+            messages: Optional[list[dict]],
+            project_id: Optional[str],
+            chunk_ids: Optional[list[str]]
+    ) -> tuple[str, str]:
+        temperature = temperature if temperature is not None else self.llm.temperature
+        max_output_tokens = max_output_tokens or self.llm.max_output_tokens
+        history = list(messages or [])
+        key = make_cache_key(
+            model=self.generation_model,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            messages=history + [{"role": "user", "content": user_message}],
+            chunk_ids=chunk_ids
+        )
+        # Semantic scope: everything but the new user message; the retrieved set, not its order, must match
+        scope = make_cache_key(
+            model=self.generation_model,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            messages=history + [{"role": "project", "content": project_id}],
+            chunk_ids=sorted(chunk_ids or [])
+        )
+        return key, scope
+
+    async def _lookup(self, cache_query: str, key: str, scope: str):
+        response = await self.cache.get(key)
+        if response is not None:
+            return {**response, "cache": "exact"}, None
+
+        query_vector = None
+        if self.cache.semantic_enabled:
+            try:
+                embedded = await self.embedder.embed_text([cache_query], input_type=EmbeddingInputType.QUERY.value)
+                query_vector = np.asarray(embedded["embeddings"][0], dtype=np.float32)
+            except Exception as e:
+                logger.error(f"Query embedding for the semantic cache failed: {e}")
+            if query_vector is not None:
+                response = self.cache.get_semantic(scope, query_vector)
+                if response is not None:
+                    return {**response, "cache": "semantic"}, query_vector
+
+        self.cache.misses += 1
+        return None, query_vector
+
+    async def generate_text(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            project_id: str = None,
+            chunk_ids: list[str] = None,
+            cache_query: str = None,
+            conversation_id: str = None
+    ) -> dict:
+        key, scope = self._cache_keys(user_message, temperature, max_output_tokens, messages, project_id, chunk_ids)
+        cached, query_vector = await self._lookup(cache_query or user_message, key, scope)
+        if cached is not None:
+            return cached
+
+        response = await self.llm.generate_text(
+            user_message=user_message,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            messages=messages,
+            conversation_id=conversation_id
+        )
+        await self.cache.put(key, response, project_id=project_id, scope=scope, query_vector=query_vector)
+        return {**response, "cache": None}
+
+    async def stream(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            project_id: str = None,
+            chunk_ids: list[str] = None,
+            cache_query: str = None,
+            conversation_id: str = None
+    ) -> AsyncIterator[StreamEvent]:
+        key, scope = self._cache_keys(user_message, temperature, max_output_tokens, messages, project_id, chunk_ids)
+        cached, query_vector = await self._lookup(cache_query or user_message, key, scope)
+        if cached is not None:
+            yield StreamEvent(text=cached["text"])
+            yield StreamEvent(finish_reason=cached.get("finish_reason"), usage=cached.get("usage") or {})
+            return
+
+        parts = []
+        stream = self.llm.stream(
+            user_message=user_message,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            messages=messages,
+            conversation_id=conversation_id
+        )
+        try:
+            async for event in stream:
+                if event.is_final:
+                    # Only complete streams are cached
+                    await self.cache.put(
+                        key,
+                        {
+                            "text": "".join(parts),
+                            "model": self.generation_model,
+                            "finish_reason": event.finish_reason,
+                            "usage": event.usage,
+                        },
+                        project_id=project_id,
+                        scope=scope,
+                        query_vector=query_vector
+                    )
+                else:
+                    parts.append(event.text)
+                yield event
+        finally:
+            await stream.aclose()
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> dict:
+        return await self.llm.embed_text(texts, input_type=input_type)
+
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]):
+        return self.llm.prepare_history_messages(new_message, messages)
+
+    def prepare_message(self, role: str, content: str):
+        return self.llm.prepare_message(role, content)
+
+    def get_model_context_window(self) -> int:
+        return self.llm.get_model_context_window()
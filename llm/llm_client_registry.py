@@ -0,0 +1,104 @@
+import logging
+from typing import Any, Callable
+
+import httpx
+
+from .llm_enums import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+
+def _build_openai_client(api_key: str, http_client: httpx.AsyncClient):
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+
+def _build_anthropic_client(api_key: str, http_client: httpx.AsyncClient):
+    from anthropic import AsyncAnthropic
+    return AsyncAnthropic(api_key=api_key, http_client=http_client)
+
+
+def _build_cohere_client(api_key: str, http_client: httpx.AsyncClient):
+    from cohere import AsyncClientV2
+    return AsyncClientV2(api_key=api_key, httpx_client=http_client)
+
+
+def _build_mistral_client(api_key: str, http_client: httpx.AsyncClient):
+    from mistralai import Mistral
+    return Mistral(api_key=api_key, async_client=http_client)
+
+
+CLIENT_BUILDERS: dict[str, Callable[[str, httpx.AsyncClient], Any]] = {
+    LLMProvider.OPENAI.value: _build_openai_client,
+    LLMProvider.ANTHROPIC.value: _build_anthropic_client,
+    LLMProvider.COHERE.value: _build_cohere_client,
+    LLMProvider.MISTRAL.value: _build_mistral_client,
+}
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of provider SDK clients sharing pooled HTTP transports.
+
+    Created once in the app lifespan. Each provider gets one keep-alive
+    `httpx.AsyncClient` (HTTP/2 when enabled), and SDK clients are cached per
+    (provider, api key), so constructing a driver never opens new connections.
+    Google's SDK talks gRPC and manages its own channel, so it is not pooled here.
+    """
+
+    def __init__(
+            self,
+            http2: bool = True,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            keepalive_expiry: float = 30.0,
+            connect_timeout: float = 5.0,
+            read_timeout: float = 60.0
+    ):
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._http_clients: dict[str, httpx.AsyncClient] = {}
+        self._sdk_clients: dict[tuple[str, str], Any] = {}
+
+    def get_http_client(self, provider: str) -> httpx.AsyncClient:
+        """
+        Return the shared HTTP transport of a provider, creating it on first use.
+        """
+        http_client = self._http_clients.get(provider)
+        if http_client is None:
+            http_client = httpx.AsyncClient(http2=self.http2, limits=self.limits, timeout=self.timeout)
+            self._http_clients[provider] = http_client
+        return http_client
+
+    def get_client(self, provider: str, api_key: str):
+        """
+        Return the cached SDK client of a provider for an API key.
+
+        :param provider: An `LLMProvider` value.
+        :param api_key: The provider API key.
+        :return: The provider's async SDK client, bound to the shared transport.
+        """
+        key = (provider, api_key)
+        client = self._sdk_clients.get(key)
+        if client is None:
+            builder = CLIENT_BUILDERS.get(provider)
+            if builder is None:
+                raise ValueError(f"No pooled client available for provider: {provider}")
+            client = builder(api_key, self.get_http_client(provider))
+            self._sdk_clients[key] = client
+        return client
+
+    async def aclose(self):
+        """Close every shared transport. Called on app shutdown."""
+        for provider, http_client in self._http_clients.items():
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close HTTP client for {provider}: {e}")
+        self._http_clients.clear()
+        self._sdk_clients.clear()
@@ -1,5 +1,47 @@
-from .openai_driver import OpenAIDriver
-from .google_driver import GoogleDriver
-from .anthrophic_driver import AnthropicDriver
-from .cohere_driver import CohereDriver
-from .hugging_face_driver import HuggingFaceDriver
\ No newline at end of file
+import importlib
+
+from ..llm_base import LLMBase
+from ..llm_enums import LLMProvider
+
+# Provider -> (module, driver class). A driver module, and the provider SDK it
+# imports, is only loaded the first time that provider is used.
+DRIVER_REGISTRY = {
+    LLMProvider.OPENAI.value: (".openai_driver", "OpenAIDriver"),
+    LLMProvider.ANTHROPIC.value: (".anthropic_driver", "AnthropicDriver"),
+    LLMProvider.COHERE.value: (".cohere_driver", "CohereDriver"),
+    LLMProvider.MISTRAL.value: (".mistral_driver_implementation", "MistralDriver"),
+    LLMProvider.GOOGLE.value: (".google_driver", "GoogleDriver"),
+}
+
+_DRIVER_PROVIDERS = {class_name: provider for provider, (_, class_name) in DRIVER_REGISTRY.items()}
+
+
+def get_driver_class(provider: str) -> type[LLMBase]:
+    """
+    Import and return the driver class of a provider.
+
+    :param provider: An `LLMProvider` value.
+    :return: The driver class.
+    """
+    if provider not in DRIVER_REGISTRY:
+        raise ValueError(f"No driver available for provider: {provider}")
+    module_name, class_name = DRIVER_REGISTRY[provider]
+    return getattr(importlib.import_module(module_name, __name__), class_name)
+
+
+def create_driver(provider: str, **kwargs) -> LLMBase:
+    """
+    Instantiate the driver of a provider.
+
+    :param provider: An `LLMProvider` value.
+    :param kwargs: Driver constructor arguments (`api_key`, `client_registry`, model settings...).
+    :return: The driver instance.
+    """
+    return get_driver_class(provider)(**kwargs)
+
+
+def __getattr__(name: str):
+    # Keeps `from llm.llm_drivers import OpenAIDriver` working without eager imports
+    if name in _DRIVER_PROVIDERS:
+        return get_driver_class(_DRIVER_PROVIDERS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
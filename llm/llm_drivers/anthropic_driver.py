@@ -1,7 +1,7 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 import anthropic
-from ..llm_base import LLMBase
-from ..llm_enums import LLMProvider, LLMModelType, DocumentType
+from ..llm_base import LLMBase, StreamEvent
+from ..llm_enums import LLMProvider, LLMModelType, DocumentType, EmbeddingInputType
 
 
 class AnthropicDriver(LLMBase):
@@ -32,7 +32,16 @@ class AnthropicDriver(LLMBase):
         }
     }
 
-    def __init__(self, api_key: str, model_name: str = "claude", model_version: str = "3-opus"):
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "claude",
+        model_version: str = "3-opus",
+        temperature: float = 0.7,
+        max_input_tokens: int = 200000,
+        max_output_tokens: int = 4096,
+        client_registry=None
+    ):
         """
         Initialize Anthropic driver with API key and model configuration.
 
@@ -41,20 +50,34 @@ class AnthropicDriver(LLMBase):
             model_name (str): Base model name (default: "claude")
             model_version (str): Model version (default: "3-opus")
         """
-        super().__init__(model_name, model_version)
+        super().__init__(
+            model_name=model_name,
+            model_version=model_version,
+            api_key=api_key,
+            temperature=temperature,
+            max_input_tokens=max_input_tokens,
+            max_output_tokens=max_output_tokens,
+            client_registry=client_registry
+        )
         self.provider = LLMProvider.ANTHROPIC.value
-        self.api_key = api_key
         self.generation_model = f"{model_name}-{model_version}"
         self.embedding_model = None  # Anthropic doesn't currently support embeddings
-        self._initialize_client()
 
     def _initialize_client(self):
-        """Initialize Anthropic API client with error handling."""
+        """Initialize the async Anthropic API client with error handling."""
         try:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            if self.client_registry is not None:
+                self.client = self.client_registry.get_client(LLMProvider.ANTHROPIC.value, self.api_key)
+            else:
+                self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
         except Exception as e:
             raise ConnectionError(f"Failed to initialize Anthropic client: {str(e)}")
 
+    @property
+    async def available_models(self) -> list[str]:
+        """Get list of supported Claude models"""
+        return list(self.AVAILABLE_MODELS.keys())
+
     def _validate_model(self, model: str):
         """Validate if the model is supported by Anthropic."""
         if model not in self.AVAILABLE_MODELS:
@@ -83,39 +106,38 @@ class AnthropicDriver(LLMBase):
         """
         raise NotImplementedError("Anthropic does not currently support embedding models")
 
-    def generate_text(
+    def _build_messages(self, user_message: str, messages: list[dict] = None) -> list[dict]:
+        return self.prepare_history_messages(
+            self.prepare_message("user", user_message),
+            messages or []
+        )
+
+    async def generate_text(
         self,
-        temperature: str = None,
-        max_output_tokens: float = None,
-        user_message=None,
-        messages: int = None
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
         ) -> Dict[str, Any]:
         """
         Generate text using Anthropic's Claude API.
 
         Args:
-            prompt (str): Input prompt for generation
+            user_message (str): The new user message
             temperature (float): Controls randomness in generation
             max_output_tokens (int): Maximum number of tokens to generate
-            top_p (float): Nucleus sampling parameter
-            top_k (int): Top-k sampling parameter
-            repetition_penalty (float): Penalty for token repetition
+            messages (list[dict]): Previous conversation messages
 
         Returns:
             Dict[str, Any]: Response containing generated text and metadata
-            :param user_message:
         """
         try:
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model=self.generation_model,
-                max_tokens=max_output_tokens,
-                temperature=temperature,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+                max_tokens=max_output_tokens or self.max_output_tokens,
+                temperature=temperature if temperature is not None else self.temperature,
+                messages=self._build_messages(user_message, messages)
             )
 
             return {
@@ -133,16 +155,54 @@ class AnthropicDriver(LLMBase):
         except Exception as e:
             raise Exception(f"Text generation failed: {str(e)}")
 
-    def embed_text(self, document_type: str):
+    async def stream(
+        self,
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
+        ) -> AsyncIterator[StreamEvent]:
+        """
+        Stream text deltas from Anthropic's Claude API.
+
+        Yields:
+            StreamEvent: Generated text deltas, then the final usage
+        """
+        try:
+            async with self.client.messages.stream(
+                model=self.generation_model,
+                max_tokens=max_output_tokens or self.max_output_tokens,
+                temperature=temperature if temperature is not None else self.temperature,
+                messages=self._build_messages(user_message, messages)
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield StreamEvent(text=text)
+                final_message = await stream.get_final_message()
+
+            yield StreamEvent(
+                finish_reason=final_message.stop_reason,
+                usage={
+                    "prompt_tokens": final_message.usage.input_tokens,
+                    "completion_tokens": final_message.usage.output_tokens,
+                    "total_tokens": final_message.usage.input_tokens + final_message.usage.output_tokens
+                }
+            )
+        except anthropic.APIError as e:
+            raise Exception(f"Anthropic API error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Streaming chat failed: {str(e)}")
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value):
         """
-        Process text for embedding (not currently supported by Anthropic).
+        Embed texts (not currently supported by Anthropic).
 
         Args:
-            document_type (str): Type of document to embed
+            texts (list[str]): Texts to embed
         """
         raise NotImplementedError("Anthropic does not currently support text embeddings")
 
-    def get_embedding(self, text: str):
+    async def get_embedding(self, text: str):
         """
         Get vector embedding for text (not currently supported by Anthropic).
 
@@ -151,6 +211,17 @@ class AnthropicDriver(LLMBase):
         """
         raise NotImplementedError("Anthropic does not currently support text embeddings")
 
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]) -> list[dict]:
+        """Return a new message list: user/assistant history followed by the new message"""
+        return [
+            self.prepare_message(message["role"], message.get("content", ""))
+            for message in messages
+            if message.get("role") in ["user", "assistant"]
+        ] + [new_message]
+
+    def prepare_message(self, role: str, content: str) -> Dict[str, str]:
+        return {"role": role, "content": content}
+
     def get_embedding_model(self) -> Optional[str]:
         """Get the current embedding model name."""
         return self.embedding_model
@@ -174,21 +245,3 @@ class AnthropicDriver(LLMBase):
     def get_model_context_window(self) -> int:
         """Get the context window size for the current model."""
         return self.AVAILABLE_MODELS[self.generation_model]["context_window"]
-
-    def chat_stream(
-            self,
-            prompt: str,
-            temperature: float = 0.7,
-            max_output_tokens: int = 512,
-            top_p: float = 0.95,):
-        self.client.messages.create(
-            model=self.generation_model,
-            max_tokens=max_output_tokens,
-            temperature=temperature,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-        )
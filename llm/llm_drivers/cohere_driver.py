@@ -1,95 +1,220 @@
 import cohere
-from typing import Optional, Dict, Any
-from ..llm_base import LLMBase
-from ..llm_enums import LLMProvider, LLMModelType, DocumentType
+from typing import Optional, Dict, Any, AsyncIterator
+from ..llm_base import LLMBase, StreamEvent
+from ..llm_enums import LLMProvider, LLMModelType, DocumentType, EmbeddingInputType
 
 
 class CohereDriver(LLMBase):
-    def __init__(self, api_key: str, model_name: str = "command", model_version: str = "latest"):
-        super().__init__(model_name, model_version)
-        self.client = cohere.Client(api_key)
+    AVAILABLE_MODELS = {
+        "command": "command",
+        "command-light": "command-light",
+        "command-nightly": "command-nightly",
+        "command-r": "command-r"
+    }
+
+    EMBEDDING_MODELS = {
+        "embed-english-v3.0": "embed-english-v3.0",
+        "embed-multilingual-v3.0": "embed-multilingual-v3.0"
+    }
+
+    # Cohere embeds search documents and search queries differently
+    INPUT_TYPES = {
+        EmbeddingInputType.DOCUMENT.value: "search_document",
+        EmbeddingInputType.QUERY.value: "search_query"
+    }
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "command",
+        model_version: str = "latest",
+        temperature: float = 0.7,
+        max_input_tokens: int = 4096,
+        max_output_tokens: int = 512,
+        client_registry=None
+    ):
+        super().__init__(
+            model_name=model_name,
+            model_version=model_version,
+            api_key=api_key,
+            temperature=temperature,
+            max_input_tokens=max_input_tokens,
+            max_output_tokens=max_output_tokens,
+            client_registry=client_registry
+        )
+        self.provider = LLMProvider.COHERE.value
         self.generation_model = model_name
         self.embedding_model = "embed-english-v3.0"  # Default embedding model
+        self.rerank_model = "rerank-english-v3.0"  # Default rerank model
+
+    def _initialize_client(self):
+        """Initialize the async Cohere v2 client."""
+        try:
+            if self.client_registry is not None:
+                self.client = self.client_registry.get_client(LLMProvider.COHERE.value, self.api_key)
+            else:
+                self.client = cohere.AsyncClientV2(api_key=self.api_key)
+        except Exception as e:
+            raise ConnectionError(f"Failed to initialize Cohere client: {str(e)}")
+
+    @property
+    async def available_models(self) -> list[str]:
+        """Get list of supported Cohere generation models"""
+        return list(self.AVAILABLE_MODELS.keys())
 
     def set_generation_model(self, model_version: str):
         """Set the generation model version."""
-        available_models = {
-            "command": "command",
-            "command-light": "command-light",
-            "command-nightly": "command-nightly",
-            "command-r": "command-r"
-        }
-        if model_version in available_models:
-            self.generation_model = available_models[model_version]
+        if model_version in self.AVAILABLE_MODELS:
+            self.generation_model = self.AVAILABLE_MODELS[model_version]
         else:
             raise ValueError(f"Unsupported model version: {model_version}")
 
     def set_embedding_model(self, model_version: str):
         """Set the embedding model version."""
-        available_models = {
-            "embed-english-v3.0": "embed-english-v3.0",
-            "embed-multilingual-v3.0": "embed-multilingual-v3.0"
-        }
-        if model_version in available_models:
-            self.embedding_model = available_models[model_version]
+        if model_version in self.EMBEDDING_MODELS:
+            self.embedding_model = self.EMBEDDING_MODELS[model_version]
         else:
             raise ValueError(f"Unsupported embedding model: {model_version}")
 
-    def generate_text(
+    def _build_messages(self, user_message: str, messages: list[dict] = None) -> list[dict]:
+        return self.prepare_history_messages(
+            self.prepare_message("user", user_message),
+            messages or []
+        )
+
+    async def generate_text(
         self,
-        temperature: str = None,
-        max_output_tokens: float = None,
-        user_message=None,
-        messages: int = None
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
         ) -> Dict[str, Any]:
-        """Generate text using Cohere's generation API.
-        :param user_message:
+        """Generate text using Cohere's chat API.
+        :param user_message: The new user message.
+        :param messages: Previous conversation messages; the list is not modified.
         """
         try:
-            response = self.client.generate(
+            response = await self.client.chat(
                 model=self.generation_model,
-                prompt=prompt,
-                temperature=temperature,
-                max_tokens=max_output_tokens,
-                p=top_p,
-                k=top_k,
-                frequency_penalty=repetition_penalty,
-                return_likelihoods='NONE'
+                messages=self._build_messages(user_message, messages),
+                temperature=temperature if temperature is not None else self.temperature,
+                max_tokens=max_output_tokens or self.max_output_tokens
             )
 
+            tokens = response.usage.tokens if response.usage else None
+            prompt_tokens = int(tokens.input_tokens) if tokens and tokens.input_tokens is not None else None
+            completion_tokens = int(tokens.output_tokens) if tokens and tokens.output_tokens is not None else None
             return {
-                "text": response.generations[0].text,
-                "tokens_used": response.tokens,
-                "model": self.generation_model
+                "text": response.message.content[0].text,
+                "model": self.generation_model,
+                "finish_reason": response.finish_reason,
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": (prompt_tokens or 0) + (completion_tokens or 0)
+                }
             }
         except Exception as e:
             raise Exception(f"Text generation failed: {str(e)}")
 
-    def embed_text(self, texts: list[str], document_type: str = DocumentType.TEXT.value) -> Dict[str, Any]:
+    async def stream(
+        self,
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
+        ) -> AsyncIterator[StreamEvent]:
+        """Stream text deltas from Cohere's chat API, then the final usage."""
+        try:
+            finish_reason = None
+            prompt_tokens = completion_tokens = None
+            async for event in self.client.chat_stream(
+                model=self.generation_model,
+                messages=self._build_messages(user_message, messages),
+                temperature=temperature if temperature is not None else self.temperature,
+                max_tokens=max_output_tokens or self.max_output_tokens
+            ):
+                if event.type == "content-delta":
+                    yield StreamEvent(text=event.delta.message.content.text)
+                elif event.type == "message-end" and event.delta:
+                    finish_reason = event.delta.finish_reason
+                    tokens = event.delta.usage.tokens if event.delta.usage else None
+                    if tokens:
+                        prompt_tokens = int(tokens.input_tokens) if tokens.input_tokens is not None else None
+                        completion_tokens = int(tokens.output_tokens) if tokens.output_tokens is not None else None
+
+            yield StreamEvent(
+                finish_reason=finish_reason,
+                usage={
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": (prompt_tokens or 0) + (completion_tokens or 0)
+                }
+            )
+        except Exception as e:
+            raise Exception(f"Streaming chat failed: {str(e)}")
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> Dict[str, Any]:
         """Embed multiple texts using Cohere's embedding API."""
         try:
-            response = self.client.embed(
+            response = await self.client.embed(
                 texts=texts,
                 model=self.embedding_model,
-                input_type=document_type
+                input_type=self.INPUT_TYPES.get(input_type, "search_document"),
+                embedding_types=["float"]
             )
 
+            billed_units = response.meta.billed_units if response.meta else None
+            input_tokens = int(billed_units.input_tokens) if billed_units and billed_units.input_tokens else None
             return {
-                "embeddings": response.embeddings,
-                "tokens": response.meta['billed_tokens'],
-                "model": self.embedding_model
+                "embeddings": response.embeddings.float_,
+                "model": self.embedding_model,
+                "usage": {
+                    "prompt_tokens": input_tokens,
+                    "total_tokens": input_tokens
+                }
             }
         except Exception as e:
             raise Exception(f"Text embedding failed: {str(e)}")
 
-    def get_embedding(self, text: str) -> list[float]:
+    async def get_embedding(self, text: str) -> list[float]:
         """Get embedding for a single text."""
         try:
-            response = self.embed_text([text])
+            response = await self.embed_text([text])
             return response["embeddings"][0]
         except Exception as e:
             raise Exception(f"Single text embedding failed: {str(e)}")
 
+    async def rerank(self, query: str, documents: list[str], top_n: int = None) -> list[tuple[int, float]]:
+        """Score documents against a query with Cohere's rerank API.
+
+        Returns (document index, relevance score) pairs, best first.
+        """
+        try:
+            response = await self.client.rerank(
+                model=self.rerank_model,
+                query=query,
+                documents=documents,
+                top_n=top_n or len(documents)
+            )
+
+            return [(result.index, result.relevance_score) for result in response.results]
+        except Exception as e:
+            raise Exception(f"Rerank failed: {str(e)}")
+
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]) -> list[dict]:
+        """Return a new message list: the history followed by the new message"""
+        return [
+            self.prepare_message(message["role"], message.get("content", ""))
+            for message in messages
+            if message.get("role") in ["system", "user", "assistant"]
+        ] + [new_message]
+
+    def prepare_message(self, role: str, content: str) -> Dict[str, str]:
+        return {"role": role, "content": content}
+
     def get_embedding_model(self) -> str:
         return self.embedding_model
 
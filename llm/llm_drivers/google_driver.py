@@ -1,9 +1,56 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
 import google.generativeai as genai
-from ..llm_base import LLMBase
-import functools
+from ..llm_base import LLMBase, StreamEvent
 
-from ..llm_enums import LLMProvider
+from ..llm_enums import LLMProvider, EmbeddingInputType
+
+
+def history_fingerprint(contents: list[dict]) -> str:
+    """Hash Gemini `contents` (roles and parts), to check a pooled session holds exactly this history."""
+    payload = json.dumps([[content["role"], content["parts"]] for content in contents], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChatSessionPool:
+    """
+    Bounded pool of Gemini chat sessions keyed by conversation id, with a TTL.
+
+    A session is taken out of the pool while a request uses it, so concurrent
+    requests of one conversation never share (and corrupt) a session. Each
+    session is stored with the fingerprint of its history and only handed out
+    for the same history, so a conversation whose stored history was edited
+    or summarised, or whose session answered a different prompt (RAG sends
+    the packed prompt, stores the question), starts a fresh session.
+    """
+
+    def __init__(self, max_sessions: int = 256, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict[str, tuple[float, str, Any]] = OrderedDict()
+
+    def take(self, conversation_id: str, fingerprint: str):
+        """Remove and return a live session whose history has `fingerprint`, else None."""
+        entry = self._sessions.pop(conversation_id, None)
+        if entry is None:
+            return None
+        expires_at, session_fingerprint, chat = entry
+        if expires_at <= time.monotonic() or session_fingerprint != fingerprint:
+            return None
+        return chat
+
+    def put(self, conversation_id: str, chat, fingerprint: str):
+        self._sessions[conversation_id] = (time.monotonic() + self.ttl_seconds, fingerprint, chat)
+        self._sessions.move_to_end(conversation_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def clear(self):
+        self._sessions.clear()
 
 
 class GoogleDriver(LLMBase):
@@ -16,20 +63,26 @@ class GoogleDriver(LLMBase):
         model_version: str = "2.0-flash",
         temperature: float = 0.7,
         max_input_tokens: int = 30000,
-        max_output_tokens: int = 2048
+        max_output_tokens: int = 2048,
+        client_registry=None,
+        session_pool_size: int = 256,
+        session_ttl_seconds: float = 1800
     ):
         """
         Initialize the Google Gemini driver with the specified parameters
         """
+        self.session_pool = ChatSessionPool(max_sessions=session_pool_size, ttl_seconds=session_ttl_seconds)
         super().__init__(
             model_name=model_name,
             model_version=model_version,
             api_key=api_key,
             temperature=temperature,
             max_input_tokens=max_input_tokens,
-            max_output_tokens=max_output_tokens
+            max_output_tokens=max_output_tokens,
+            client_registry=client_registry
         )
-        self.generation_model = "gemini-2.0-flash"
+        self.generation_model = f"{model_name}-{model_version}"
+        self.embedding_model = "models/text-embedding-004"
         self.provider = LLMProvider.GOOGLE.value
 
     def _initialize_client(self):
@@ -37,20 +90,21 @@ class GoogleDriver(LLMBase):
         Initializes the client with the specified configuration.
 
         Sets up the GenerativeModel client using the provided API key and model name.
-        This method configures the client and prepares it for usage.
+        This method configures the client and prepares it for usage. The Gemini SDK
+        talks gRPC over its own channel, so a client registry is not used here.
 
         :rtype: None
         """
         genai.configure(api_key=self.api_key)
         self.client = genai.GenerativeModel(
-            model_name=self.model_name,
+            model_name=f"{self.model_name}-{self.model_version}",
         )
 
     @property
     async def available_models(self) -> list[str]:
         """Get list of available Gemini models"""
         try:
-            models = genai.list_models()
+            models = await asyncio.to_thread(lambda: list(genai.list_models()))
             return [model.name for model in models if "gemini" in model.name]
         except Exception as e:
             print(f"Error fetching available models: {str(e)}")
@@ -59,69 +113,155 @@ class GoogleDriver(LLMBase):
     def set_generation_model(self, model_version: str):
         """Set a new generation model version"""
         self.model_version = model_version
-        new_model = f"{self.model_name}-{model_version}"
-        if new_model in self.available_models:
-         self.generation_model= f"{self.model_name}-{model_version}"
+        self.generation_model = f"{self.model_name}-{model_version}"
+        self.client = genai.GenerativeModel(model_name=self.generation_model)
+        # Pooled sessions are bound to the previous model
+        self.session_pool.clear()
 
     def set_embedding_model(self, model_version: str):
-        """Set embedding model - Currently not supported in Gemini"""
-        raise NotImplementedError("Embedding models are not yet supported in Gemini API")
-
-    @functools.lru_cache(maxsize=128)
-    def _create_chat_session(self):
-        """Create a new chat session with caching"""
-
-        return self.client.start_chat(history=[])
+        """Set the Gemini embedding model, e.g. "text-embedding-004" """
+        self.embedding_model = f"models/{model_version}"
 
     async def generate_text(
         self,
         user_message: str,
         temperature: float = None,
         max_output_tokens: int = None,
-        messages: list[dict] = None
+        messages: list[dict] = None,
+        conversation_id: str = None
     ) -> Dict[str, Any]:
         """
+        Generate a reply with a Gemini chat session.
+
+        The history is handed to `start_chat(history=...)` and goes out with the
+        new message in a single request. With a `conversation_id`, the session
+        is kept in the pool and reused on the next turn as long as its history
+        is exactly `messages` (see `ChatSessionPool`).
+
+        Args:
+            user_message (str): The new user message.
+            messages (list[dict]): Previous conversation messages; the list is not modified.
+            conversation_id (str): Optional key of a pooled session.
         """
         try:
-            # Create new chat session
-            chat = self._create_chat_session()
+            history = self._build_contents(messages=messages)
+            chat = self._take_session(conversation_id, history)
 
-            # Update configuration if needed
-            if temperature is not None or max_output_tokens is not None:
-                generation_config = {
+            response = await chat.send_message_async(
+                user_message,
+                generation_config={
                     "temperature": temperature if temperature is not None else self.temperature,
-                    "max_output_tokens": max_output_tokens if max_output_tokens is not None else self.max_output_tokens,
+                    "max_output_tokens": max_output_tokens or self.max_output_tokens,
                 }
-                chat.model.generation_config.update(generation_config)
+            )
 
-            # Handle history if provided
-            if messages:
-                for msg in messages:
-                    prepared_msg = self.prepare_message(msg["role"], msg["content"])
-                    chat.send_message(prepared_msg["content"])
-
-            # Send message and get response using Flash2 API
-            response = await chat.send_message_async(user_message)
+            self._return_session(conversation_id, chat, history, user_message, response.text)
 
+            usage_metadata = response.usage_metadata
             return {
                 "text": response.text,
-                "model": self.model_name,
+                "model": self.generation_model,
                 "usage": {
-                    "prompt_tokens": getattr(response, "prompt_token_count", None),
-                    "completion_tokens": getattr(response, "candidates_token_count", None),
-                    "total_tokens": None
+                    "prompt_tokens": usage_metadata.prompt_token_count if usage_metadata else None,
+                    "completion_tokens": usage_metadata.candidates_token_count if usage_metadata else None,
+                    "total_tokens": usage_metadata.total_token_count if usage_metadata else None
                 },
-                "finish_reason": getattr(response, "finish_reason", None)
+                "finish_reason": response.candidates[0].finish_reason.name if response.candidates else None
             }
 
         except Exception as e:
+            raise Exception(f"Text generation failed: {str(e)}")
+
+    def _take_session(self, conversation_id: Optional[str], history: list[dict]):
+        chat = self.session_pool.take(conversation_id, history_fingerprint(history)) if conversation_id else None
+        return chat if chat is not None else self.client.start_chat(history=history)
+
+    def _return_session(self, conversation_id: Optional[str], chat, history: list[dict], user_message: str, answer: str):
+        # Pool the session under the history the next turn will send: this one plus the exchange
+        if conversation_id:
+            history = history + [
+                {"role": "user", "parts": [user_message]},
+                {"role": "model", "parts": [answer]},
+            ]
+            self.session_pool.put(conversation_id, chat, history_fingerprint(history))
+
+    def _build_contents(self, user_message: str = None, messages: list[dict] = None) -> list[dict]:
+        """Convert history, plus the new message if given, into Gemini `contents` (assistant -> model role)"""
+        history = self.prepare_history_messages(self.prepare_message("user", user_message or ""), messages or [])
+        if user_message is None:
+            history = history[:-1]
+        return [
+            {
+                "role": "model" if message["role"] == "assistant" else "user",
+                "parts": [message["content"]]
+            }
+            for message in history
+        ]
+
+    async def stream(
+        self,
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
+    ) -> AsyncIterator[StreamEvent]:
+        """Stream text deltas from Gemini, then the final usage. Sessions are pooled as in `generate_text`."""
+        try:
+            history = self._build_contents(messages=messages)
+            chat = self._take_session(conversation_id, history)
+            response = await chat.send_message_async(
+                user_message,
+                generation_config={
+                    "temperature": temperature if temperature is not None else self.temperature,
+                    "max_output_tokens": max_output_tokens or self.max_output_tokens,
+                },
+                stream=True
+            )
+            finish_reason = None
+            usage_metadata = None
+            parts = []
+            async for chunk in response:
+                if chunk.candidates:
+                    candidate = chunk.candidates[0]
+                    if candidate.finish_reason:
+                        finish_reason = candidate.finish_reason.name
+                    if candidate.content.parts:
+                        parts.append(chunk.text)
+                        yield StreamEvent(text=chunk.text)
+                if chunk.usage_metadata:
+                    usage_metadata = chunk.usage_metadata
+
+            # Only a session whose stream completed holds the exchange; an abandoned one is dropped
+            self._return_session(conversation_id, chat, history, user_message, "".join(parts))
+
+            yield StreamEvent(
+                finish_reason=finish_reason,
+                usage={
+                    "prompt_tokens": usage_metadata.prompt_token_count if usage_metadata else None,
+                    "completion_tokens": usage_metadata.candidates_token_count if usage_metadata else None,
+                    "total_tokens": usage_metadata.total_token_count if usage_metadata else None
+                }
+            )
+        except Exception as e:
+            raise Exception(f"Streaming chat failed: {str(e)}")
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> Dict[str, Any]:
+        """Embed a batch of texts with the Gemini embedding API"""
+        task_type = "retrieval_query" if input_type == EmbeddingInputType.QUERY.value else "retrieval_document"
+        try:
+            response = await genai.embed_content_async(
+                model=self.embedding_model,
+                content=texts,
+                task_type=task_type
+            )
             return {
-                "error": str(e),
-                "text": None,
-                "model": self.model_name,
-                "usage": None,
-                "finish_reason": "error"
+                "embeddings": response["embedding"],
+                "model": self.embedding_model,
+                "usage": None
             }
+        except Exception as e:
+            raise Exception(f"Text embedding failed: {str(e)}")
 
     def prepare_history_messages(self, new_message: dict, messages: list[dict]) -> List[Dict[str, str]]:
         """Prepare chat history messages"""
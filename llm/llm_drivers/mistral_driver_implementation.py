@@ -1,9 +1,7 @@
-from typing import Dict, Any, List, Optional
-import mistralai
-from mistralai.client import MistralClient
-from mistralai.models.chat_completion import ChatMessage
-from ..llm_base import LLMBase
-from ..llm_enums import LLMProvider, LLMModelType, DocumentType
+from typing import Dict, Any, List, Optional, AsyncIterator
+from mistralai import Mistral
+from ..llm_base import LLMBase, StreamEvent
+from ..llm_enums import LLMProvider, LLMModelType, DocumentType, EmbeddingInputType
 
 
 class MistralDriver(LLMBase):
@@ -37,7 +35,16 @@ class MistralDriver(LLMBase):
         }
     }
 
-    def __init__(self, api_key: str, model_name: str = "mistral", model_version: str = "small"):
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "mistral",
+        model_version: str = "small",
+        temperature: float = 0.7,
+        max_input_tokens: int = 32768,
+        max_output_tokens: int = 4096,
+        client_registry=None
+    ):
         """
         Initialize Mistral driver with API key and model configuration.
         
@@ -46,20 +53,34 @@ class MistralDriver(LLMBase):
             model_name (str): Base model name (default: "mistral")
             model_version (str): Model version (default: "small")
         """
-        super().__init__(model_name, model_version)
+        super().__init__(
+            model_name=model_name,
+            model_version=model_version,
+            api_key=api_key,
+            temperature=temperature,
+            max_input_tokens=max_input_tokens,
+            max_output_tokens=max_output_tokens,
+            client_registry=client_registry
+        )
         self.provider = LLMProvider.MISTRAL.value
-        self.api_key = api_key
         self.generation_model = f"{model_name}-{model_version}"
         self.embedding_model = "mistral-embed"
-        self._initialize_client()
 
     def _initialize_client(self):
-        """Initialize Mistral API client with error handling."""
+        """Initialize Mistral API client with error handling. Its *_async methods are used throughout."""
         try:
-            self.client = MistralClient(api_key=self.api_key)
+            if self.client_registry is not None:
+                self.client = self.client_registry.get_client(LLMProvider.MISTRAL.value, self.api_key)
+            else:
+                self.client = Mistral(api_key=self.api_key)
         except Exception as e:
             raise ConnectionError(f"Failed to initialize Mistral client: {str(e)}")
 
+    @property
+    async def available_models(self) -> list[str]:
+        """Get list of supported Mistral models"""
+        return list(self.AVAILABLE_MODELS.keys())
+
     def _validate_model(self, model: str):
         """Validate if the model is supported by Mistral."""
         if model not in self.AVAILABLE_MODELS:
@@ -90,40 +111,38 @@ class MistralDriver(LLMBase):
             raise ValueError(f"Unsupported embedding model: {model_version}")
         self.embedding_model = model_version
 
-    def generate_text(
+    def _build_messages(self, user_message: str, messages: list[dict] = None) -> list[dict]:
+        return self.prepare_history_messages(
+            self.prepare_message("user", user_message),
+            messages or []
+        )
+
+    async def generate_text(
         self,
-        temperature: str = None,
-        max_output_tokens: float = None,
-        user_message=None,
-        messages: int = None
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
         ) -> Dict[str, Any]:
         """
         Generate text using Mistral's API.
         
         Args:
-            prompt (str): Input prompt for generation
+            user_message (str): The new user message
             temperature (float): Controls randomness in generation
             max_output_tokens (int): Maximum number of tokens to generate
-            top_p (float): Nucleus sampling parameter
-            top_k (int): Top-k sampling parameter
-            repetition_penalty (float): Penalty for token repetition
+            messages (list[dict]): Previous conversation messages
 
         Returns:
             Dict[str, Any]: Response containing generated text and metadata
-            :param user_message:
         """
         try:
-            messages = [
-                ChatMessage(role="user", content=prompt)
-            ]
-
-            response = self.client.chat(
+            response = await self.client.chat.complete_async(
                 model=self.generation_model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_output_tokens,
-                top_p=top_p,
-                random_seed=None,  # Let API choose random seed
+                messages=self._build_messages(user_message, messages),
+                temperature=temperature if temperature is not None else self.temperature,
+                max_tokens=max_output_tokens or self.max_output_tokens,
             )
 
             return {
@@ -139,19 +158,64 @@ class MistralDriver(LLMBase):
         except Exception as e:
             raise Exception(f"Text generation failed: {str(e)}")
 
-    def embed_text(self, texts: List[str], document_type: str = DocumentType.TEXT.value) -> Dict[str, Any]:
+    async def stream(
+        self,
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
+        ) -> AsyncIterator[StreamEvent]:
+        """
+        Stream chat responses from Mistral.
+
+        Yields:
+            StreamEvent: Generated text deltas, then the final usage
+        """
+        try:
+            response = await self.client.chat.stream_async(
+                model=self.generation_model,
+                messages=self._build_messages(user_message, messages),
+                temperature=temperature if temperature is not None else self.temperature,
+                max_tokens=max_output_tokens or self.max_output_tokens,
+            )
+
+            finish_reason = None
+            usage = None
+            async with response:
+                async for event in response:
+                    choice = event.data.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if event.data.usage:
+                        usage = event.data.usage
+                    if choice.delta.content:
+                        yield StreamEvent(text=choice.delta.content)
+
+            yield StreamEvent(
+                finish_reason=finish_reason,
+                usage={
+                    "prompt_tokens": usage.prompt_tokens if usage else None,
+                    "completion_tokens": usage.completion_tokens if usage else None,
+                    "total_tokens": usage.total_tokens if usage else None
+                }
+            )
+
+        except Exception as e:
+            raise Exception(f"Streaming chat failed: {str(e)}")
+
+    async def embed_text(self, texts: List[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> Dict[str, Any]:
         """
         Generate embeddings for multiple texts.
         
         Args:
             texts (List[str]): List of texts to embed
-            document_type (str): Type of document being embedded
+            input_type (str): Ignored; Mistral embeds queries and documents alike
 
         Returns:
             Dict[str, Any]: Dictionary containing embeddings and metadata
         """
         try:
-            response = self.client.embeddings(
+            response = await self.client.embeddings.create_async(
                 model=self.embedding_model,
                 inputs=texts
             )
@@ -167,7 +231,7 @@ class MistralDriver(LLMBase):
         except Exception as e:
             raise Exception(f"Text embedding failed: {str(e)}")
 
-    def get_embedding(self, text: str) -> List[float]:
+    async def get_embedding(self, text: str) -> List[float]:
         """
         Get embedding for a single text.
         
@@ -178,11 +242,22 @@ class MistralDriver(LLMBase):
             List[float]: Vector embedding
         """
         try:
-            response = self.embed_text([text])
+            response = await self.embed_text([text])
             return response["embeddings"][0]
         except Exception as e:
             raise Exception(f"Single text embedding failed: {str(e)}")
 
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]) -> list[dict]:
+        """Return a new message list: the history followed by the new message"""
+        return [
+            self.prepare_message(message["role"], message.get("content", ""))
+            for message in messages
+            if message.get("role") in ["system", "user", "assistant"]
+        ] + [new_message]
+
+    def prepare_message(self, role: str, content: str) -> Dict[str, str]:
+        return {"role": role, "content": content}
+
     def get_embedding_model(self) -> str:
         """Get the current embedding model name."""
         return self.embedding_model
@@ -206,42 +281,3 @@ class MistralDriver(LLMBase):
     def get_model_context_window(self) -> int:
         """Get the context window size for the current model."""
         return self.AVAILABLE_MODELS[self.generation_model]["context_window"]
-
-    def chat_stream(
-            self,
-            prompt: str,
-            temperature: float = 0.7,
-            max_output_tokens: int = 512,
-            top_p: float = 0.95,
-    ) -> Iterator[str]:
-        """
-        Stream chat responses from Mistral.
-        
-        Args:
-            prompt (str): Input prompt
-            temperature (float): Temperature parameter
-            max_output_tokens (int): Maximum tokens to generate
-            top_p (float): Top-p sampling parameter
-
-        Yields:
-            Iterator[str]: Stream of generated text chunks
-        """
-        try:
-            messages = [
-                ChatMessage(role="user", content=prompt)
-            ]
-
-            stream = self.client.chat_stream(
-                model=self.generation_model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_output_tokens,
-                top_p=top_p,
-            )
-
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-
-        except Exception as e:
-            raise Exception(f"Streaming chat failed: {str(e)}")
\ No newline at end of file
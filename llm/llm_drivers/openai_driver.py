@@ -1,7 +1,8 @@
-from openai import OpenAI
-from ..llm_base import LLMBase
+from typing import AsyncIterator
+from openai import AsyncOpenAI
+from ..llm_base import LLMBase, StreamEvent
 import logging
-from ..llm_enums import LLMProvider, LLMModelType, DocumentType, OpenAIRoles
+from ..llm_enums import LLMProvider, LLMModelType, DocumentType, OpenAIRoles, EmbeddingInputType
 
 
 class OpenAIDriver(LLMBase):
@@ -17,7 +18,8 @@ class OpenAIDriver(LLMBase):
         api_key: str = None,
         temperature: float = 0.7,
         max_input_tokens: int = 4096,
-        max_output_tokens: int = 512
+        max_output_tokens: int = 512,
+        client_registry=None
         ):
 
         super().__init__(
@@ -26,15 +28,29 @@ class OpenAIDriver(LLMBase):
             api_key,
             temperature,
             max_input_tokens,
-            max_output_tokens)
+            max_output_tokens,
+            client_registry)
         self.provider = LLMProvider.OPENAI.value
         self.api_key = api_key
         self.generation_model = f"{model_name}-{model_version}"
         self.embedding_model = "text-embedding-ada-002"  # Default embedding model
 
     def _initialize_client(self) -> None:
-        """Initialize OpenAI client."""
-        self.client = OpenAI(api_key=self.api_key)
+        """Initialize the async OpenAI client."""
+        if self.client_registry is not None:
+            self.client = self.client_registry.get_client(LLMProvider.OPENAI.value, self.api_key)
+        else:
+            self.client = AsyncOpenAI(api_key=self.api_key)
+
+    @property
+    async def available_models(self) -> list[str]:
+        """Get list of available OpenAI models"""
+        try:
+            models = await self.client.models.list()
+            return [model.id for model in models.data]
+        except Exception as e:
+            logging.error(f"Error fetching available OpenAI models: {e}")
+            return []
 
     def set_generation_model(self, model_version: str):
         """Set the generation model version"""
@@ -49,44 +65,124 @@ class OpenAIDriver(LLMBase):
             raise ValueError("Invalid embedding model version. It must be a non-empty string.")
         self.embedding_model = f"text-embedding-{model_version}"
 
-    def generate_text(
+    def _build_messages(self, user_message: str, messages: list[dict] = None) -> list[dict]:
+        return self.prepare_history_messages(
+            self.prepare_message(OpenAIRoles.USER.value, user_message),
+            messages or []
+        )
+
+    async def generate_text(
         self,
         user_message: str,
         temperature: float = None,
         max_output_tokens: int = None,
-        messages: list[dict] = None
-        ):
+        messages: list[dict] = None,
+        conversation_id: str = None
+        ) -> dict:
         """Generate text using OpenAI API
-        :param user_message:
+        :param user_message: The new user message.
+        :param messages: Previous conversation messages; the list is not modified.
         """
-        temperature = temperature or self.temperature
+        temperature = temperature if temperature is not None else self.temperature
         max_output_tokens = max_output_tokens or self.max_output_tokens
-        
-        if messages:
-            try:
-                messages.append(self.prepare_message(OpenAIRoles.USER.value, user_message))
-                response = self.client.chat.completions.create(
-                    model=self.generation_model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_output_tokens
-                )
-                assistant_message = response.choices[0].message.content
-                messages.append(self.prepare_message(OpenAIRoles.ASSISTANT.value, assistant_message))
-                return assistant_message
-            
-            except Exception as e:
-                logging.error(f"Error in OpenAI text generation. Model: {self.generation_model}, Error: {e}")
-                return None
-        else:
-            return None
 
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.generation_model,
+                messages=self._build_messages(user_message, messages),
+                temperature=temperature,
+                max_tokens=max_output_tokens
+            )
+        except Exception as e:
+            logging.error(f"Error in OpenAI text generation. Model: {self.generation_model}, Error: {e}")
+            raise Exception(f"Text generation failed: {str(e)}")
+
+        return {
+            "text": response.choices[0].message.content,
+            "model": self.generation_model,
+            "finish_reason": response.choices[0].finish_reason,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            }
+        }
+
+    async def stream(
+        self,
+        user_message: str,
+        temperature: float = None,
+        max_output_tokens: int = None,
+        messages: list[dict] = None,
+        conversation_id: str = None
+        ) -> AsyncIterator[StreamEvent]:
+        """Stream generated text deltas from OpenAI, then the final usage"""
+        temperature = temperature if temperature is not None else self.temperature
+        max_output_tokens = max_output_tokens or self.max_output_tokens
+
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.generation_model,
+                messages=self._build_messages(user_message, messages),
+                temperature=temperature,
+                max_tokens=max_output_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            finish_reason = None
+            usage = None
+            async with response:
+                async for chunk in response:
+                    if chunk.choices:
+                        choice = chunk.choices[0]
+                        finish_reason = choice.finish_reason or finish_reason
+                        if choice.delta.content:
+                            yield StreamEvent(text=choice.delta.content)
+                    if chunk.usage:
+                        usage = chunk.usage
+
+            yield StreamEvent(
+                finish_reason=finish_reason,
+                usage={
+                    "prompt_tokens": usage.prompt_tokens if usage else None,
+                    "completion_tokens": usage.completion_tokens if usage else None,
+                    "total_tokens": usage.total_tokens if usage else None
+                }
+            )
+        except Exception as e:
+            logging.error(f"Error in OpenAI streaming. Model: {self.generation_model}, Error: {e}")
+            raise Exception(f"Streaming chat failed: {str(e)}")
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> dict:
+        """Embed a batch of texts with the OpenAI embeddings API"""
+        try:
+            response = await self.client.embeddings.create(
+                model=self.embedding_model,
+                input=texts
+            )
+        except Exception as e:
+            logging.error(f"Error in OpenAI embedding. Model: {self.embedding_model}, Error: {e}")
+            raise Exception(f"Text embedding failed: {str(e)}")
+
+        return {
+            "embeddings": [item.embedding for item in response.data],
+            "model": self.embedding_model,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "total_tokens": response.usage.total_tokens
+            }
+        }
 
-    def prepare_history_messages(self, new_message:dict, messages: list[dict]):
-        pass
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]) -> list[dict]:
+        """Return a new message list: the history followed by the new message"""
+        return [
+            self.prepare_message(message["role"], message.get("content", ""))
+            for message in messages
+            if message.get("role") in [role.value for role in OpenAIRoles]
+        ] + [new_message]
 
-    def prepare_message(self, role: str, content: str):
-        return {role: content}
+    def prepare_message(self, role: str, content: str) -> dict:
+        return {"role": role, "content": content}
 
 
     # def embed_text(self, document_type: str):
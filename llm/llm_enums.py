@@ -9,6 +9,7 @@ class LLMProvider(Enum):
     GOOGLE = "google"
     ANTHROPIC = "anthropic"
     COHERE = "cohere"
+    MISTRAL = "mistral"
     HUGGING_FACE = "hugging_face"
 
 
@@ -36,4 +37,12 @@ class DocumentType(Enum):
     TEXT = "text"
     HTML = "html"
     PDF = "pdf"
-    DOCX = "docx"
\ No newline at end of file
+    DOCX = "docx"
+
+
+class EmbeddingInputType(Enum):
+    """
+    An enumeration for what an embedding is used for.
+    """
+    DOCUMENT = "document"
+    QUERY = "query"
@@ -0,0 +1,400 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from .llm_base import LLMBase, StreamEvent
+from .llm_enums import EmbeddingInputType
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `rate_per_minute`.
+
+    Waiters are served in arrival order. The balance may go negative when a
+    caller reports more usage than it reserved; later callers then wait for
+    the debt to be refilled.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Wait until `amount` tokens are available and take them.
+
+        :param amount: Tokens to take; clamped to the bucket capacity.
+        :return: Seconds spent waiting.
+        """
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+        return time.monotonic() - started
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take (negative) tokens without waiting."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderRateLimiter:
+    """
+    Request and token budgets of one provider, shared by every driver of that provider.
+
+    Calls reserve one request and an estimate of their tokens up front, then
+    `settle` the reservation against the usage the driver reports. A 429 with
+    a Retry-After pauses every caller of the provider, not just the one that
+    got it.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.waited_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int = 0):
+        started = time.monotonic()
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None and estimated_tokens:
+            await self.tokens.acquire(estimated_tokens)
+        self.waited_seconds += time.monotonic() - started
+
+    def settle(self, estimated_tokens: int, used_tokens: Optional[int]):
+        """
+        Reconcile a reservation with the tokens actually used.
+
+        :param estimated_tokens: Tokens reserved by `acquire`.
+        :param used_tokens: `usage["total_tokens"]` reported by the driver; None keeps the estimate.
+        """
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.adjust(min(estimated_tokens, self.tokens.capacity) - used_tokens)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_provider_limiters: dict[str, ProviderRateLimiter] = {}
+
+
+def get_provider_limiter(
+        provider: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+) -> ProviderRateLimiter:
+    """
+    Return the process-wide limiter of a provider, creating it with the given budgets on first use.
+    """
+    limiter = _provider_limiters.get(provider)
+    if limiter is None:
+        limiter = ProviderRateLimiter(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+        _provider_limiters[provider] = limiter
+    return limiter
+
+
+def _error_chain(error: BaseException):
+    # Drivers re-raise provider errors as plain `Exception`s; the SDK error is in the context chain
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def error_status_code(error: BaseException) -> Optional[int]:
+    """Find the HTTP status code of a provider error, if any."""
+    for e in _error_chain(error):
+        if isinstance(e, httpx.HTTPStatusError):
+            return e.response.status_code
+        for attr in ("status_code", "code"):
+            value = getattr(e, attr, None)
+            if isinstance(value, int) and value >= 400:
+                return value
+    return None
+
+
+def error_retry_after(error: BaseException) -> Optional[float]:
+    """Read the Retry-After header (seconds) of a provider error, if any."""
+    for e in _error_chain(error):
+        response = getattr(e, "response", None) or getattr(e, "raw_response", None)
+        headers = getattr(response, "headers", None) or getattr(e, "headers", None)
+        if headers and headers.get("retry-after"):
+            try:
+                return float(headers.get("retry-after"))
+            except ValueError:
+                return None
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429s, 5xx and transport errors are retried; other client errors are not."""
+    status_code = error_status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    return any(
+        isinstance(e, (httpx.TransportError, ConnectionError, asyncio.TimeoutError)) or "Connection" in type(e).__name__
+        for e in _error_chain(error)
+    )
+
+
+class RateLimitedLLM(LLMBase):
+    """
+    `LLMBase` wrapper adding a shared per-provider rate limiter, retries and request coalescing.
+
+    Every call first takes one request and its estimated tokens from the
+    provider's `ProviderRateLimiter`, then settles the estimate with the
+    reported usage. Retryable failures (429, 5xx, connection errors) are
+    retried with exponential backoff and full jitter, honouring Retry-After.
+    Identical concurrent `generate_text` / `embed_text` calls share a single
+    provider call. Streams are rate limited and retried until their first
+    event, but not coalesced.
+    """
+
+    def __init__(
+            self,
+            llm: LLMBase,
+            limiter: ProviderRateLimiter,
+            max_retries: int = 4,
+            base_delay: float = 0.5,
+            max_delay: float = 20.0
+    ):
+        """
+        Args:
+            llm (LLMBase): The driver to wrap.
+            limiter (ProviderRateLimiter): The provider's shared limiter, see `get_provider_limiter`.
+            max_retries (int): Retries after the first attempt.
+            base_delay (float): Backoff of the first retry, in seconds; doubles on every retry.
+            max_delay (float): Upper bound of a single backoff, in seconds.
+        """
+        self.llm = llm
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.coalesced_count = 0
+        self.retry_count = 0
+        super().__init__(
+            model_name=llm.model_name,
+            model_version=llm.model_version,
+            api_key=llm.api_key,
+            temperature=llm.temperature,
+            max_input_tokens=llm.max_input_tokens,
+            max_output_tokens=llm.max_output_tokens
+        )
+        self.provider = getattr(llm, "provider", None)
+
+    def _initialize_client(self):
+        """The wrapped driver owns the provider client."""
+        self.client = self.llm.client
+
+    @property
+    def generation_model(self) -> str:
+        return getattr(self.llm, "generation_model", self.llm.model_name)
+
+    @property
+    async def available_models(self) -> list[str]:
+        return await self.llm.available_models
+
+    def set_generation_model(self, model_version: str):
+        self.llm.set_generation_model(model_version)
+
+    def set_embedding_model(self, model_version: str):
+        self.llm.set_embedding_model(model_version)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = error_retry_after(error)
+        if retry_after is not None:
+            self.limiter.pause(retry_after)
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _with_retries(self, call, estimated_tokens: int) -> dict:
+        attempt = 0
+        while True:
+            await self.limiter.acquire(estimated_tokens)
+            try:
+                response = await call()
+            except Exception as e:
+                self.limiter.settle(estimated_tokens, 0)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(
+                    f"{self.provider} call failed (status {error_status_code(e)}), "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s: {e}"
+                )
+                self.retry_count += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.limiter.settle(estimated_tokens, (response.get("usage") or {}).get("total_tokens"))
+            return response
+
+    async def _coalesced(self, key: str, call, estimated_tokens: int) -> dict:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced_count += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._with_retries(call, estimated_tokens)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no duplicate was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    @staticmethod
+    def _request_key(method: str, payload: dict) -> str:
+        return hashlib.sha256(json.dumps([method, payload], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _estimate(self, user_message: str, messages: Optional[list[dict]], max_output_tokens: Optional[int]) -> int:
+        prompt = user_message + "".join(str(message.get("content", "")) for message in messages or [])
+        return count_tokens(prompt) + (max_output_tokens or self.llm.max_output_tokens)
+
+    async def generate_text(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            conversation_id: str = None
+    ) -> dict:
+        kwargs = {
+            "user_message": user_message,
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "messages": messages,
+            "conversation_id": conversation_id,
+        }
+        key = self._request_key("generate_text", {"model": self.generation_model, **kwargs})
+        return await self._coalesced(
+            key,
+            lambda: self.llm.generate_text(**kwargs),
+            self._estimate(user_message, messages, max_output_tokens)
+        )
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> dict:
+        key = self._request_key("embed_text", {
+            "model": getattr(self.llm, "embedding_model", None),
+            "texts": texts,
+            "input_type": input_type,
+        })
+        return await self._coalesced(
+            key,
+            lambda: self.llm.embed_text(texts, input_type=input_type),
+            sum(count_tokens(text) for text in texts)
+        )
+
+    async def stream(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            conversation_id: str = None
+    ) -> AsyncIterator[StreamEvent]:
+        estimated_tokens = self._estimate(user_message, messages, max_output_tokens)
+        attempt = 0
+        while True:
+            await self.limiter.acquire(estimated_tokens)
+            started_streaming = False
+            stream = self.llm.stream(
+                user_message=user_message,
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+                messages=messages,
+                conversation_id=conversation_id
+            )
+            try:
+                async for event in stream:
+                    started_streaming = True
+                    if event.is_final:
+                        self.limiter.settle(estimated_tokens, event.usage.get("total_tokens"))
+                    yield event
+                return
+            except Exception as e:
+                if started_streaming or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                self.limiter.settle(estimated_tokens, 0)
+                delay = self._backoff(attempt, e)
+                logger.warning(f"{self.provider} stream failed, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s: {e}")
+                self.retry_count += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+            finally:
+                await stream.aclose()
+
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]):
+        return self.llm.prepare_history_messages(new_message, messages)
+
+    def prepare_message(self, role: str, content: str):
+        return self.llm.prepare_message(role, content)
+
+    def get_model_context_window(self) -> int:
+        return self.llm.get_model_context_window()
+
+
+def build_rate_limited_llm(
+        llm: LLMBase,
+        rate_limits: Optional[dict] = None,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0
+) -> RateLimitedLLM:
+    """
+    Wrap a driver with its provider's shared limiter.
+
+    :param llm: The driver to wrap.
+    :param rate_limits: Provider -> {"requests_per_minute", "tokens_per_minute"} budgets;
+        providers without an entry are only retried and coalesced.
+    :return: The wrapped driver.
+    """
+    provider = getattr(llm, "provider", None) or type(llm).__name__
+    budgets = (rate_limits or {}).get(provider, {})
+    limiter = get_provider_limiter(
+        provider,
+        requests_per_minute=budgets.get("requests_per_minute"),
+        tokens_per_minute=budgets.get("tokens_per_minute")
+    )
+    return RateLimitedLLM(llm, limiter, max_retries=max_retries, base_delay=base_delay, max_delay=max_delay)
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import numpy as np
+
+from .llm_base import LLMBase, StreamEvent
+from .llm_enums import EmbeddingInputType
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class BackendStats:
+    """
+    Rolling latency and error statistics of one provider/model backend.
+
+    Full generation latencies and stream times to first token are kept in
+    separate windows: a first token arrives long before a whole answer, so
+    mixing them would drag the p95 that `generate_text` hedges on down and
+    fire backups too early.
+    """
+
+    def __init__(self, window: int = 100):
+        self.latencies_ms: deque[float] = deque(maxlen=window)
+        self.first_token_ms: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.unhealthy_until = 0.0
+
+    def record(self, latency_ms: Optional[float], ok: bool, first_token: bool = False):
+        self.outcomes.append(ok)
+        if ok and latency_ms is not None:
+            (self.first_token_ms if first_token else self.latencies_ms).append(latency_ms)
+
+    def record_latency(self, latency_ms: float):
+        """Add a latency sample without an outcome, e.g. the elapsed time of a cancelled hedge loser."""
+        self.latencies_ms.append(latency_ms)
+
+    def percentile(self, q: float, first_token: bool = False) -> Optional[float]:
+        samples = self.first_token_ms if first_token else self.latencies_ms
+        if not samples:
+            return None
+        return float(np.percentile(np.fromiter(samples, dtype=np.float64), q))
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def to_dict(self) -> dict:
+        return {
+            "samples": len(self.outcomes),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "first_token_p50_ms": self.percentile(50, first_token=True),
+            "first_token_p95_ms": self.percentile(95, first_token=True),
+            "error_rate": self.error_rate,
+            "healthy": self.unhealthy_until <= time.monotonic(),
+        }
+
+
+class LLMRouter(LLMBase):
+    """
+    `LLMBase` driver that routes each generation to the fastest healthy backend.
+
+    Backends are ordered by their rolling median latency; backends without
+    samples yet go first so they get measured. Backends whose context window
+    cannot hold the prompt plus the output budget are skipped. A backend whose
+    error rate crosses `error_threshold` is taken out of rotation for
+    `cooldown_seconds`, then probed again.
+
+    `generate_text` hedges: when the chosen backend has not answered by its
+    p95 latency, the next backend is fired too and the first success wins.
+    Errors fail over to the next backend. `stream` fails over only before the
+    first delta has been sent. Embeddings from different providers are not
+    interchangeable, so `embed_text` always uses `embedding_llm`.
+    """
+
+    def __init__(
+            self,
+            backends: list[LLMBase],
+            embedding_llm: LLMBase = None,
+            stats_window: int = 100,
+            error_threshold: float = 0.5,
+            min_samples: int = 5,
+            cooldown_seconds: float = 30.0,
+            hedge_enabled: bool = True,
+            min_hedge_delay_ms: float = 200.0
+    ):
+        """
+        Args:
+            backends (list[LLMBase]): Candidate drivers, in fallback order before stats exist.
+            embedding_llm (LLMBase): Driver used by `embed_text`. Defaults to the first backend.
+            stats_window (int): Number of recent calls kept per backend.
+            error_threshold (float): Error rate above which a backend is put in cooldown.
+            min_samples (int): Calls needed before the error rate is trusted.
+            cooldown_seconds (float): How long an unhealthy backend is skipped.
+            hedge_enabled (bool): Fire a backup request after the primary's p95 latency.
+            min_hedge_delay_ms (float): Lower bound of the hedge deadline.
+        """
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+
+        self.backends = list(backends)
+        self.embedding_llm = embedding_llm or self.backends[0]
+        self.error_threshold = error_threshold
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_enabled = hedge_enabled
+        self.min_hedge_delay_ms = min_hedge_delay_ms
+        self.stats_window = stats_window
+        self.stats: dict[str, BackendStats] = {
+            self.backend_key(backend): BackendStats(window=stats_window) for backend in self.backends
+        }
+
+        primary = self.backends[0]
+        super().__init__(
+            model_name="router",
+            model_version=primary.model_version,
+            api_key=None,
+            temperature=primary.temperature,
+            max_input_tokens=max(backend.get_model_context_window() for backend in self.backends),
+            max_output_tokens=primary.max_output_tokens
+        )
+        self.provider = "router"
+
+    @staticmethod
+    def backend_key(backend: LLMBase) -> str:
+        model = getattr(backend, "generation_model", None) or backend.model_name
+        return f"{getattr(backend, 'provider', type(backend).__name__)}:{model}"
+
+    def _initialize_client(self):
+        """Each backend owns its provider client."""
+        self.client = None
+
+    @property
+    async def available_models(self) -> list[str]:
+        return [self.backend_key(backend) for backend in self.backends]
+
+    def set_generation_model(self, model_version: str):
+        """
+        Switch the primary backend's generation model; the fallbacks keep theirs.
+
+        The primary's stats start over under its new key, since they measured the previous model.
+        """
+        primary = self.backends[0]
+        previous_key = self.backend_key(primary)
+        primary.set_generation_model(model_version)
+        self.stats.pop(previous_key, None)
+        self.stats[self.backend_key(primary)] = BackendStats(window=self.stats_window)
+        self.model_version = model_version
+
+    def set_embedding_model(self, model_version: str):
+        self.embedding_llm.set_embedding_model(model_version)
+
+    def _record(self, backend: LLMBase, started: float, ok: bool, first_token: bool = False):
+        stats = self.stats[self.backend_key(backend)]
+        stats.record((time.perf_counter() - started) * 1000.0 if ok else None, ok, first_token=first_token)
+        if not ok and len(stats.outcomes) >= self.min_samples and stats.error_rate > self.error_threshold:
+            stats.unhealthy_until = time.monotonic() + self.cooldown_seconds
+            logger.warning(
+                f"LLM backend {self.backend_key(backend)} unhealthy "
+                f"(error rate {stats.error_rate:.2f}), cooling down for {self.cooldown_seconds}s"
+            )
+
+    def select_backends(self, required_tokens: int = 0, first_token: bool = False) -> list[LLMBase]:
+        """
+        Order the backends that fit `required_tokens` for a request.
+
+        Healthy backends come first, fastest median latency first; backends in
+        cooldown are appended as a last resort.
+
+        :param required_tokens: Prompt plus output tokens the context window must hold.
+        :param first_token: Rank by time to first token (for streams) instead of full latency.
+        :return: The backends to try, in order.
+        """
+        now = time.monotonic()
+        fitting = [backend for backend in self.backends if backend.get_model_context_window() >= required_tokens]
+        if not fitting:
+            raise ValueError(f"No LLM backend has a context window of {required_tokens} tokens")
+
+        def latency(backend: LLMBase) -> float:
+            p50 = self.stats[self.backend_key(backend)].percentile(50, first_token=first_token)
+            return p50 if p50 is not None else -1.0
+
+        healthy = [b for b in fitting if self.stats[self.backend_key(b)].unhealthy_until <= now]
+        cooling = [b for b in fitting if b not in healthy]
+        return sorted(healthy, key=latency) + sorted(cooling, key=lambda b: self.stats[self.backend_key(b)].unhealthy_until)
+
+    def _required_tokens(self, user_message: str, messages: list[dict], max_output_tokens: int) -> int:
+        prompt = user_message + "".join(str(message.get("content", "")) for message in messages or [])
+        return count_tokens(prompt) + (max_output_tokens or self.max_output_tokens)
+
+    def _hedge_delay(self, backend: LLMBase) -> float:
+        p95 = self.stats[self.backend_key(backend)].percentile(95)
+        return max(p95 if p95 is not None else 0.0, self.min_hedge_delay_ms) / 1000.0
+
+    async def _call(self, backend: LLMBase, kwargs: dict, hedge_losers: set) -> dict:
+        started = time.perf_counter()
+        try:
+            response = await backend.generate_text(**kwargs)
+        except asyncio.CancelledError:
+            if asyncio.current_task() in hedge_losers:
+                # Lost a hedge race: the elapsed time is a lower bound of its latency, record it
+                # so a slow backend is not tried first forever. It neither failed nor succeeded.
+                self.stats[self.backend_key(backend)].record_latency((time.perf_counter() - started) * 1000.0)
+            # Otherwise the caller went away (client disconnect, timeout): nothing was measured
+            raise
+        except Exception:
+            self._record(backend, started, ok=False)
+            raise
+        self._record(backend, started, ok=True)
+        return {**response, "backend": self.backend_key(backend)}
+
+    async def generate_text(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            conversation_id: str = None
+    ) -> dict:
+        """
+        Generate with the fastest healthy backend, hedging and failing over as needed.
+
+        The response carries a `backend` field naming the provider:model that answered.
+        """
+        kwargs = {
+            "user_message": user_message,
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "messages": messages,
+            "conversation_id": conversation_id,
+        }
+        candidates = deque(self.select_backends(self._required_tokens(user_message, messages, max_output_tokens)))
+        pending: dict[asyncio.Task, LLMBase] = {}
+        # Calls the router cancels itself because another backend answered first
+        hedge_losers: set[asyncio.Task] = set()
+        errors = []
+
+        def launch():
+            backend = candidates.popleft()
+            pending[asyncio.create_task(self._call(backend, kwargs, hedge_losers))] = backend
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge_enabled and candidates and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than its p95: fire a backup and take whichever answers first
+                    launch()
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        hedge_losers.update(pending)
+                        return task.result()
+                    errors.append(f"{self.backend_key(backend)}: {task.exception()}")
+                    logger.warning(f"LLM backend {self.backend_key(backend)} failed, failing over: {task.exception()}")
+
+                if not pending and candidates:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise Exception(f"Text generation failed on all backends: {'; '.join(errors)}")
+
+    async def stream(
+            self,
+            user_message: str,
+            temperature: float = None,
+            max_output_tokens: int = None,
+            messages: list[dict] = None,
+            conversation_id: str = None
+    ) -> AsyncIterator[StreamEvent]:
+        """Stream from the fastest healthy backend, failing over until the first delta is sent."""
+        errors = []
+        required_tokens = self._required_tokens(user_message, messages, max_output_tokens)
+        for backend in self.select_backends(required_tokens, first_token=True):
+            started = time.perf_counter()
+            started_streaming = False
+            stream = backend.stream(
+                user_message=user_message,
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+                messages=messages,
+                conversation_id=conversation_id
+            )
+            try:
+                async for event in stream:
+                    if not started_streaming:
+                        # Time to first token is what users feel; it has its own window, see `BackendStats`
+                        self._record(backend, started, ok=True, first_token=True)
+                        started_streaming = True
+                    yield event
+                return
+            except Exception as e:
+                if started_streaming:
+                    raise
+                self._record(backend, started, ok=False)
+                errors.append(f"{self.backend_key(backend)}: {e}")
+                logger.warning(f"LLM backend {self.backend_key(backend)} stream failed, failing over: {e}")
+            finally:
+                await stream.aclose()
+
+        raise Exception(f"Streaming chat failed on all backends: {'; '.join(errors)}")
+
+    async def embed_text(self, texts: list[str], input_type: str = EmbeddingInputType.DOCUMENT.value) -> dict:
+        return await self.embedding_llm.embed_text(texts, input_type=input_type)
+
+    def prepare_history_messages(self, new_message: dict, messages: list[dict]):
+        return self.backends[0].prepare_history_messages(new_message, messages)
+
+    def prepare_message(self, role: str, content: str):
+        return {"role": role, "content": content}
+
+    def get_stats(self) -> dict:
+        return {key: stats.to_dict() for key, stats in self.stats.items()}
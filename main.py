@@ -2,14 +2,30 @@ from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from fastapi import FastAPI
-from sqlalchemy.testing.config import db_url
 
 from routers.base import base_router
 from routers.data import data_router
+from routers.search import search_router
+from routers.chat import chat_router
+from routers.rag import rag_router
 from dotenv import load_dotenv
 import os
 from helpers.config import get_settings
 from utils.database_index_setup import setup_database_indexes
+from retrieval import RetrievalCache, build_rerank_stage, get_index_saver
+from llm.llm_client_registry import LLMClientRegistry
+from llm.llm_drivers import create_driver
+from llm.llm_enums import LLMProvider
+from llm.llm_router import LLMRouter
+from llm.llm_rate_limiter import build_rate_limited_llm
+from llm.llm_batcher import BatchingLLM
+from llm.llm_cache import CachedLLM, GenerationCache
+from models.generation_cache_model import GenerationCacheModel
+from models.retrieval_cache_model import RetrievalCacheModel
+from utils.index_snapshot import import_snapshots
+from utils.admission_control import AdmissionControl, AdmissionMiddleware
+from utils.project_stats_reconciler import run_project_stats_reconciler
+import asyncio
 import logging
 
 # load_dotenv(".env")
@@ -23,16 +39,143 @@ async def lifespan(app: FastAPI):
     # Initialize MongoDB client
     app.mongo_conn = AsyncIOMotorClient(settings.DB_URL)
     app.db_client = app.mongo_conn[settings.DB_NAME]
+    # TTL, shard-key and range-scan indexes the queries below rely on
+    await setup_database_indexes(app.db_client)
+    # One pooled keep-alive transport per LLM provider, shared by every driver
+    app.llm_client_registry = LLMClientRegistry(
+        http2=settings.LLM_HTTP2,
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+        connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+        read_timeout=settings.LLM_READ_TIMEOUT
+    )
+    rate_limit_options = {
+        "rate_limits": settings.LLM_RATE_LIMITS,
+        "max_retries": settings.LLM_MAX_RETRIES,
+        "base_delay": settings.LLM_RETRY_BASE_DELAY,
+        "max_delay": settings.LLM_RETRY_MAX_DELAY,
+    }
+    api_keys = {
+        LLMProvider.OPENAI.value: settings.OPENAI_API_KEY,
+        LLMProvider.ANTHROPIC.value: settings.ANTHROPIC_API_KEY,
+        LLMProvider.MISTRAL.value: settings.MISTRAL_API_KEY,
+        LLMProvider.COHERE.value: settings.COHERE_API_KEY,
+        LLMProvider.GOOGLE.value: settings.GOOGLE_API_KEY,
+    }
+    model_options = {
+        key: value for key, value in {
+            "model_name": settings.GENERATION_MODEL_NAME,
+            "model_version": settings.GENERATION_MODEL_VERSION,
+        }.items() if value
+    }
+    # Drivers are created from the lazy registry: only the configured providers' SDKs get imported
+    app.generation_llm = build_rate_limited_llm(
+        create_driver(
+            settings.GENERATION_PROVIDER,
+            api_key=api_keys[settings.GENERATION_PROVIDER],
+            client_registry=app.llm_client_registry,
+            **model_options
+        ),
+        **rate_limit_options
+    )
+    # Query embeddings of concurrent requests are sent to the provider together
+    app.embedding_llm = BatchingLLM(
+        build_rate_limited_llm(
+            create_driver(
+                settings.EMBEDDING_PROVIDER,
+                api_key=api_keys[settings.EMBEDDING_PROVIDER],
+                client_registry=app.llm_client_registry
+            ),
+            **rate_limit_options
+        ),
+        max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMBEDDING_BATCH_WINDOW_MS
+    )
+    if settings.GENERATION_ROUTER_ENABLED:
+        # Route across every provider with a configured key, the configured provider being the primary
+        app.generation_llm = LLMRouter(
+            backends=[app.generation_llm] + [
+                build_rate_limited_llm(
+                    create_driver(provider, api_key=api_key, client_registry=app.llm_client_registry),
+                    **rate_limit_options
+                )
+                for provider, api_key in api_keys.items()
+                if api_key and provider != settings.GENERATION_PROVIDER
+            ],
+            error_threshold=settings.GENERATION_ROUTER_ERROR_THRESHOLD,
+            cooldown_seconds=settings.GENERATION_ROUTER_COOLDOWN_SECONDS,
+            hedge_enabled=settings.GENERATION_ROUTER_HEDGE_ENABLED,
+            min_hedge_delay_ms=settings.GENERATION_ROUTER_MIN_HEDGE_DELAY_MS
+        )
+    app.generation_cache = None
+    if settings.GENERATION_CACHE_ENABLED:
+        app.generation_cache = GenerationCache(
+            max_entries=settings.GENERATION_CACHE_SIZE,
+            ttl_seconds=settings.GENERATION_CACHE_TTL_SECONDS,
+            semantic_threshold=settings.GENERATION_CACHE_SEMANTIC_THRESHOLD,
+            store=GenerationCacheModel(db_client=app.db_client) if settings.GENERATION_CACHE_SHARED else None
+        )
+        # Semantic lookups embed the question with the embedding model, not the generation driver
+        app.generation_llm = CachedLLM(
+            llm=app.generation_llm,
+            cache=app.generation_cache,
+            embedder=app.embedding_llm
+        )
+    app.retrieval_cache = None
+    if settings.RETRIEVAL_CACHE_ENABLED:
+        app.retrieval_cache = RetrievalCache(
+            max_entries=settings.RETRIEVAL_CACHE_SIZE,
+            ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+            store=RetrievalCacheModel(db_client=app.db_client) if settings.RETRIEVAL_CACHE_SHARED else None
+        )
+    app.admission_control = None
+    if settings.ADMISSION_ENABLED:
+        # Per-project caps and fair queuing for the heavy routes, queries ahead of ingestion
+        app.admission_control = AdmissionControl(
+            max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+            max_bulk_concurrency=settings.ADMISSION_MAX_BULK_CONCURRENCY,
+            tenant_query_concurrency=settings.ADMISSION_TENANT_QUERY_CONCURRENCY,
+            tenant_bulk_concurrency=settings.ADMISSION_TENANT_BULK_CONCURRENCY,
+            tenant_queue_limit=settings.ADMISSION_TENANT_QUEUE_LIMIT,
+            max_queue_wait_seconds=settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+            tenant_weights=settings.ADMISSION_TENANT_WEIGHTS
+        )
+    app.rerank_stage = build_rerank_stage(
+        backend=settings.RERANK_BACKEND,
+        api_key=settings.COHERE_API_KEY,
+        budget_ms=settings.RERANK_BUDGET_MS,
+        batch_size=settings.RERANK_BATCH_SIZE,
+        cache_size=settings.RERANK_CACHE_SIZE,
+        client_registry=app.llm_client_registry
+    )
+
+    if settings.INDEX_SNAPSHOT_DIR:
+        # Bootstrap project indexes from snapshots, catching up from MongoDB
+        await import_snapshots(app.db_client, settings.INDEX_SNAPSHOT_DIR)
+
+    stats_reconciler = None
+    if settings.PROJECT_STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        # Corrects drift in the materialised project counters in the background
+        stats_reconciler = asyncio.create_task(
+            run_project_stats_reconciler(app.db_client, settings.PROJECT_STATS_RECONCILE_INTERVAL_SECONDS)
+        )
 
     try:
         yield
     finally:
-        # Disconnect MongoDB client
+        if stats_reconciler is not None:
+            stats_reconciler.cancel()
+        # Write the index saves still waiting out their debounce
+        await get_index_saver().flush()
+        # Close pooled LLM connections and disconnect MongoDB client
+        await app.llm_client_registry.aclose()
         app.mongo_conn.close()
 
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(AdmissionMiddleware)
 
 
 @app.get("/")
@@ -43,4 +186,7 @@ def welcome():
 
 
 app.include_router(base_router)
-app.include_router(data_router)
\ No newline at end of file
+app.include_router(data_router)
+app.include_router(search_router)
+app.include_router(chat_router)
+app.include_router(rag_router)
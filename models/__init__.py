@@ -1,3 +1,3 @@
 from .enums.responses import ResponseSignal
-from .data import ProcessRequest
+from .data import ProcessRequest, SearchRequest, BatchSearchRequest, ChatRequest, RAGQueryRequest
 from .enums.processing import ProcessingFileTypes
@@ -1,97 +1,291 @@
+from datetime import datetime, timezone
+import logging
 from uuid import UUID
+import numpy as np
+from bson.codec_options import CodecOptions
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo import UpdateOne
 from langchain_core.documents import Document
 
 from models.base_data_model import BaseDataModel
 from models.db_schems import Chunk
 from models.enums.db_collections import Collections
+from models.project_model import ProjectModel
+from utils.token_counter import count_tokens
+from utils.vector_codec import pack_vector, unpack_vector
+
+logger = logging.getLogger(__name__)
 
 
 
 class ChunkModel(BaseDataModel):
+    """
+    Chunks of every project, in one collection sharded on hashed `project_id` plus `file_id`.
+
+    Every query below filters on `project_id`, so a mongos routes it to the
+    shards holding that project instead of broadcasting it; queries on one file
+    also carry `file_id` and go to a single shard. Check the query shapes with
+    `python -m utils.shard_targeting`.
+    """
+
+    SHARD_KEY = [("project_id", "hashed"), ("file_id", 1)]
+
     def __init__(self, db_client):
         super().__init__(db_client)
         self.collection = db_client[Collections.CHUNK_COLLECTION.value]
+        self.project_model = ProjectModel(db_client=db_client)
 
     async def insert_chunk(
             self,
             project_id: str,
             file_id: str,
             chunk_data: list[Document],
-            batch_size: int = 100
+            batch_size: int = 100,
+            embeddings=None,
+            chunk_ids: list[str] = None,
+            chunk_orders: list[int] = None
     ) -> dict:
         """
         Inserts multiple document chunks into the database in batches. This asynchronous
         function processes a list of document chunks, structures them properly, and performs
         bulk insertion using the specified batch size. It ensures each chunk is annotated
-        with an order before insertion.
+        with its order in the file and its estimated token count before insertion.
 
         :param project_id: The ID of the project associated with the document chunks.
         :param file_id: The ID of the file these document chunks are a part of.
         :param chunk_data: A list of `Document` objects representing the document chunks.
         :param batch_size: The size of each batch for bulk insertion. Defaults to 100.
-        :return: A dictionary containing the number of successfully inserted chunks
-            and the total number of chunks processed.
+        :param embeddings: Optional embeddings, one per chunk (None for a chunk left unembedded), stored as packed BSON Binary vectors.
+        :param chunk_ids: Optional pre-assigned ids, e.g. when other chunks must reference them.
+        :param chunk_orders: Optional positions within the file, when some chunks of the file were skipped.
+        :return: A dictionary containing the number of successfully inserted chunks,
+            the total number of chunks processed and the inserted chunk ids.
         :rtype: dict
         """
         if not chunk_data:
-            return {"success_count": 0, "total_count": 0}
+            return {"success_count": 0, "total_count": 0, "inserted_ids": []}
 
         inserted_ids = []
         total_chunks = len(chunk_data)
 
-        for i in range(0, total_chunks, batch_size):
-            chunk_batch = chunk_data[i:i + batch_size]
-            chunk_docs = []
-
-            for idx, chunk in enumerate(chunk_batch):
-                # Create a proper Chunk object with all required fields
-                chunk_obj = Chunk(
-                    project_id=project_id,
-                    file_id=file_id,
-                    chunk_content=chunk.page_content,
-                    chunk_metadata=chunk.metadata,
-                    chunk_order=idx + 1  # Adding required chunk_order field
-                ).to_dict()
-                chunk_docs.append(chunk_obj)
-
-            # Insert the batch and collect IDs
-            
-            result = await self.collection.insert_many(chunk_docs)
-            inserted_ids.extend(result.inserted_ids)
+        try:
+            for i in range(0, total_chunks, batch_size):
+                chunk_batch = chunk_data[i:i + batch_size]
+                chunk_docs = []
+
+                for idx, chunk in enumerate(chunk_batch):
+                    # Create a proper Chunk object with all required fields
+                    chunk_obj = Chunk(
+                        project_id=project_id,
+                        file_id=file_id,
+                        chunk_content=chunk.page_content,
+                        chunk_metadata=chunk.metadata,
+                        # Position within the whole file, not the insert batch
+                        chunk_order=chunk_orders[i + idx] if chunk_orders is not None else i + idx + 1,
+                        chunk_token_count=count_tokens(chunk.page_content),
+                        chunk_embedding=pack_vector(
+                            embeddings[i + idx],
+                            dtype=self.app_settings.VECTOR_STORAGE_DTYPE
+                        ) if embeddings is not None and embeddings[i + idx] is not None else None
+                    ).to_dict()
+                    if chunk_ids is not None:
+                        chunk_obj["_id"] = ObjectId(chunk_ids[i + idx])
+                    chunk_docs.append(chunk_obj)
+
+                # Insert the batch and collect IDs
+                result = await self.collection.insert_many(chunk_docs)
+                inserted_ids.extend(result.inserted_ids)
+                await self.touch_chunks(project_id, result.inserted_ids)
+        finally:
+            # Count the batches that made it in, even if a later one failed
+            if inserted_ids:
+                try:
+                    await self.project_model.update_stats(
+                        project_id,
+                        chunk_count=len(inserted_ids),
+                        index_version=1,
+                        ingested_at=datetime.now(timezone.utc)
+                    )
+                except Exception as e:
+                    # Must not mask an insert error; the reconciler corrects the counters
+                    logger.error(f"Failed to update stats of project {project_id}: {e}")
 
         # Return a simple dictionary without any coroutine objects
         return {
             "success_count": len(inserted_ids),
             "total_count": total_chunks,
+            "inserted_ids": [str(inserted_id) for inserted_id in inserted_ids],
         }
 
-    async def get_chunk_by_id(self, chunk_id: UUID) -> dict:
+    @staticmethod
+    def chunk_filter(project_id: str, chunk_id) -> dict:
+        return {"project_id": project_id, "_id": ObjectId(str(chunk_id))}
+
+    @staticmethod
+    def chunks_filter(project_id: str, chunk_ids: list) -> dict:
+        return {"project_id": project_id, "_id": {"$in": [ObjectId(str(chunk_id)) for chunk_id in chunk_ids]}}
+
+    @staticmethod
+    def file_filter(project_id: str, file_id: str) -> dict:
+        return {"project_id": project_id, "file_id": file_id}
+
+    @staticmethod
+    def windows_filter(project_id: str, windows: list) -> dict:
+        return {
+            "project_id": project_id,
+            "$or": [
+                {"file_id": window.file_id, "chunk_order": {"$gte": window.first_order, "$lte": window.last_order}}
+                for window in windows
+            ],
+        }
+
+    async def touch_chunks(self, project_id: str, chunk_ids: list):
+        """
+        Stamp chunks with the server's time as `updated_at`.
+
+        Ids are generated client-side before a possibly slow insert, so they do
+        not order commits; the server-side stamp does, and is what snapshot
+        catch-up reads from (see `iter_project_chunks`).
+        """
+        if chunk_ids:
+            await self.collection.update_many(
+                self.chunks_filter(project_id, chunk_ids),
+                {"$currentDate": {"updated_at": True}}
+            )
+
+    async def set_chunk_embeddings(self, project_id: str, chunk_ids: list[str], embeddings) -> int:
+        """
+        Store embeddings for existing chunks as packed BSON Binary vectors.
+
+        :param project_id: The project the chunks belong to.
+        :param chunk_ids: The chunk ids, one per embedding.
+        :param embeddings: A sequence or (n, dim) array of embeddings.
+        :return: The count of modified documents.
+        """
+        if not chunk_ids:
+            return 0
+        operations = [
+            UpdateOne(
+                self.chunk_filter(project_id, chunk_id),
+                {
+                    "$set": {"chunk_embedding": pack_vector(embedding, dtype=self.app_settings.VECTOR_STORAGE_DTYPE)},
+                    "$currentDate": {"updated_at": True},
+                }
+            )
+            for chunk_id, embedding in zip(chunk_ids, embeddings)
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def load_project_vectors(self, project_id: str, batch_size: int = 2000) -> tuple[list[str], np.ndarray]:
+        """
+        Bulk-load every stored embedding of a project into one float32 matrix.
+
+        Documents are read as raw BSON with only the `_id` and `chunk_embedding`
+        fields, and each packed vector is copied from its buffer straight into a
+        preallocated row; no per-vector Python lists are built.
+
+        :param project_id: The project whose vectors to load.
+        :param batch_size: Cursor batch size.
+        :return: The chunk ids and a (len(chunk_ids), dim) float32 matrix, row-aligned.
+        """
+        query = {"project_id": project_id, "chunk_embedding": {"$exists": True}}
+        total = await self.collection.count_documents(query)
+        if not total:
+            return [], np.zeros((0, 0), dtype=np.float32)
+
+        raw_collection = self.collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument)
+        )
+        cursor = raw_collection.find(query, projection={"chunk_embedding": 1}, batch_size=batch_size)
+
+        chunk_ids = []
+        matrix = None
+        row = 0
+        async for doc in cursor:
+            if row == total:
+                # Chunks inserted while loading are picked up by the next incremental add.
+                break
+            vector = unpack_vector(doc["chunk_embedding"])
+            if matrix is None:
+                matrix = np.empty((total, vector.shape[0]), dtype=np.float32)
+            matrix[row] = vector
+            chunk_ids.append(str(doc["_id"]))
+            row += 1
+
+        if matrix is None:
+            # Every counted chunk was deleted before the cursor reached it
+            return [], np.zeros((0, 0), dtype=np.float32)
+        return chunk_ids, matrix[:row]
+
+    async def get_chunk_by_id(self, project_id: str, chunk_id: UUID) -> dict:
         """
         Retrieve a single chunk by its unique ID.
         """
-        chunk = await self.collection.find_one({"_id": ObjectId(str(chunk_id))})
+        chunk = await self.collection.find_one(self.chunk_filter(project_id, chunk_id))
         return chunk
 
-    async def update_chunk(self, chunk_id: UUID, update_data: dict) -> int:
+    async def get_chunks_by_ids(self, project_id: str, chunk_ids: list[str], projection: dict = None) -> list:
+        """
+        Retrieve several chunks by id in a single query.
+
+        :param project_id: The project the chunks belong to.
+        :param chunk_ids: The chunk ids to fetch.
+        :param projection: Optional MongoDB projection, e.g. `{"chunk_embedding": 0}` to skip the vectors.
+        :return: A list of chunks as dictionaries, in no particular order.
+        """
+        if not chunk_ids:
+            return []
+        cursor = self.collection.find(self.chunks_filter(project_id, chunk_ids), projection=projection)
+        return await cursor.to_list(length=None)
+
+    async def get_chunk_windows(self, project_id: str, windows: list, projection: dict = None) -> list:
+        """
+        Fetch several runs of consecutive chunks in a single query.
+
+        Each window becomes one `$or` branch on (`file_id`, `chunk_order`), which
+        MongoDB serves as a range scan of `idx_chunk_project_file_order`.
+
+        :param project_id: The project the files belong to.
+        :param windows: Disjoint `ChunkWindow`s, see `build_chunk_windows`.
+        :param projection: Optional MongoDB projection.
+        :return: The chunks as dictionaries, sorted by file and order.
+        """
+        if not windows:
+            return []
+        cursor = self.collection.find(
+            self.windows_filter(project_id, windows),
+            projection=projection
+        ).sort([("file_id", 1), ("chunk_order", 1)])
+        return await cursor.to_list(length=None)
+
+    async def update_chunk(self, project_id: str, chunk_id: UUID, update_data: dict) -> int:
         """
         Update a chunk's data in the database.
 
+        :param project_id: The project the chunk belongs to.
         :param chunk_id: The UUID of the chunk to update.
-        :param update_data: A dictionary with the fields to update.
+        :param update_data: A dictionary with the fields to update; `project_id` and `file_id` are the shard key and stay fixed.
         :return: The count of modified documents.
         """
-        result = await self.collection.update_one({"_id": ObjectId(str(chunk_id))}, {"$set": update_data})
+        result = await self.collection.update_one(
+            self.chunk_filter(project_id, chunk_id),
+            {"$set": update_data, "$currentDate": {"updated_at": True}}
+        )
         return result.modified_count
 
-    async def delete_chunk(self, chunk_id: UUID) -> int:
+    async def delete_chunk(self, project_id: str, chunk_id: UUID) -> int:
         """
         Delete a chunk from the database.
     
+        :param project_id: The project the chunk belongs to.
         :param chunk_id: The UUID of the chunk to delete.
         :return: The count of deleted documents.
         """
-        result = await self.collection.delete_one({"_id": ObjectId(str(chunk_id))})
+        result = await self.collection.delete_one(self.chunk_filter(project_id, chunk_id))
+        if result.deleted_count:
+            await self.project_model.update_stats(project_id, chunk_count=-result.deleted_count, index_version=1)
         return result.deleted_count
 
     async def delete_chunks_by_project_id(self, project_id: str) -> int:
@@ -102,6 +296,8 @@ class ChunkModel(BaseDataModel):
         :return: The count of deleted documents.
         """
         result = await self.collection.delete_many({"project_id": project_id})
+        if result.deleted_count:
+            await self.project_model.update_stats(project_id, chunk_count=-result.deleted_count, index_version=1)
         return result.deleted_count
 
     async def get_chunks_by_project_id(self, project_id: str) -> list:
@@ -114,13 +310,79 @@ class ChunkModel(BaseDataModel):
         cursor = self.collection.find({"project_id": project_id})
         return await cursor.to_list(length=None)
 
+    @staticmethod
+    def project_chunks_filter(project_id: str, updated_since: datetime = None) -> dict:
+        query = {"project_id": project_id}
+        if updated_since is not None:
+            query["updated_at"] = {"$gte": updated_since}
+        return query
+
+    async def count_project_chunks(self, project_id: str, updated_since: datetime = None) -> int:
+        return await self.collection.count_documents(self.project_chunks_filter(project_id, updated_since))
+
+    def iter_project_chunks(self, project_id: str, updated_since: datetime = None, batch_size: int = 2000):
+        """
+        Stream a project's chunks in `_id` order without materialising them in a list.
+
+        :param project_id: The project whose chunks to stream.
+        :param updated_since: Only return chunks inserted or updated at or after this server time.
+        :param batch_size: Cursor batch size.
+        :return: An async cursor over raw BSON chunk documents.
+        """
+        raw_collection = self.collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument)
+        )
+        return raw_collection.find(
+            self.project_chunks_filter(project_id, updated_since),
+            batch_size=batch_size
+        ).sort("_id", 1)
+
+    async def get_server_time(self) -> datetime:
+        """The MongoDB server's clock, the same clock `$currentDate` stamps with."""
+        hello = await self.db_client.command("hello")
+        return hello["localTime"]
+
+    async def get_project_chunk_ids(self, project_id: str) -> set[str]:
+        """
+        Get the ids of all chunks of a project, e.g. to reconcile an index against deletes.
+        """
+        cursor = self.collection.find({"project_id": project_id}, projection={"_id": 1})
+        return {str(doc["_id"]) async for doc in cursor}
+
+    async def get_file_chunk_ids(self, project_id: str, file_id: str) -> list[str]:
+        """
+        Get the ids of a file's chunks, e.g. to replace them when the file is processed again.
+        """
+        cursor = self.collection.find(self.file_filter(project_id, file_id), projection={"_id": 1})
+        return [str(doc["_id"]) async for doc in cursor]
+
+    async def delete_file_chunks(self, project_id: str, file_id: str, chunk_ids: list[str]) -> int:
+        """
+        Delete the given chunks of a file, targeted to the file's shard.
+
+        :param project_id: The project the file belongs to.
+        :param file_id: The file the chunks belong to.
+        :param chunk_ids: The chunks to delete; other chunks of the file are kept.
+        :return: The count of deleted documents.
+        """
+        if not chunk_ids:
+            return 0
+        result = await self.collection.delete_many({
+            **self.chunks_filter(project_id, chunk_ids),
+            "file_id": file_id,
+        })
+        if result.deleted_count:
+            await self.project_model.update_stats(project_id, chunk_count=-result.deleted_count, index_version=1)
+        return result.deleted_count
+
     # In models/chunk_model.py
-    async def get_chunks_by_file_id(self, file_id: str) -> list:
+    async def get_chunks_by_file_id(self, project_id: str, file_id: str) -> list:
         """
         Get all chunks related to a specific file.
 
+        :param project_id: The project the file belongs to.
         :param file_id: The file ID to filter chunks by.
         :return: A list of chunks as dictionaries.
         """
-        cursor = self.collection.find({"file_id": file_id})
+        cursor = self.collection.find(self.file_filter(project_id, file_id)).sort("chunk_order", 1)
         return await cursor.to_list(length=None)
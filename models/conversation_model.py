@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+
+from .base_data_model import BaseDataModel
+from .enums.db_collections import Collections
+
+
+class ConversationModel(BaseDataModel):
+    """
+    Server-side chat history: one document per conversation.
+
+    A conversation holds a rolling `summary` of its older turns and the recent
+    `turns` verbatim, so the whole prompt history is read with one `find_one`.
+    Every turn has a `turn_id`; folding turns into the summary pulls exactly
+    those ids, so turns appended meanwhile are never lost.
+
+    Conversation ids are chosen by clients, so documents are keyed by project
+    and conversation id together (see `conversation_key`): projects using the
+    same id get separate conversations and never see each other's.
+    """
+
+    def __init__(self, db_client):
+        super().__init__(db_client=db_client)
+        self.collection = self.db_client[Collections.CONVERSATION_COLLECTION.value]
+
+    @staticmethod
+    def conversation_key(conversation_id: str, project_id: str) -> dict:
+        return {"project_id": project_id, "conversation_id": conversation_id}
+
+    async def get_conversation(self, conversation_id: str, project_id: str) -> Optional[dict]:
+        """
+        Load a conversation's summary and recent turns.
+
+        :param conversation_id: The conversation id chosen by the client.
+        :param project_id: The project the conversation belongs to.
+        :return: The conversation document, or None for a new conversation.
+        """
+        return await self.collection.find_one(
+            {"_id": self.conversation_key(conversation_id, project_id)},
+            projection={"project_id": 1, "summary": 1, "summary_version": 1, "turns": 1}
+        )
+
+    async def append_turns(self, conversation_id: str, project_id: str, turns: list[dict]) -> None:
+        """
+        Append messages to a conversation, creating it on first use.
+
+        :param conversation_id: The conversation id chosen by the client.
+        :param project_id: The project the conversation belongs to.
+        :param turns: Messages with `role` and `content`, oldest first.
+        """
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"_id": self.conversation_key(conversation_id, project_id)},
+            {
+                "$push": {"turns": {"$each": [
+                    {**turn, "turn_id": str(ObjectId()), "created_at": now} for turn in turns
+                ]}},
+                "$inc": {"turn_count": len(turns)},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"project_id": project_id, "summary": "", "summary_version": 0, "created_at": now},
+            },
+            upsert=True
+        )
+
+    async def apply_summary(
+            self,
+            conversation_id: str,
+            project_id: str,
+            summary: str,
+            summarized_turn_ids: list[str],
+            expected_version: int
+    ) -> bool:
+        """
+        Replace the summary and drop the turns it now covers.
+
+        The update only applies if nobody summarized the conversation since
+        `expected_version` was read.
+
+        :return: True if the summary was applied.
+        """
+        result = await self.collection.update_one(
+            {"_id": self.conversation_key(conversation_id, project_id), "summary_version": expected_version},
+            {
+                "$set": {"summary": summary},
+                "$inc": {"summary_version": 1},
+                "$pull": {"turns": {"turn_id": {"$in": summarized_turn_ids}}},
+            }
+        )
+        return result.modified_count > 0
+
+    async def delete_conversation(self, conversation_id: str, project_id: str) -> int:
+        result = await self.collection.delete_one({"_id": self.conversation_key(conversation_id, project_id)})
+        return result.deleted_count
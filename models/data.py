@@ -8,5 +8,48 @@ class ProcessRequest(BaseModel):
     chunk_size: int = 100
     overlap_size: int = 20
     do_reset: bool = False
+    dedup_mode: Optional[str] = None
 
 
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 10
+    mode: str = "hybrid"
+    query_vector: Optional[list[float]] = None
+    filters: Optional[dict] = None
+    rerank: bool = False
+    rerank_candidates: int = 50
+    rerank_budget_ms: Optional[float] = None
+    neighbours: int = 0
+    section_k: Optional[int] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[str]
+    top_k: int = 10
+    candidate_k: Optional[int] = None
+    mode: str = "hybrid"
+    filters: Optional[dict] = None
+    include_content: bool = True
+
+
+class ChatRequest(BaseModel):
+    message: str
+    conversation_id: Optional[str] = None
+    messages: Optional[list[dict]] = None
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+
+
+class RAGQueryRequest(BaseModel):
+    query: str
+    conversation_id: Optional[str] = None
+    top_k: int = 8
+    candidate_k: Optional[int] = None
+    mode: str = "hybrid"
+    filters: Optional[dict] = None
+    neighbours: int = 0
+    messages: Optional[list[dict]] = None
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+    section_k: Optional[int] = None
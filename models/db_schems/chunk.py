@@ -1,5 +1,7 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
+from bson.binary import Binary
 from utils.mongo_encoders import PydanticObjectId, mongo_config
 
 
@@ -10,6 +12,10 @@ class Chunk(BaseModel):
     chunk_content: str
     chunk_metadata: Dict[str, Any]
     chunk_order: int = Field(..., gt=0)
+    chunk_token_count: Optional[int] = None
+    chunk_embedding: Optional[Binary] = None
+    # Server time of the last write, stamped with $currentDate (see `ChunkModel.touch_chunks`)
+    updated_at: Optional[datetime] = None
 
     model_config = mongo_config
 
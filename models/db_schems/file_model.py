@@ -9,6 +9,7 @@ class File(BaseModel):
     project_id: str = Field(..., min_length=1)
     file_name: str
     file_path: str
+    file_size: Optional[int] = None
     metadata: Optional[dict] = {}
 
     class Config:
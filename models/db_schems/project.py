@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from utils.mongo_encoders import PydanticObjectId, mongo_config
@@ -6,6 +7,14 @@ from utils.mongo_encoders import PydanticObjectId, mongo_config
 class Project(BaseModel):
     id: Optional[PydanticObjectId] = Field(None, alias="_id")
     project_id: str = Field(..., min_length=1)
+    index_version: int = 0
+    # Materialised stats, maintained with $inc by FileModel/ChunkModel (see `ProjectModel.update_stats`)
+    file_count: int = 0
+    chunk_count: int = 0
+    total_bytes: int = 0
+    last_ingested_at: Optional[datetime] = None
+    # Bumped with every counter update, guards the reconciler's corrections
+    stats_version: int = 0
 
     @field_validator('project_id')
     def validate_project_id(cls, value: str) -> str:
@@ -5,3 +5,6 @@ class Collections(Enum):
     PROJECT_COLLECTION = "projects"
     CHUNK_COLLECTION = "chunks"
     FILE_COLLECTION = "files"
+    GENERATION_CACHE_COLLECTION = "generation_cache"
+    RETRIEVAL_CACHE_COLLECTION = "retrieval_cache"
+    CONVERSATION_COLLECTION = "conversations"
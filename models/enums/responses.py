@@ -7,4 +7,21 @@ class ResponseSignal(Enum):
     FILE_INVALID = "File is invalid"
     FILE_UPLOAD_SUCCESS = "File uploaded successfully"
     FILE_UPLOAD_FAILED = "File upload failed"
-    FILE_PROCESSING_FAILED = "File processing failed"
\ No newline at end of file
+    FILE_PROCESSING_FAILED = "File processing failed"
+    FILE_EMBEDDING_FAILED = "File chunks could not be embedded"
+    SEARCH_SUCCESS = "Search completed successfully"
+    SEARCH_INVALID_MODE = "Search mode not supported"
+    SEARCH_FAILED = "Search failed"
+    SEARCH_INVALID_REQUEST = "Search request is invalid"
+    INDEX_REBUILD_SUCCESS = "Index rebuilt successfully"
+    CHAT_STREAM_FAILED = "Chat stream failed"
+    RAG_QUERY_SUCCESS = "RAG query completed successfully"
+    RAG_QUERY_FAILED = "RAG query failed"
+    BATCH_SEARCH_SUCCESS = "Batch search completed successfully"
+    BATCH_SEARCH_FAILED = "Batch search failed"
+    FILE_DEDUP_MODE_INVALID = "Dedup mode not supported"
+    TOO_MANY_REQUESTS = "Too many requests, retry later"
+    SUMMARY_INDEX_BUILD_SUCCESS = "Summary index built successfully"
+    PROJECT_NOT_FOUND = "Project not found"
+    PROJECT_STATS_SUCCESS = "Project stats retrieved successfully"
+    PROJECT_LIST_SUCCESS = "Projects listed successfully"
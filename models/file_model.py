@@ -2,23 +2,33 @@
 from models.base_data_model import BaseDataModel
 from models.chunk_model import ChunkModel
 from models.enums.db_collections import Collections
+from models.project_model import ProjectModel
 from bson import ObjectId
 from typing import List, Dict, Any
 
 
 class FileModel(BaseDataModel):
+    # Files are small and always listed per project: hashed `project_id` alone spreads projects evenly
+    SHARD_KEY = [("project_id", "hashed")]
+
     def __init__(self, db_client):
         super().__init__(db_client)
         self.collection = db_client[Collections.FILE_COLLECTION.value]
+        self.project_model = ProjectModel(db_client=db_client)
 
     async def insert_file(self, file_data: dict) -> dict:
         result = await self.collection.insert_one(file_data)
+        await self.project_model.update_stats(
+            file_data["project_id"],
+            file_count=1,
+            total_bytes=file_data.get("file_size", 0)
+        )
         return {"id": str(result.inserted_id)}
 
-    async def get_file_chunks(self, file_id: str):
+    async def get_file_chunks(self, project_id: str, file_id: str):
         # Get all chunks associated with this file
         chunk_model = ChunkModel(self.db_client)
-        return await chunk_model.get_chunks_by_file_id(file_id)
+        return await chunk_model.get_chunks_by_file_id(project_id=project_id, file_id=file_id)
 
     def _serialize_mongo_doc(self, doc: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -51,3 +61,13 @@ class FileModel(BaseDataModel):
         # Serialize MongoDB documents to make them JSON-serializable
         serialized_documents = [self._serialize_mongo_doc(doc) for doc in documents]
         return serialized_documents
+
+    async def set_file_dedup_stats(self, project_id: str, file_name: str, dedup_stats: dict) -> int:
+        """
+        Record the near-duplicate ratio of a processed file on its record.
+        """
+        result = await self.collection.update_one(
+            {"project_id": project_id, "file_name": file_name},
+            {"$set": {"metadata.dedup": dedup_stats}}
+        )
+        return result.modified_count
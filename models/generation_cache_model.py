@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from .base_data_model import BaseDataModel
+from .enums.db_collections import Collections
+
+
+class GenerationCacheModel(BaseDataModel):
+    """
+    Shared tier of the generation cache, so workers reuse each other's answers.
+
+    Entries are keyed by the exact cache key and expire through a TTL index on
+    `expires_at` (see `setup_database_indexes`).
+    """
+
+    def __init__(self, db_client):
+        super().__init__(db_client=db_client)
+        self.collection = self.db_client[Collections.GENERATION_CACHE_COLLECTION.value]
+
+    async def get_entry(self, cache_key: str) -> Optional[dict]:
+        """
+        Fetch a live cache entry.
+
+        :param cache_key: The exact cache key.
+        :return: The entry's `response` and `project_id`, or None when missing or expired.
+        """
+        record = await self.collection.find_one(
+            {"_id": cache_key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            projection={"response": 1, "project_id": 1}
+        )
+        return record
+
+    async def put_entry(self, cache_key: str, response: dict, project_id: Optional[str], ttl_seconds: float):
+        now = datetime.now(timezone.utc)
+        await self.collection.replace_one(
+            {"_id": cache_key},
+            {
+                "_id": cache_key,
+                "project_id": project_id,
+                "response": response,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ttl_seconds),
+            },
+            upsert=True
+        )
+
+    async def delete_project_entries(self, project_id: str) -> int:
+        result = await self.collection.delete_many({"project_id": project_id})
+        return result.deleted_count
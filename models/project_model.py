@@ -1,9 +1,16 @@
+from datetime import datetime
+from typing import Optional
+
+from pymongo import ReturnDocument
+
 from .base_data_model import BaseDataModel
 from .enums.db_collections import Collections
 from .db_schems.project import Project
 
 
 class ProjectModel(BaseDataModel):
+    STATS_FIELDS = ("file_count", "chunk_count", "total_bytes", "last_ingested_at", "index_version")
+
     def __init__(self, db_client):
         super().__init__(db_client=db_client)
         self.collection = self.db_client[Collections.PROJECT_COLLECTION.value]
@@ -37,7 +44,8 @@ class ProjectModel(BaseDataModel):
         :param page_number: The page number to retrieve data from (default: 1).
         :return: A list of Project instances representing the retrieved project records.
         """
-        total_records = await self.collection.count_documents({})
+        # Collection metadata instead of a full count on every page
+        total_records = await self.collection.estimated_document_count()
         total_pages = (total_records + page_size - 1) // page_size
 
         records_cursor = self.collection.find().skip((page_number - 1) * page_size).limit(page_size)
@@ -46,3 +54,148 @@ class ProjectModel(BaseDataModel):
         projects = [Project(**record) for record in records]
         return projects, total_pages
 
+    async def update_stats(
+            self,
+            project_id: str,
+            file_count: int = 0,
+            chunk_count: int = 0,
+            total_bytes: int = 0,
+            index_version: int = 0,
+            ingested_at: datetime = None
+    ) -> None:
+        """
+        Apply deltas to a project's materialised stats in a single update.
+
+        :param project_id: The project to update.
+        :param file_count: Change in the number of files.
+        :param chunk_count: Change in the number of chunks.
+        :param total_bytes: Change in the total size of the uploaded files.
+        :param index_version: Change in the index version (1 to invalidate caches).
+        :param ingested_at: Time of an ingest; `last_ingested_at` only moves forward.
+        """
+        deltas = {
+            "file_count": file_count,
+            "chunk_count": chunk_count,
+            "total_bytes": total_bytes,
+            "index_version": index_version,
+        }
+        update = {}
+        if any(deltas.values()):
+            # `stats_version` tells `reconcile_stats` that the counters moved while it was counting
+            update["$inc"] = {field: delta for field, delta in deltas.items() if delta}
+            update["$inc"]["stats_version"] = 1
+        if ingested_at is not None:
+            update["$max"] = {"last_ingested_at": ingested_at}
+        if update:
+            await self.collection.update_one({"project_id": project_id}, update, upsert=True)
+
+    async def bump_index_version(self, project_id: str) -> int:
+        """
+        Mark a project's chunks as changed, invalidating everything cached against the previous version.
+
+        :return: The new index version.
+        """
+        record = await self.collection.find_one_and_update(
+            {"project_id": project_id},
+            {"$inc": {"index_version": 1, "stats_version": 1}},
+            projection={"index_version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return record["index_version"]
+
+    async def get_project_stats(self, project_id: str) -> Optional[dict]:
+        """
+        Read a project's materialised stats with one indexed lookup.
+
+        :return: The `STATS_FIELDS`, or None when the project does not exist.
+        """
+        record = await self.collection.find_one(
+            {"project_id": project_id},
+            projection={field: 1 for field in self.STATS_FIELDS}
+        )
+        if record is None:
+            return None
+        return {field: record.get(field, None if field == "last_ingested_at" else 0) for field in self.STATS_FIELDS}
+
+    async def count_project_stats(self, project_id: str) -> dict:
+        """
+        Count a project's files, chunks and bytes from the collections themselves, for reconciliation.
+        """
+        chunk_count = await self.db_client[Collections.CHUNK_COLLECTION.value].count_documents(
+            {"project_id": project_id}
+        )
+        file_totals = await self.db_client[Collections.FILE_COLLECTION.value].aggregate([
+            {"$match": {"project_id": project_id}},
+            {"$group": {
+                "_id": None,
+                "file_count": {"$sum": 1},
+                "total_bytes": {"$sum": {"$ifNull": ["$file_size", 0]}},
+            }},
+        ]).to_list(length=1)
+        file_totals = file_totals[0] if file_totals else {}
+        return {
+            "file_count": file_totals.get("file_count", 0),
+            "chunk_count": chunk_count,
+            "total_bytes": file_totals.get("total_bytes", 0),
+        }
+
+    async def measure_stats_drift(self, project_id: str) -> Optional[tuple[Optional[int], dict, dict]]:
+        """
+        Compare a project's counters with fresh counts.
+
+        :return: The `stats_version` the counters were read at (None for projects
+            created before it existed), the actual counts and the drift per
+            counter; None when the counters moved during the count.
+        """
+        projection = {field: 1 for field in ("file_count", "chunk_count", "total_bytes", "stats_version")}
+        current = await self.collection.find_one({"project_id": project_id}, projection=projection) or {}
+        actual = await self.count_project_stats(project_id)
+        after = await self.collection.find_one({"project_id": project_id}, projection={"stats_version": 1}) or {}
+        if after.get("stats_version") != current.get("stats_version"):
+            return None
+        drift = {
+            field: value - current.get(field, 0)
+            for field, value in actual.items()
+            if value != current.get(field, 0)
+        }
+        return current.get("stats_version"), actual, drift
+
+    async def reconcile_stats(self, project_id: str, pending: dict) -> dict:
+        """
+        Correct drift in a project's counters (e.g. after a partial insert or a manual delete).
+
+        An ingest inserts its documents before it increments the counters, so
+        a count can run ahead of them without any drift. A correction is only
+        applied once the same drift was measured at the same `stats_version`
+        on two consecutive passes, i.e. with no counter update in between. It
+        then `$set`s the counts guarded on that version, so an increment
+        landing meanwhile makes the write miss instead of being overwritten.
+
+        :param pending: Drift seen on the previous pass, per project; owned by the caller and updated here.
+        :return: The corrections applied per counter, empty when none was applied.
+        """
+        measured = await self.measure_stats_drift(project_id)
+        if measured is None or not measured[2]:
+            pending.pop(project_id, None)
+            return {}
+        stats_version, actual, drift = measured
+        if pending.get(project_id) != (stats_version, drift):
+            pending[project_id] = (stats_version, drift)
+            return {}
+
+        pending.pop(project_id, None)
+        result = await self.collection.update_one(
+            {"project_id": project_id, "stats_version": stats_version},
+            {"$set": actual, "$inc": {"stats_version": 1}}
+        )
+        return drift if result.modified_count else {}
+
+    async def iter_project_ids(self, batch_size: int = 500):
+        cursor = self.collection.find({}, projection={"project_id": 1}, batch_size=batch_size)
+        async for record in cursor:
+            yield record["project_id"]
+
+    async def get_index_version(self, project_id: str) -> int:
+        record = await self.collection.find_one({"project_id": project_id}, projection={"index_version": 1})
+        return record.get("index_version", 0) if record else 0
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from .base_data_model import BaseDataModel
+from .enums.db_collections import Collections
+
+
+class RetrievalCacheModel(BaseDataModel):
+    """
+    Shared tier of the retrieval cache, so workers reuse each other's results.
+
+    Keys embed the project's index version, so entries never need explicit
+    invalidation; they expire through a TTL index on `expires_at` (see
+    `setup_database_indexes`).
+    """
+
+    def __init__(self, db_client):
+        super().__init__(db_client=db_client)
+        self.collection = self.db_client[Collections.RETRIEVAL_CACHE_COLLECTION.value]
+
+    async def get_entry(self, cache_key: str) -> Optional[list[tuple[str, float]]]:
+        """
+        Fetch a live cache entry.
+
+        :param cache_key: The exact cache key.
+        :return: The cached (chunk id, score) hits, or None when missing or expired.
+        """
+        record = await self.collection.find_one(
+            {"_id": cache_key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            projection={"hits": 1}
+        )
+        if record is None:
+            return None
+        return [(hit["chunk_id"], hit["score"]) for hit in record["hits"]]
+
+    async def put_entry(self, cache_key: str, hits: list[tuple[str, float]], project_id: str, ttl_seconds: float):
+        now = datetime.now(timezone.utc)
+        await self.collection.replace_one(
+            {"_id": cache_key},
+            {
+                "_id": cache_key,
+                "project_id": project_id,
+                "hits": [{"chunk_id": chunk_id, "score": score} for chunk_id, score in hits],
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ttl_seconds),
+            },
+            upsert=True
+        )
@@ -0,0 +1,17 @@
+from .retrieval_enums import SearchMode, RerankBackend, DedupMode, SummarizerBackend
+from .chunk_id_map import ChunkIdMap
+from .lexical_index import LexicalIndex, tokenize
+from .vector_index import VectorIndex
+from .bitmap import Bitmap
+from .metadata_index import MetadataIndex
+from .fusion import reciprocal_rank_fusion
+from .project_index import ProjectIndex, get_project_index
+from .index_saver import DebouncedSaver, get_index_saver
+from .reranker import (
+    RerankerBase, DriverReranker, LocalReranker, RerankCandidate, RerankResult, RerankStage, build_rerank_stage
+)
+from .context_packer import ContextPacker, ContextSection, PackedContext, context_token_budget
+from .retrieval_cache import RetrievalCache, make_retrieval_cache_key, normalize_query
+from .chunk_windows import ChunkWindow, build_chunk_windows, assign_window_chunks, expand_ranked_chunks
+from .near_duplicates import MinHasher, LSHIndex, get_project_lsh_index
+from .summary_index import SummaryIndex, SummarySection, extractive_summary, get_project_summary_index
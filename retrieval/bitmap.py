@@ -0,0 +1,174 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+
+# Roaring layout: ids are split into a 16-bit high key selecting a container and a
+# 16-bit low part stored in it. Sparse containers are sorted uint16 arrays, dense
+# ones are 8 KiB bitsets; a container switches form at ARRAY_MAX_SIZE entries.
+ARRAY_MAX_SIZE = 4096
+
+
+def _is_bitset(container: np.ndarray) -> bool:
+    return container.dtype == np.uint8
+
+
+def _to_bitset(values: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << 16, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder="little")
+
+
+def _to_values(container: np.ndarray) -> np.ndarray:
+    if _is_bitset(container):
+        return np.flatnonzero(np.unpackbits(container, bitorder="little")).astype(np.uint16)
+    return container
+
+
+def _normalize(container: np.ndarray) -> np.ndarray:
+    """Pick the smaller representation for a container."""
+    if _is_bitset(container):
+        cardinality = int(np.unpackbits(container).sum())
+        return _to_values(container) if cardinality <= ARRAY_MAX_SIZE else container
+    return _to_bitset(container) if len(container) > ARRAY_MAX_SIZE else container
+
+
+def _cardinality(container: np.ndarray) -> int:
+    if _is_bitset(container):
+        return int(np.unpackbits(container).sum())
+    return len(container)
+
+
+class Bitmap:
+    """
+    Compressed set of dense chunk ids, laid out like a roaring bitmap.
+
+    AND / OR / difference work container by container, so combining filters costs
+    time proportional to the selected ids rather than to the size of the project.
+    """
+
+    def __init__(self, ids: Iterable[int] = None):
+        self._containers: dict[int, np.ndarray] = {}
+        if ids is not None:
+            self.add_many(ids)
+
+    @classmethod
+    def _from_containers(cls, containers: dict[int, np.ndarray]) -> "Bitmap":
+        bitmap = cls()
+        bitmap._containers = {key: c for key, c in containers.items() if _cardinality(c)}
+        return bitmap
+
+    def __len__(self) -> int:
+        return sum(_cardinality(container) for container in self._containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __contains__(self, doc_id: int) -> bool:
+        container = self._containers.get(doc_id >> 16)
+        if container is None:
+            return False
+        low = doc_id & 0xFFFF
+        if _is_bitset(container):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        position = np.searchsorted(container, low)
+        return position < len(container) and container[position] == low
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_array().tolist())
+
+    def add(self, doc_id: int):
+        self.add_many([doc_id])
+
+    def add_many(self, doc_ids: Iterable[int]):
+        ids = np.unique(np.fromiter(doc_ids, dtype=np.int64))
+        if not len(ids):
+            return
+        highs = ids >> 16
+        for high in np.unique(highs):
+            lows = (ids[highs == high] & 0xFFFF).astype(np.uint16)
+            container = self._containers.get(int(high))
+            if container is None:
+                merged = lows
+            elif _is_bitset(container):
+                merged = container.copy()
+                np.bitwise_or.at(merged, lows >> 3, (1 << (lows & 7)).astype(np.uint8))
+            else:
+                merged = np.union1d(container, lows)
+            self._containers[int(high)] = _normalize(merged)
+
+    def discard_many(self, doc_ids: Iterable[int]):
+        self._containers = (self - Bitmap(doc_ids))._containers
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        result = {}
+        for key in self._containers.keys() & other._containers.keys():
+            left, right = self._containers[key], other._containers[key]
+            if _is_bitset(left) and _is_bitset(right):
+                result[key] = _normalize(np.bitwise_and(left, right))
+            elif _is_bitset(left) or _is_bitset(right):
+                values, bitset = (right, left) if _is_bitset(left) else (left, right)
+                keep = (bitset[values >> 3] & (1 << (values & 7)).astype(np.uint8)) != 0
+                result[key] = values[keep]
+            else:
+                result[key] = np.intersect1d(left, right, assume_unique=True)
+        return Bitmap._from_containers(result)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        result = dict(self._containers)
+        for key, right in other._containers.items():
+            left = result.get(key)
+            if left is None:
+                result[key] = right
+            elif _is_bitset(left) or _is_bitset(right):
+                left = left if _is_bitset(left) else _to_bitset(left)
+                right = right if _is_bitset(right) else _to_bitset(right)
+                result[key] = np.bitwise_or(left, right)
+            else:
+                result[key] = _normalize(np.union1d(left, right))
+        return Bitmap._from_containers(result)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        result = dict(self._containers)
+        for key in self._containers.keys() & other._containers.keys():
+            left, right = self._containers[key], other._containers[key]
+            if _is_bitset(left):
+                right = right if _is_bitset(right) else _to_bitset(right)
+                result[key] = _normalize(np.bitwise_and(left, np.bitwise_not(right)))
+            else:
+                result[key] = np.setdiff1d(left, _to_values(right), assume_unique=True)
+        return Bitmap._from_containers(result)
+
+    def to_array(self) -> np.ndarray:
+        """
+        Return the ids as a sorted int64 NumPy array.
+        """
+        parts = [
+            (np.int64(key) << 16) + _to_values(self._containers[key]).astype(np.int64)
+            for key in sorted(self._containers)
+        ]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialise as: container count, then per container (key, kind, length, payload).
+        """
+        header = [len(self._containers)]
+        payload = []
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            header.extend([key, int(_is_bitset(container)), len(container)])
+            payload.append(container.tobytes())
+        return np.asarray(header, dtype=np.uint32).tobytes() + b"".join(payload)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Bitmap":
+        count = int(np.frombuffer(data, dtype=np.uint32, count=1)[0])
+        header = np.frombuffer(data, dtype=np.uint32, count=1 + 3 * count)[1:].reshape(count, 3)
+        offset = 4 * (1 + 3 * count)
+        containers = {}
+        for key, is_bitset, length in header.tolist():
+            dtype = np.uint8 if is_bitset else np.uint16
+            size = length * np.dtype(dtype).itemsize
+            containers[key] = np.frombuffer(data, dtype=dtype, count=length, offset=offset).copy()
+            offset += size
+        return cls._from_containers(containers)
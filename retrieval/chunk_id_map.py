@@ -0,0 +1,85 @@
+import json
+from typing import Iterable, Optional
+
+
+class ChunkIdMap:
+    """
+    Maps MongoDB chunk ids to dense integer ids shared by every index of a project.
+
+    Dense ids are handed out in increasing order and never reused, so the lexical
+    postings stay sorted and the vector matrix row of a chunk is its dense id.
+    Fusing results from several indexes is then a plain merge on integers.
+    """
+
+    def __init__(self):
+        self._dense_by_chunk: dict[str, int] = {}
+        self._chunk_by_dense: dict[int, str] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._dense_by_chunk)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return str(chunk_id) in self._dense_by_chunk
+
+    @property
+    def next_id(self) -> int:
+        """The dense id the next new chunk will receive (i.e. the id space upper bound)."""
+        return self._next_id
+
+    def assign(self, chunk_id: str) -> int:
+        """
+        Return the dense id for a chunk, assigning a new one if the chunk is unknown.
+        """
+        chunk_id = str(chunk_id)
+        dense_id = self._dense_by_chunk.get(chunk_id)
+        if dense_id is None:
+            dense_id = self._next_id
+            self._next_id += 1
+            self._dense_by_chunk[chunk_id] = dense_id
+            self._chunk_by_dense[dense_id] = chunk_id
+        return dense_id
+
+    def get_dense_id(self, chunk_id: str) -> Optional[int]:
+        return self._dense_by_chunk.get(str(chunk_id))
+
+    def get_chunk_id(self, dense_id: int) -> Optional[str]:
+        return self._chunk_by_dense.get(int(dense_id))
+
+    def release(self, chunk_id: str) -> Optional[int]:
+        """
+        Forget a chunk. Its dense id is retired and will not be handed out again.
+
+        :return: The released dense id, or None if the chunk was unknown.
+        """
+        dense_id = self._dense_by_chunk.pop(str(chunk_id), None)
+        if dense_id is not None:
+            self._chunk_by_dense.pop(dense_id, None)
+        return dense_id
+
+    def dense_ids(self) -> Iterable[int]:
+        return self._chunk_by_dense.keys()
+
+    def to_dict(self) -> dict:
+        return {
+            "next_id": self._next_id,
+            "chunks": self._dense_by_chunk,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChunkIdMap":
+        id_map = cls()
+        id_map._next_id = int(data.get("next_id", 0))
+        for chunk_id, dense_id in data.get("chunks", {}).items():
+            id_map._dense_by_chunk[chunk_id] = int(dense_id)
+            id_map._chunk_by_dense[int(dense_id)] = chunk_id
+        return id_map
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkIdMap":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ChunkWindow:
+    file_id: str
+    first_order: int
+    last_order: int
+    rank: int
+    hit_chunk_ids: list[str] = field(default_factory=list)
+    chunks: list[dict] = field(default_factory=list)
+
+
+def build_chunk_windows(hit_chunks: list[dict], radius: int) -> list[ChunkWindow]:
+    """
+    Expand each hit to its ±`radius` neighbours and merge windows that overlap or touch.
+
+    :param hit_chunks: Chunk documents (`_id`, `file_id`, `chunk_order`), best first.
+    :param radius: Number of neighbours to add on each side of a hit.
+    :return: Disjoint windows, best-ranked first; a window's rank is that of its best hit.
+    """
+    by_file: dict[str, list[tuple[int, int, int, str]]] = {}
+    for rank, chunk in enumerate(hit_chunks):
+        order = chunk["chunk_order"]
+        by_file.setdefault(chunk["file_id"], []).append(
+            (max(1, order - radius), order + radius, rank, str(chunk["_id"]))
+        )
+
+    windows = []
+    for file_id, ranges in by_file.items():
+        current = None
+        for first, last, rank, chunk_id in sorted(ranges):
+            if current is not None and first <= current.last_order + 1:
+                current.last_order = max(current.last_order, last)
+                current.rank = min(current.rank, rank)
+                current.hit_chunk_ids.append(chunk_id)
+            else:
+                current = ChunkWindow(file_id=file_id, first_order=first, last_order=last, rank=rank, hit_chunk_ids=[chunk_id])
+                windows.append(current)
+
+    return sorted(windows, key=lambda window: window.rank)
+
+
+def assign_window_chunks(windows: list[ChunkWindow], chunks: list[dict]) -> list[ChunkWindow]:
+    """
+    Distribute the chunks fetched for `windows` (see `ChunkModel.get_chunk_windows`) to their window, in file order.
+    """
+    windows_by_file: dict[str, list[ChunkWindow]] = {}
+    for window in windows:
+        windows_by_file.setdefault(window.file_id, []).append(window)
+
+    for chunk in sorted(chunks, key=lambda chunk: chunk["chunk_order"]):
+        for window in windows_by_file.get(chunk["file_id"], []):
+            if window.first_order <= chunk["chunk_order"] <= window.last_order:
+                window.chunks.append(chunk)
+                break
+    return windows
+
+
+def expand_ranked_chunks(hit_chunks: list[dict], window_chunks: list[dict], radius: int) -> list[dict]:
+    """
+    Order hits and their neighbours for packing: each hit, then its neighbours nearest first.
+
+    :param hit_chunks: The retrieved chunk documents, best first.
+    :param window_chunks: The chunks fetched for the hits' windows.
+    :param radius: The neighbour radius the windows were built with.
+    :return: Unique chunk documents, best first.
+    """
+    by_position = {(chunk["file_id"], chunk["chunk_order"]): chunk for chunk in window_chunks}
+    expanded, seen = [], set()
+
+    def add(chunk):
+        if chunk is not None and str(chunk["_id"]) not in seen:
+            seen.add(str(chunk["_id"]))
+            expanded.append(chunk)
+
+    for hit in hit_chunks:
+        add(hit)
+        for distance in range(1, radius + 1):
+            add(by_position.get((hit["file_id"], hit["chunk_order"] - distance)))
+            add(by_position.get((hit["file_id"], hit["chunk_order"] + distance)))
+    return expanded
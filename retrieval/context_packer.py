@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from utils.token_counter import count_tokens
+
+
+@dataclass
+class ContextSection:
+    file_id: str
+    chunk_ids: list[str]
+    first_order: int
+    last_order: int
+    content: str
+    token_count: int
+    rank: int
+
+
+@dataclass
+class PackedContext:
+    sections: list[ContextSection]
+    token_count: int
+    token_budget: int
+    chunk_ids: list[str] = field(default_factory=list)
+    dropped_chunk_ids: list[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return ContextPacker.SEPARATOR.join(section.content for section in self.sections)
+
+
+def context_token_budget(context_window: int, reserved_output_tokens: int, prompt_tokens: int = 0) -> int:
+    """
+    Tokens left for retrieved context once the output and the rest of the prompt are reserved.
+
+    :param context_window: The model's context window, e.g. `LLMBase.get_model_context_window()`.
+    :param reserved_output_tokens: Tokens kept free for the answer.
+    :param prompt_tokens: Tokens of the instructions, history and question.
+    :return: The context budget, never negative.
+    """
+    return max(0, context_window - reserved_output_tokens - prompt_tokens)
+
+
+def overlap_length(left: str, right: str, max_overlap: int) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right`, up to `max_overlap`.
+    """
+    for size in range(min(max_overlap, len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+    """
+    Packs ranked chunks into a prompt context under a token budget.
+
+    Chunks are taken greedily in rank order while they fit. A chunk adjacent
+    (by `chunk_order`) to an already selected chunk of the same file only costs
+    the tokens of its non-overlapping part, since neighbours are merged into
+    one section with the shared overlap (`overlap_size` at ingest) removed.
+    Sections are emitted best-ranked first, each in file order.
+
+    Token counts come from the chunk's `chunk_token_count`, computed at ingest;
+    `token_counter` is only used for chunks stored without one.
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(
+            self,
+            max_overlap_chars: int = 500,
+            token_counter: Callable[[str], int] = count_tokens
+    ):
+        self.max_overlap_chars = max_overlap_chars
+        self.token_counter = token_counter
+        self.separator_tokens = token_counter(self.SEPARATOR)
+
+    def _chunk_tokens(self, chunk: dict) -> int:
+        token_count = chunk.get("chunk_token_count")
+        return token_count if token_count is not None else self.token_counter(chunk["chunk_content"])
+
+    def _overlap(self, previous: dict, current: dict) -> int:
+        """Characters at the start of `current` already contained at the end of `previous`."""
+        previous_meta, current_meta = previous.get("chunk_metadata") or {}, current.get("chunk_metadata") or {}
+        previous_start, current_start = previous_meta.get("start_index"), current_meta.get("start_index")
+        if (
+                previous_start is not None and current_start is not None
+                and previous_meta.get("page") == current_meta.get("page")
+        ):
+            overlap = previous_start + len(previous["chunk_content"]) - current_start
+            return max(0, min(overlap, len(current["chunk_content"])))
+        return overlap_length(previous["chunk_content"], current["chunk_content"], self.max_overlap_chars)
+
+    def _trimmed_tokens(self, chunk: dict, overlap: int) -> int:
+        content_length = len(chunk["chunk_content"])
+        if not overlap or not content_length:
+            return self._chunk_tokens(chunk)
+        # Scale the precomputed count instead of re-tokenizing the trimmed text
+        return max(1, round(self._chunk_tokens(chunk) * (content_length - overlap) / content_length))
+
+    def pack(self, chunks: list[dict], token_budget: int) -> PackedContext:
+        """
+        Select and merge chunks for a prompt.
+
+        :param chunks: Chunk documents (`_id`, `file_id`, `chunk_order`, `chunk_content`,
+            `chunk_metadata`, optional `chunk_token_count`), best first.
+        :param token_budget: Tokens available for the context, see `context_token_budget`.
+        :return: The packed sections with the selected and dropped chunk ids.
+        """
+        selected: dict[tuple[str, int], tuple[int, dict]] = {}
+        dropped: list[str] = []
+        seen: set[str] = set()
+        used = 0
+
+        for rank, chunk in enumerate(chunks):
+            chunk_id = str(chunk["_id"])
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+
+            key = (chunk["file_id"], chunk["chunk_order"])
+            if key in selected:
+                continue
+
+            previous = selected.get((chunk["file_id"], chunk["chunk_order"] - 1))
+            following = selected.get((chunk["file_id"], chunk["chunk_order"] + 1))
+            cost = self._trimmed_tokens(chunk, self._overlap(previous[1], chunk) if previous else 0)
+            if following:
+                # The following chunk's overlap moves to this one: it becomes cheaper by the same amount
+                overlap = self._overlap(chunk, following[1])
+                cost -= self._chunk_tokens(following[1]) - self._trimmed_tokens(following[1], overlap)
+            if not (previous or following):
+                cost += self.separator_tokens if selected else 0
+
+            if used + cost > token_budget:
+                dropped.append(chunk_id)
+                continue
+            selected[key] = (rank, chunk)
+            used += cost
+
+        sections = self._merge(selected)
+        return PackedContext(
+            sections=sections,
+            token_count=sum(section.token_count for section in sections) + self.separator_tokens * max(0, len(sections) - 1),
+            token_budget=token_budget,
+            chunk_ids=[chunk_id for section in sections for chunk_id in section.chunk_ids],
+            dropped_chunk_ids=dropped
+        )
+
+    def _merge(self, selected: dict[tuple[str, int], tuple[int, dict]]) -> list[ContextSection]:
+        sections: list[ContextSection] = []
+        current: Optional[ContextSection] = None
+        previous_chunk: Optional[dict] = None
+
+        for (file_id, chunk_order), (rank, chunk) in sorted(selected.items(), key=lambda item: item[0]):
+            if current is not None and current.file_id == file_id and current.last_order == chunk_order - 1:
+                overlap = self._overlap(previous_chunk, chunk)
+                current.content += chunk["chunk_content"][overlap:]
+                current.chunk_ids.append(str(chunk["_id"]))
+                current.last_order = chunk_order
+                current.token_count += self._trimmed_tokens(chunk, overlap)
+                current.rank = min(current.rank, rank)
+            else:
+                current = ContextSection(
+                    file_id=file_id,
+                    chunk_ids=[str(chunk["_id"])],
+                    first_order=chunk_order,
+                    last_order=chunk_order,
+                    content=chunk["chunk_content"],
+                    token_count=self._chunk_tokens(chunk),
+                    rank=rank
+                )
+                sections.append(current)
+            previous_chunk = chunk
+
+        return sorted(sections, key=lambda section: section.rank)
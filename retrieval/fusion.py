@@ -0,0 +1,27 @@
+from typing import Iterable
+
+
+def reciprocal_rank_fusion(
+        result_lists: Iterable[list[tuple[int, float]]],
+        top_k: int = 10,
+        k: int = 60
+) -> list[tuple[int, float]]:
+    """
+    Fuse several ranked result lists with reciprocal rank fusion.
+
+    Each list contributes 1 / (k + rank) for every doc id it contains. Because all
+    indexes of a project share the dense id space of `ChunkIdMap`, the merge is a
+    single pass over integer ids.
+
+    :param result_lists: Ranked lists of (doc id, score) tuples, best first.
+    :param top_k: The maximum number of fused results to return.
+    :param k: The RRF smoothing constant (60 in the original paper).
+    :return: A list of (doc id, fused score) tuples sorted by descending score.
+    """
+    fused: dict[int, float] = {}
+    for results in result_lists:
+        for rank, (doc_id, _) in enumerate(results, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:top_k]
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class DebouncedSaver:
+    """
+    Coalesces writes of the in-process indexes to disk.
+
+    Saving a project index rewrites all of its files, so saving after every
+    ingested file costs O(project) per file. `schedule` instead writes each
+    key at most once per `delay_seconds`, with the latest save function, in a
+    worker thread; the indexes stay searchable meanwhile and only a crash
+    within the delay loses writes (the chunks themselves are in MongoDB, see
+    `POST /v1/search/rebuild/{project_id}`). Writes of one key never overlap.
+    """
+
+    def __init__(self, delay_seconds: float = 2.0):
+        self.delay_seconds = delay_seconds
+        self._save_fns: dict[Hashable, Callable[[], None]] = {}
+        self._timers: dict[Hashable, asyncio.Task] = {}
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+
+    def schedule(self, key: Hashable, save_fn: Callable[[], None]):
+        """
+        Save `key` with `save_fn` once the delay elapses. Must be called from the event loop.
+
+        :param key: What is saved, e.g. ("index", project_id).
+        :param save_fn: Blocking function writing the current state.
+        """
+        self._save_fns[key] = save_fn
+        if key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().create_task(self._save_later(key))
+
+    async def _save_later(self, key: Hashable):
+        try:
+            await asyncio.sleep(self.delay_seconds)
+        finally:
+            self._timers.pop(key, None)
+        await self._save(key)
+
+    async def _save(self, key: Hashable):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            save_fn = self._save_fns.pop(key, None)
+            if save_fn is None:
+                return
+            try:
+                await asyncio.to_thread(save_fn)
+            except Exception as e:
+                logger.error(f"Saving index {key} failed: {e}")
+
+    async def flush(self):
+        """Write every pending save now, e.g. on shutdown."""
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._timers.clear()
+        for key in list(self._save_fns):
+            await self._save(key)
+
+
+_index_saver = DebouncedSaver()
+
+
+def get_index_saver(delay_seconds: float = None) -> DebouncedSaver:
+    """
+    Return the process-wide index saver, updating its delay when one is given.
+    """
+    if delay_seconds is not None:
+        _index_saver.delay_seconds = delay_seconds
+    return _index_saver
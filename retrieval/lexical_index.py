@@ -0,0 +1,324 @@
+import heapq
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .bitmap import Bitmap
+
+# Compound tokens such as part numbers ("AB-1042/7") or error codes ("E_CONN.12")
+# are kept whole and also split into their alphanumeric parts, so both the exact
+# code and its pieces can match.
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+(?:[-_./:][0-9a-z]+)*")
+TOKEN_PART_PATTERN = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase lexical tokens.
+
+    :param text: The text to tokenize.
+    :return: A list of tokens; compound tokens are followed by their parts.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group(0)
+        tokens.append(token)
+        parts = TOKEN_PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _encode_varint(value: int, buffer: bytearray):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _decode_postings(buffer: bytearray) -> Iterator[tuple[int, int]]:
+    """
+    Decode a postings buffer of (doc id delta, term frequency) varint pairs.
+
+    :return: An iterator of (doc id, term frequency) tuples in increasing doc id order.
+    """
+    doc_id = 0
+    value = shift = 0
+    expect_delta = True
+    for byte in buffer:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if expect_delta:
+            doc_id += value
+        else:
+            yield doc_id, value
+        expect_delta = not expect_delta
+        value = shift = 0
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over chunk contents.
+
+    Postings are stored per term as a bytearray of varint-encoded
+    (doc id delta, term frequency) pairs. Doc ids come from the project's
+    `ChunkIdMap`, so they only ever grow and new postings are plain appends.
+    A forward list of (term id, term frequency) pairs per document makes
+    deletes exact, since only the postings of the removed document's terms are
+    rewritten, and lets highly selective filters score the allowed documents
+    directly instead of walking whole postings lists.
+    """
+
+    META_FILE = "lexical.json"
+    DATA_FILE = "lexical.bin"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_ids: dict[str, int] = {}
+        self._terms: list[str] = []
+        self._postings: list[bytearray] = []
+        self._doc_freq = array("I")
+        self._last_doc = array("q")
+        self._doc_len = array("I")
+        self._doc_terms: dict[int, array] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_terms
+
+    @property
+    def avg_doc_len(self) -> float:
+        return self._total_len / len(self._doc_terms) if self._doc_terms else 0.0
+
+    def _get_or_add_term(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._term_ids[term] = term_id
+            self._terms.append(term)
+            self._postings.append(bytearray())
+            self._doc_freq.append(0)
+            self._last_doc.append(-1)
+        return term_id
+
+    def add(self, doc_id: int, text: str):
+        """
+        Index a document. Re-adding an existing doc id replaces its previous content.
+
+        :param doc_id: Dense chunk id from the project's `ChunkIdMap`.
+        :param text: The chunk content to index.
+        """
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+
+        term_counts = Counter(tokenize(text))
+        doc_terms = array("I")
+        for term, tf in term_counts.items():
+            term_id = self._get_or_add_term(term)
+            last_doc = self._last_doc[term_id]
+            if doc_id > last_doc:
+                postings = self._postings[term_id]
+                _encode_varint(doc_id - last_doc if last_doc >= 0 else doc_id, postings)
+                _encode_varint(tf, postings)
+                self._last_doc[term_id] = doc_id
+            else:
+                # Out-of-order insert (only after a replace of an old doc id).
+                entries = list(_decode_postings(self._postings[term_id]))
+                entries.append((doc_id, tf))
+                entries.sort()
+                self._rewrite_postings(term_id, entries)
+            self._doc_freq[term_id] += 1
+            doc_terms.extend((term_id, tf))
+
+        doc_len = sum(term_counts.values())
+        if doc_id >= len(self._doc_len):
+            self._doc_len.extend([0] * (doc_id + 1 - len(self._doc_len)))
+        self._doc_len[doc_id] = doc_len
+        self._doc_terms[doc_id] = doc_terms
+        self._total_len += doc_len
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Remove a document from the index.
+
+        :param doc_id: Dense chunk id to remove.
+        :return: True if the document was indexed.
+        """
+        doc_terms = self._doc_terms.pop(doc_id, None)
+        if doc_terms is None:
+            return False
+
+        for term_id in doc_terms[0::2]:
+            entries = [entry for entry in _decode_postings(self._postings[term_id]) if entry[0] != doc_id]
+            self._rewrite_postings(term_id, entries)
+            self._doc_freq[term_id] -= 1
+
+        self._total_len -= self._doc_len[doc_id]
+        self._doc_len[doc_id] = 0
+        return True
+
+    def _rewrite_postings(self, term_id: int, entries: list[tuple[int, int]]):
+        postings = bytearray()
+        previous = 0
+        for doc_id, tf in entries:
+            _encode_varint(doc_id - previous, postings)
+            _encode_varint(tf, postings)
+            previous = doc_id
+        self._postings[term_id] = postings
+        self._last_doc[term_id] = entries[-1][0] if entries else -1
+
+    def search(self, query: str, top_k: int = 10, mask: Bitmap = None) -> list[tuple[int, float]]:
+        """
+        Score documents against a query with BM25.
+
+        :param query: The query text.
+        :param top_k: The maximum number of results to return.
+        :param mask: Optional bitmap of the only doc ids allowed in the results.
+        :return: A list of (doc id, score) tuples sorted by descending score.
+        """
+        doc_count = len(self._doc_terms)
+        if not doc_count or top_k <= 0 or (mask is not None and not mask):
+            return []
+
+        idfs: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            term_id = self._term_ids.get(term)
+            if term_id is None or not self._doc_freq[term_id]:
+                continue
+            doc_freq = self._doc_freq[term_id]
+            idfs[term_id] = math.log(1.0 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+        if not idfs:
+            return []
+
+        posting_count = sum(self._doc_freq[term_id] for term_id in idfs)
+        if mask is not None and len(mask) < posting_count:
+            scores = self._score_documents(idfs, mask)
+        else:
+            scores = self._score_postings(idfs, mask)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def _term_score(self, idf: float, tf: int, doc_id: int, avg_doc_len: float) -> float:
+        norm = self.k1 * (1.0 - self.b + self.b * self._doc_len[doc_id] / avg_doc_len)
+        return idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+    def _score_postings(self, idfs: dict[int, float], mask: Bitmap = None) -> dict[int, float]:
+        """Term-at-a-time scoring over the postings lists of the query terms."""
+        avg_doc_len = self.avg_doc_len or 1.0
+        allowed = None
+        if mask is not None:
+            ids = mask.to_array()
+            allowed = np.zeros(len(self._doc_len), dtype=np.bool_)
+            allowed[ids[ids < len(allowed)]] = True
+            allowed = allowed.tobytes()
+
+        scores: dict[int, float] = {}
+        for term_id, idf in idfs.items():
+            for doc_id, tf in _decode_postings(self._postings[term_id]):
+                if allowed is not None and not allowed[doc_id]:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + self._term_score(idf, tf, doc_id, avg_doc_len)
+        return scores
+
+    def _score_documents(self, idfs: dict[int, float], mask: Bitmap) -> dict[int, float]:
+        """Document-at-a-time scoring of only the allowed docs, via the forward lists."""
+        avg_doc_len = self.avg_doc_len or 1.0
+        scores: dict[int, float] = {}
+        for doc_id in mask:
+            doc_terms = self._doc_terms.get(doc_id)
+            if doc_terms is None:
+                continue
+            score = 0.0
+            for term_id, tf in zip(doc_terms[0::2], doc_terms[1::2]):
+                idf = idfs.get(term_id)
+                if idf is not None:
+                    score += self._term_score(idf, tf, doc_id, avg_doc_len)
+            if score:
+                scores[doc_id] = score
+        return scores
+
+    def save(self, index_dir: str):
+        """
+        Persist the index into `index_dir` as a JSON header plus one binary blob.
+        """
+        offsets = array("Q", [0])
+        for postings in self._postings:
+            offsets.append(offsets[-1] + len(postings))
+
+        doc_ids = array("I", self._doc_terms.keys())
+        doc_term_counts = array("I", (len(terms) for terms in self._doc_terms.values()))
+
+        meta = {
+            "k1": self.k1,
+            "b": self.b,
+            "terms": self._terms,
+            "total_len": self._total_len,
+            "doc_len_size": len(self._doc_len),
+            "doc_count": len(doc_ids),
+            "doc_term_total": sum(doc_term_counts),
+        }
+        with open(os.path.join(index_dir, self.DATA_FILE), "wb") as f:
+            offsets.tofile(f)
+            self._doc_freq.tofile(f)
+            self._last_doc.tofile(f)
+            self._doc_len.tofile(f)
+            doc_ids.tofile(f)
+            doc_term_counts.tofile(f)
+            for terms in self._doc_terms.values():
+                terms.tofile(f)
+            for postings in self._postings:
+                f.write(postings)
+        with open(os.path.join(index_dir, self.META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["LexicalIndex"]:
+        """
+        Load an index saved with `save`.
+
+        :return: The loaded index, or None if nothing was saved in `index_dir`.
+        """
+        meta_path = os.path.join(index_dir, cls.META_FILE)
+        data_path = os.path.join(index_dir, cls.DATA_FILE)
+        if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+            return None
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index._terms = meta["terms"]
+        index._term_ids = {term: term_id for term_id, term in enumerate(index._terms)}
+        index._total_len = meta["total_len"]
+        term_count = len(index._terms)
+
+        with open(data_path, "rb") as f:
+            offsets = array("Q")
+            offsets.fromfile(f, term_count + 1)
+            index._doc_freq.fromfile(f, term_count)
+            index._last_doc.fromfile(f, term_count)
+            index._doc_len.fromfile(f, meta["doc_len_size"])
+            doc_ids = array("I")
+            doc_ids.fromfile(f, meta["doc_count"])
+            doc_term_counts = array("I")
+            doc_term_counts.fromfile(f, meta["doc_count"])
+            for doc_id, count in zip(doc_ids, doc_term_counts):
+                terms = array("I")
+                terms.fromfile(f, count)
+                index._doc_terms[doc_id] = terms
+            blob = f.read()
+
+        index._postings = [bytearray(blob[offsets[i]:offsets[i + 1]]) for i in range(term_count)]
+        return index
@@ -0,0 +1,139 @@
+import json
+import os
+from typing import Any, Optional
+
+from .bitmap import Bitmap
+
+DEFAULT_FILTER_FIELDS = ("file_id", "page", "content_type")
+
+
+class MetadataIndex:
+    """
+    Per-field bitmaps over dense chunk ids, used to pre-filter search.
+
+    Each indexed field maps every scalar value seen at ingest to the `Bitmap`
+    of chunks carrying it. Filters use a small Mongo-like syntax:
+
+    - ``{"file_id": "a"}`` matches one value,
+    - ``{"page": [1, 2]}`` or ``{"page": {"$in": [1, 2]}}`` matches any value,
+    - several fields in one dict are ANDed,
+    - ``{"$and": [...]}`` and ``{"$or": [...]}`` combine sub-filters.
+    """
+
+    META_FILE = "metadata.json"
+    DATA_FILE = "metadata.bin"
+
+    def __init__(self, fields: tuple[str, ...] = DEFAULT_FILTER_FIELDS):
+        self.fields = tuple(fields)
+        self._bitmaps: dict[str, dict[Any, Bitmap]] = {field: {} for field in self.fields}
+
+    def add(self, doc_ids: list[int], metadatas: list[dict]):
+        """
+        Index the filterable fields of a batch of chunks.
+
+        :param doc_ids: Dense chunk ids.
+        :param metadatas: Flat field -> value dicts, one per chunk.
+        """
+        grouped: dict[str, dict[Any, list[int]]] = {field: {} for field in self.fields}
+        for doc_id, metadata in zip(doc_ids, metadatas):
+            for field in self.fields:
+                value = metadata.get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    grouped[field].setdefault(value, []).append(doc_id)
+
+        for field, values in grouped.items():
+            for value, ids in values.items():
+                self._bitmaps[field].setdefault(value, Bitmap()).add_many(ids)
+
+    def remove(self, doc_ids: list[int]):
+        removed = Bitmap(doc_ids)
+        for bitmaps in self._bitmaps.values():
+            for value in list(bitmaps):
+                remaining = bitmaps[value] - removed
+                if remaining:
+                    bitmaps[value] = remaining
+                else:
+                    del bitmaps[value]
+
+    def value_bitmaps(self, field: str) -> dict[Any, Bitmap]:
+        """
+        The bitmap of every value indexed for `field`, e.g. the chunks of each file for "file_id".
+        """
+        return dict(self._bitmaps.get(field, {}))
+
+    def _match_field(self, field: str, condition: Any) -> Bitmap:
+        if field not in self._bitmaps:
+            raise ValueError(f"Field '{field}' is not filterable. Filterable fields: {list(self.fields)}")
+
+        if isinstance(condition, dict):
+            if set(condition) != {"$in"}:
+                raise ValueError(f"Unsupported condition for field '{field}': {condition}")
+            condition = condition["$in"]
+        values = condition if isinstance(condition, list) else [condition]
+
+        result = Bitmap()
+        for value in values:
+            bitmap = self._bitmaps[field].get(value)
+            if bitmap is not None:
+                result = result | bitmap
+        return result
+
+    def evaluate(self, filters: dict) -> Bitmap:
+        """
+        Evaluate a filter into the bitmap of matching chunk ids.
+
+        :param filters: A filter dict, see the class docstring.
+        :return: The matching dense chunk ids.
+        """
+        result: Optional[Bitmap] = None
+        for key, condition in filters.items():
+            if key == "$and":
+                matched = None
+                for sub_filter in condition:
+                    sub_result = self.evaluate(sub_filter)
+                    matched = sub_result if matched is None else matched & sub_result
+                matched = matched if matched is not None else Bitmap()
+            elif key == "$or":
+                matched = Bitmap()
+                for sub_filter in condition:
+                    matched = matched | self.evaluate(sub_filter)
+            else:
+                matched = self._match_field(key, condition)
+
+            result = matched if result is None else result & matched
+            if not result:
+                break
+        return result if result is not None else Bitmap()
+
+    def save(self, index_dir: str):
+        entries = []
+        blobs = []
+        offset = 0
+        for field, bitmaps in self._bitmaps.items():
+            for value, bitmap in bitmaps.items():
+                blob = bitmap.to_bytes()
+                entries.append([field, value, offset, len(blob)])
+                blobs.append(blob)
+                offset += len(blob)
+
+        with open(os.path.join(index_dir, self.DATA_FILE), "wb") as f:
+            f.write(b"".join(blobs))
+        with open(os.path.join(index_dir, self.META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"fields": list(self.fields), "entries": entries}, f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["MetadataIndex"]:
+        meta_path = os.path.join(index_dir, cls.META_FILE)
+        data_path = os.path.join(index_dir, cls.DATA_FILE)
+        if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+            return None
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            blob = f.read()
+
+        index = cls(fields=tuple(meta["fields"]))
+        for field, value, offset, length in meta["entries"]:
+            index._bitmaps.setdefault(field, {})[value] = Bitmap.from_bytes(blob[offset:offset + length])
+        return index
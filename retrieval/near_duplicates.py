@@ -0,0 +1,201 @@
+import functools
+import json
+import logging
+import os
+import threading
+import zlib
+from typing import Hashable, Optional
+
+import numpy as np
+
+from .lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime larger than every 32-bit shingle hash, so (a * x + b) mod p is a universal hash
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHasher:
+    """
+    MinHash signatures of texts over word shingles.
+
+    Shingles are hashed with CRC32, which is stable across processes, so
+    signatures stored on disk stay comparable after a restart. The
+    `num_perm` permutations are evaluated for all shingles of a text with
+    one vectorised numpy expression.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set[int]:
+        tokens = tokenize(text)
+        size = min(self.shingle_size, len(tokens)) or 1
+        return {
+            zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8"))
+            for i in range(max(1, len(tokens) - size + 1))
+        }
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(self.shingles(text), dtype=np.uint64)
+        # (num_perm, shingles): a * x stays below 2**64 since both factors are below 2**32
+        permuted = ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=1)
+
+    def signatures(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.num_perm), dtype=np.uint64)
+        return np.vstack([self.signature(text) for text in texts])
+
+
+def estimate_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    return float(np.mean(left == right))
+
+
+def optimal_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Pick the (bands, rows) split of a signature with the least false positive
+    plus false negative probability mass around `threshold`.
+
+    A pair with Jaccard similarity s becomes a candidate with probability
+    1 - (1 - s**rows)**bands; both error masses are integrated over s.
+    """
+    similarities = np.linspace(0.0, 1.0, 201)
+    below, above = similarities <= threshold, similarities >= threshold
+    best, best_error = (1, num_perm), None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            probabilities = 1.0 - (1.0 - similarities ** rows) ** bands
+            error = (
+                np.trapz(probabilities[below], similarities[below])
+                + np.trapz(1.0 - probabilities[above], similarities[above])
+            )
+            if best_error is None or error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_optimal_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    return optimal_bands(threshold, num_perm)
+
+
+class LSHIndex:
+    """
+    Banded LSH index of MinHash signatures for near-duplicate lookup.
+
+    A signature is split into `bands` bands of `rows` values; texts sharing any
+    whole band are candidates, and candidates are confirmed by their estimated
+    Jaccard similarity. A lookup is one dict probe per band, independent of
+    the number of indexed chunks.
+
+    Methods do not lock; ingestion runs them in worker threads holding `lock`,
+    so a lookup-then-insert pass and a save never interleave.
+    """
+
+    SIGNATURES_FILE = "minhash_signatures.npy"
+    KEYS_FILE = "minhash_keys.json"
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _cached_optimal_bands(threshold, num_perm)
+        self._buckets: list[dict[bytes, set[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: dict[Hashable, np.ndarray] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def insert(self, key: Hashable, signature: np.ndarray):
+        if key in self._signatures:
+            self.remove(key)
+        self._signatures[key] = signature
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable) -> bool:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return False
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            keys = bucket.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[band_key]
+        return True
+
+    def query(self, signature: np.ndarray, exclude: Optional[set] = None) -> Optional[tuple[Hashable, float]]:
+        """
+        Find the most similar indexed text at or above the threshold.
+
+        :param signature: A `MinHasher` signature.
+        :param exclude: Keys that must not match, e.g. chunks about to be replaced.
+        :return: The (key, estimated Jaccard similarity) of the best match, or None.
+        """
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        if exclude:
+            candidates -= exclude
+
+        best = None
+        for key in candidates:
+            similarity = estimate_jaccard(signature, self._signatures[key])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        keys = list(self._signatures)
+        signatures = np.vstack([self._signatures[key] for key in keys]) if keys else np.empty((0, self.num_perm), dtype=np.uint64)
+        np.save(os.path.join(index_dir, self.SIGNATURES_FILE), signatures)
+        with open(os.path.join(index_dir, self.KEYS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "num_perm": self.num_perm, "keys": keys}, f)
+
+    @classmethod
+    def load(cls, index_dir: str, threshold: float = 0.8, num_perm: int = 128) -> "LSHIndex":
+        """
+        Load a project's LSH index, or return an empty one if none was saved yet.
+
+        The saved signatures are re-banded when `threshold` changed.
+        """
+        index = cls(threshold=threshold, num_perm=num_perm)
+        keys_path = os.path.join(index_dir, cls.KEYS_FILE)
+        signatures_path = os.path.join(index_dir, cls.SIGNATURES_FILE)
+        if not (os.path.exists(keys_path) and os.path.exists(signatures_path)):
+            return index
+
+        with open(keys_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["num_perm"] != num_perm:
+            logger.warning(f"Ignoring MinHash signatures in {index_dir}: built with {meta['num_perm']} permutations")
+            return index
+        for key, signature in zip(meta["keys"], np.load(signatures_path)):
+            index.insert(key, signature)
+        return index
+
+
+_project_lsh_indexes: dict[str, LSHIndex] = {}
+
+
+def get_project_lsh_index(project_id: str, index_dir: str, threshold: float = 0.8, num_perm: int = 128) -> LSHIndex:
+    """
+    Return the in-process near-duplicate index of a project, loading it from `index_dir` on first use.
+    """
+    index = _project_lsh_indexes.get(project_id)
+    if index is None or index.threshold != threshold or index.num_perm != num_perm:
+        index = LSHIndex.load(index_dir, threshold=threshold, num_perm=num_perm)
+        _project_lsh_indexes[project_id] = index
+    return index
@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+from typing import Optional
+
+from .bitmap import Bitmap
+from .chunk_id_map import ChunkIdMap
+from .fusion import reciprocal_rank_fusion
+from .lexical_index import LexicalIndex
+from .metadata_index import MetadataIndex
+from .retrieval_enums import SearchMode
+from .rw_lock import ReadWriteLock
+from .vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectIndex:
+    """
+    All retrieval indexes of one project, sharing a single chunk-id space.
+
+    Searches may run in worker threads while chunks are added or removed, so
+    every public method holds `lock`: reads share it, writes hold it alone.
+    """
+
+    ID_MAP_FILE = "chunk_ids.json"
+    VERSION_FILE = "index_version.json"
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        # The project's `index_version` whose chunk changes this index is known to contain
+        self.applied_version = 0
+        self.id_map = ChunkIdMap()
+        self.lexical = LexicalIndex()
+        self.vector = VectorIndex()
+        self.metadata = MetadataIndex()
+        self.lock = ReadWriteLock()
+
+    def add_chunks(self, chunk_ids: list[str], contents: list[str], metadatas: list[dict] = None, vectors=None):
+        """
+        Index (or re-index) chunks in the lexical and metadata indexes and, when
+        vectors are given, the vector index.
+
+        :param chunk_ids: MongoDB ids of the chunks.
+        :param contents: The `chunk_content` of each chunk.
+        :param metadatas: Optional filterable fields of each chunk (e.g. `file_id`, `page`).
+        :param vectors: Optional embeddings, one per chunk.
+        """
+        with self.lock.write():
+            known_ids = [self.id_map.get_dense_id(chunk_id) for chunk_id in chunk_ids]
+            self.metadata.remove([doc_id for doc_id in known_ids if doc_id is not None])
+
+            doc_ids = [self.id_map.assign(chunk_id) for chunk_id in chunk_ids]
+            for doc_id, content in zip(doc_ids, contents):
+                self.lexical.add(doc_id, content)
+            if metadatas is not None:
+                self.metadata.add(doc_ids, metadatas)
+            if vectors is not None:
+                self.vector.add(doc_ids, vectors)
+
+    def add_vectors(self, chunk_ids: list[str], vectors):
+        with self.lock.write():
+            doc_ids = [self.id_map.assign(chunk_id) for chunk_id in chunk_ids]
+            self.vector.add(doc_ids, vectors)
+
+    def rebuild_vectors(self, chunk_ids: list[str], vectors):
+        """
+        Replace the vector index with a bulk-loaded matrix, e.g. from `ChunkModel.load_project_vectors`.
+        """
+        with self.lock.write():
+            doc_ids = [self.id_map.assign(chunk_id) for chunk_id in chunk_ids]
+            vector_index = VectorIndex(initial_capacity=max(self.id_map.next_id, 1))
+            vector_index.add(doc_ids, vectors)
+            self.vector = vector_index
+
+    def remove_chunks(self, chunk_ids: list[str]) -> int:
+        """
+        Remove chunks from every index.
+
+        :return: The number of chunks that were indexed.
+        """
+        with self.lock.write():
+            removed = []
+            for chunk_id in chunk_ids:
+                doc_id = self.id_map.release(chunk_id)
+                if doc_id is None:
+                    continue
+                self.lexical.remove(doc_id)
+                self.vector.remove(doc_id)
+                removed.append(doc_id)
+            self.metadata.remove(removed)
+            return len(removed)
+
+    def search(
+            self,
+            query: str,
+            query_vector=None,
+            mode: SearchMode = SearchMode.HYBRID,
+            top_k: int = 10,
+            candidate_k: Optional[int] = None,
+            filters: Optional[dict] = None,
+            restrict: Optional[Bitmap] = None,
+    ) -> list[tuple[str, float]]:
+        """
+        Search the project.
+
+        In hybrid mode the lexical and vector legs each return `candidate_k`
+        results which are fused with reciprocal rank fusion. If no query vector
+        is given, hybrid search degrades to lexical search. Filters are resolved
+        to a bitmap before scoring, so every leg only scores matching chunks.
+
+        :param query: The query text.
+        :param query_vector: The query embedding, required for vector search.
+        :param mode: The `SearchMode` to use.
+        :param top_k: The number of results to return.
+        :param candidate_k: Per-leg candidate count for hybrid search (default: 4 * top_k).
+        :param filters: Optional metadata filter, see `MetadataIndex`.
+        :param restrict: Optional bitmap of the only doc ids to score, e.g. from `SummaryIndex.chunk_mask`.
+        :return: A list of (chunk id, score) tuples sorted by descending score.
+        """
+        with self.lock.read():
+            mask = self._resolve_filters(filters, restrict=restrict)
+            if mask is not None and not mask:
+                return []
+
+            if mode == SearchMode.LEXICAL or (mode == SearchMode.HYBRID and query_vector is None):
+                results = self.lexical.search(query, top_k=top_k, mask=mask)
+            elif mode == SearchMode.VECTOR:
+                if query_vector is None:
+                    raise ValueError("Vector search requires a query vector.")
+                results = self.vector.search(query_vector, top_k=top_k, mask=mask)
+            else:
+                candidate_k = candidate_k or top_k * 4
+                results = reciprocal_rank_fusion(
+                    [
+                        self.lexical.search(query, top_k=candidate_k, mask=mask),
+                        self.vector.search(query_vector, top_k=candidate_k, mask=mask),
+                    ],
+                    top_k=top_k,
+                )
+
+            return self.to_chunk_ids(results)
+
+    def search_batch(
+            self,
+            queries: list[str],
+            query_vectors=None,
+            mode: SearchMode = SearchMode.HYBRID,
+            top_k: int = 10,
+            candidate_k: Optional[int] = None,
+            filters: Optional[dict] = None,
+    ) -> list[list[tuple[str, float]]]:
+        """
+        Search the project for several queries at once.
+
+        Behaves like `search` for each query, but the filter is resolved once
+        and the vector leg scores all queries with a single matrix-matrix
+        product. The lexical leg still runs per query.
+
+        :param queries: The query texts.
+        :param query_vectors: Optional query embeddings, one row per query.
+        :param mode: The `SearchMode` to use.
+        :param top_k: The number of results per query.
+        :param candidate_k: Per-leg candidate count for hybrid search (default: 4 * top_k).
+        :param filters: Optional metadata filter shared by all queries, see `MetadataIndex`.
+        :return: One list of (chunk id, score) tuples per query.
+        """
+        if mode == SearchMode.VECTOR and query_vectors is None:
+            raise ValueError("Vector search requires a query vector.")
+        use_lexical = mode != SearchMode.VECTOR
+        use_vector = mode != SearchMode.LEXICAL and query_vectors is not None
+        leg_k = (candidate_k or top_k * 4) if use_lexical and use_vector else top_k
+
+        with self.lock.read():
+            mask = self._resolve_filters(filters)
+            if mask is not None and not mask:
+                return [[] for _ in queries]
+
+            vector_results = self.vector.search_batch(query_vectors, top_k=leg_k, mask=mask) if use_vector else None
+            batch_results = []
+            for i, query in enumerate(queries):
+                legs = []
+                if use_lexical:
+                    legs.append(self.lexical.search(query, top_k=leg_k, mask=mask))
+                if use_vector:
+                    legs.append(vector_results[i])
+                results = reciprocal_rank_fusion(legs, top_k=top_k) if len(legs) > 1 else legs[0][:top_k]
+                batch_results.append(self.to_chunk_ids(results))
+            return batch_results
+
+    def lexical_search(self, query: str, top_k: int = 10, mask: Optional[Bitmap] = None) -> list[tuple[int, float]]:
+        """The lexical leg alone, by dense id, e.g. to run it concurrently with the vector leg."""
+        with self.lock.read():
+            return self.lexical.search(query, top_k=top_k, mask=mask)
+
+    def vector_search(self, query_vector, top_k: int = 10, mask: Optional[Bitmap] = None) -> list[tuple[int, float]]:
+        """The vector leg alone, by dense id, e.g. to run it concurrently with the lexical leg."""
+        with self.lock.read():
+            return self.vector.search(query_vector, top_k=top_k, mask=mask)
+
+    def resolve_filters(self, filters: Optional[dict], restrict: Optional[Bitmap] = None):
+        """
+        Resolve a metadata filter to a bitmap once, so it can be shared by several search legs.
+
+        :param filters: Optional metadata filter, see `MetadataIndex`.
+        :param restrict: Optional bitmap the result is intersected with.
+        :return: The matching doc ids, or None when there is neither a filter nor a restriction.
+        """
+        with self.lock.read():
+            return self._resolve_filters(filters, restrict=restrict)
+
+    def _resolve_filters(self, filters: Optional[dict], restrict: Optional[Bitmap] = None):
+        mask = self.metadata.evaluate(filters) if filters else None
+        if restrict is not None:
+            mask = restrict if mask is None else mask & restrict
+        return mask
+
+    def to_chunk_ids(self, results: list[tuple[int, float]]) -> list[tuple[str, float]]:
+        """
+        Map (doc id, score) results to chunk ids.
+
+        Needs no lock: dense ids are never reused, so a result either maps to
+        its chunk or, when the chunk was removed since it was scored, is dropped.
+        """
+        chunk_ids = [(self.id_map.get_chunk_id(doc_id), score) for doc_id, score in results]
+        return [(chunk_id, score) for chunk_id, score in chunk_ids if chunk_id is not None]
+
+    def save(self):
+        # Searches go on while the files are written; only writes wait
+        with self.lock.read():
+            os.makedirs(self.index_dir, exist_ok=True)
+            self.lexical.save(self.index_dir)
+            self.vector.save(self.index_dir)
+            self.metadata.save(self.index_dir)
+            self.id_map.save(os.path.join(self.index_dir, self.ID_MAP_FILE))
+            with open(os.path.join(self.index_dir, self.VERSION_FILE), "w", encoding="utf-8") as f:
+                json.dump({"applied_version": self.applied_version}, f)
+
+    @classmethod
+    def read_saved_version(cls, index_dir: str) -> int:
+        """
+        The `applied_version` of the index saved in `index_dir`, 0 when none was saved.
+        """
+        version_path = os.path.join(index_dir, cls.VERSION_FILE)
+        if not os.path.exists(version_path):
+            return 0
+        with open(version_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("applied_version", 0)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "ProjectIndex":
+        """
+        Load a project index from disk, or return an empty one if none was saved yet.
+        """
+        index = cls(index_dir)
+        id_map_path = os.path.join(index_dir, cls.ID_MAP_FILE)
+        if not os.path.exists(id_map_path):
+            return index
+
+        index.id_map = ChunkIdMap.load(id_map_path)
+        index.lexical = LexicalIndex.load(index_dir) or LexicalIndex()
+        index.vector = VectorIndex.load(index_dir) or VectorIndex()
+        index.metadata = MetadataIndex.load(index_dir) or MetadataIndex()
+        index.applied_version = cls.read_saved_version(index_dir)
+        logger.info(f"Loaded index from {index_dir} with {len(index.id_map)} chunks")
+        return index
+
+
+_project_indexes: dict[str, ProjectIndex] = {}
+
+
+def get_project_index(project_id: str, index_dir: str) -> ProjectIndex:
+    """
+    Return the in-process index of a project, loading it from `index_dir` on first use.
+    """
+    index = _project_indexes.get(project_id)
+    if index is None:
+        index = ProjectIndex.load(index_dir)
+        _project_indexes[project_id] = index
+    return index
+
+
+def set_project_index(project_id: str, project_index: ProjectIndex):
+    """
+    Replace the in-process index of a project, e.g. after importing a snapshot.
+    """
+    _project_indexes[project_id] = project_index
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .lexical_index import tokenize
+from .retrieval_enums import RerankBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RerankerBase(ABC):
+    """
+    Scores (query, document) pairs for the second retrieval stage.
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    async def score(self, query: str, documents: list[str]) -> list[float]:
+        """
+        Score a batch of documents against a query.
+
+        Args:
+            query (str): The user query.
+            documents (list[str]): Candidate chunk contents.
+
+        Returns:
+            list[float]: One relevance score per document, higher is better.
+        """
+        pass
+
+
+class DriverReranker(RerankerBase):
+    """
+    Reranker backed by a provider rerank API exposed by an LLM driver (e.g. `CohereDriver.rerank`).
+    """
+
+    name = "driver"
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.name = f"driver:{getattr(driver, 'provider', type(driver).__name__)}"
+
+    async def score(self, query: str, documents: list[str]) -> list[float]:
+        results = await self.driver.rerank(query, documents)
+        scores = [0.0] * len(documents)
+        for index, relevance_score in results:
+            scores[index] = relevance_score
+        return scores
+
+
+def term_coverage_score(query: str, document: str) -> float:
+    """
+    Fraction of distinct query tokens found in the document, with a small bonus for exact phrase matches.
+    """
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return 0.0
+    document_terms = set(tokenize(document))
+    coverage = len(query_terms & document_terms) / len(query_terms)
+    return coverage + (0.5 if query.lower() in document.lower() else 0.0)
+
+
+class LocalReranker(RerankerBase):
+    """
+    In-process reranker around a (query, document) -> score callable.
+
+    Defaults to `term_coverage_score`; a local cross-encoder can be plugged in
+    by passing its predict function.
+    """
+
+    name = "local"
+
+    def __init__(self, score_fn: Callable[[str, str], float] = term_coverage_score):
+        self.score_fn = score_fn
+
+    async def score(self, query: str, documents: list[str]) -> list[float]:
+        return await asyncio.to_thread(lambda: [self.score_fn(query, document) for document in documents])
+
+
+@dataclass
+class RerankCandidate:
+    chunk_id: str
+    content: str
+    score: float
+
+
+@dataclass
+class RerankResult:
+    candidates: list[RerankCandidate]
+    rerank_ms: float
+    reranked_count: int
+    cached_count: int = 0
+    budget_exceeded: bool = False
+    scores: dict[str, float] = field(default_factory=dict)
+
+
+class RerankStage:
+    """
+    Reranks first-stage candidates within a hard latency budget.
+
+    Candidates are scored in batches, best first-stage candidates first. When
+    the budget runs out the remaining candidates keep their first-stage order
+    after the reranked ones. Scores are cached per (query, chunk id) pair.
+    """
+
+    def __init__(
+            self,
+            reranker: RerankerBase,
+            budget_ms: float = 300,
+            batch_size: int = 16,
+            cache_size: int = 10000
+    ):
+        self.reranker = reranker
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def _cache_get(self, key: tuple[str, str]) -> Optional[float]:
+        score = self._cache.get(key)
+        if score is not None:
+            self._cache.move_to_end(key)
+        return score
+
+    def _cache_put(self, key: tuple[str, str], score: float):
+        self._cache[key] = score
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def rerank(
+            self,
+            query: str,
+            candidates: list[RerankCandidate],
+            budget_ms: Optional[float] = None
+    ) -> RerankResult:
+        """
+        Rerank candidates given in first-stage order.
+
+        :param query: The user query.
+        :param candidates: First-stage candidates, best first.
+        :param budget_ms: Override of the stage latency budget for this call.
+        :return: A `RerankResult` with the new order and timing information.
+        """
+        started = time.perf_counter()
+        deadline = started + (budget_ms if budget_ms is not None else self.budget_ms) / 1000.0
+
+        scores: dict[str, float] = {}
+        pending = []
+        for candidate in candidates:
+            cached = self._cache_get((query, candidate.chunk_id))
+            if cached is None:
+                pending.append(candidate)
+            else:
+                scores[candidate.chunk_id] = cached
+        cached_count = len(scores)
+
+        budget_exceeded = False
+        for i in range(0, len(pending), self.batch_size):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                budget_exceeded = True
+                break
+
+            batch = pending[i:i + self.batch_size]
+            try:
+                batch_scores = await asyncio.wait_for(
+                    self.reranker.score(query, [candidate.content for candidate in batch]),
+                    timeout=remaining
+                )
+            except asyncio.TimeoutError:
+                budget_exceeded = True
+                break
+            except Exception as e:
+                logger.error(f"Rerank batch failed with {self.reranker.name}: {e}")
+                break
+
+            for candidate, score in zip(batch, batch_scores):
+                scores[candidate.chunk_id] = score
+                self._cache_put((query, candidate.chunk_id), score)
+
+        reranked = sorted(
+            (candidate for candidate in candidates if candidate.chunk_id in scores),
+            key=lambda candidate: scores[candidate.chunk_id],
+            reverse=True
+        )
+        remaining_candidates = [candidate for candidate in candidates if candidate.chunk_id not in scores]
+
+        return RerankResult(
+            candidates=reranked + remaining_candidates,
+            rerank_ms=(time.perf_counter() - started) * 1000.0,
+            reranked_count=len(scores),
+            cached_count=cached_count,
+            budget_exceeded=budget_exceeded,
+            scores=scores
+        )
+
+
+def build_rerank_stage(
+        backend: str,
+        api_key: Optional[str] = None,
+        budget_ms: float = 300,
+        batch_size: int = 16,
+        cache_size: int = 10000,
+        client_registry=None
+) -> RerankStage:
+    """
+    Create the rerank stage for a configured backend.
+
+    :param backend: A `RerankBackend` value.
+    :param api_key: Provider API key, required for provider backends.
+    :param client_registry: Optional `LLMClientRegistry` supplying the pooled provider client.
+    :return: A ready `RerankStage`.
+    """
+    if backend == RerankBackend.COHERE.value:
+        from llm.llm_drivers import create_driver
+        from llm.llm_enums import LLMProvider
+        reranker = DriverReranker(
+            create_driver(LLMProvider.COHERE.value, api_key=api_key, client_registry=client_registry)
+        )
+    elif backend == RerankBackend.LOCAL.value:
+        reranker = LocalReranker()
+    else:
+        raise ValueError(f"Unsupported rerank backend: {backend}")
+
+    return RerankStage(
+        reranker=reranker,
+        budget_ms=budget_ms,
+        batch_size=batch_size,
+        cache_size=cache_size
+    )
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a query for cache keys: the lexical tokens, space separated.
+
+    Queries differing only in case, punctuation or whitespace retrieve the same
+    lexical results, so they share a key.
+    """
+    return " ".join(tokenize(query))
+
+
+def make_retrieval_cache_key(project_id: str, query: str, params: dict, index_version: int) -> str:
+    """
+    Hash everything that determines a retrieval into an exact cache key.
+
+    :param project_id: The searched project.
+    :param query: The raw query text, normalized with `normalize_query`.
+    :param params: The retrieval parameters (mode, top_k, candidate_k, filters, ...).
+    :param index_version: The `index_version` the searched index has applied (see `ProjectIndex.applied_version`).
+    :return: A SHA-256 hex digest.
+    """
+    payload = json.dumps(
+        {
+            "project_id": project_id,
+            "query": normalize_query(query),
+            "params": params,
+            "index_version": index_version,
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RetrievalCache:
+    """
+    Two-tier cache of retrieval results (ranked chunk ids and scores).
+
+    The local tier is a bounded in-process LRU with a TTL, optionally backed
+    by a shared MongoDB tier (`RetrievalCacheModel`) so workers reuse each
+    other's results. Keys include the project's index version, so any insert
+    or delete of the project's chunks makes every older entry unreachable:
+    invalidation is exact and needs no scan. Unreachable entries age out of
+    the LRU and the TTL index.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600, store=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+
+        # key -> (expires_at, hits)
+        self._entries: OrderedDict[str, tuple[float, list[tuple[str, float]]]] = OrderedDict()
+
+        self.hits = {"local": 0, "shared": 0}
+        self.misses = 0
+
+    def _put_local(self, key: str, hits: list[tuple[str, float]]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, hits)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[list[tuple[str, float]]]:
+        """
+        Look a key up in the local tier, then in the shared tier.
+
+        :param key: A key from `make_retrieval_cache_key`.
+        :return: The cached (chunk id, score) hits, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, hits = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits["local"] += 1
+                return hits
+            del self._entries[key]
+
+        if self.store is not None:
+            try:
+                hits = await self.store.get_entry(key)
+            except Exception as e:
+                logger.error(f"Shared retrieval cache lookup failed: {e}")
+                hits = None
+            if hits is not None:
+                self._put_local(key, hits)
+                self.hits["shared"] += 1
+                return hits
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, hits: list[tuple[str, float]], project_id: str, shared: bool = True):
+        """
+        Store hits in the local tier and, unless `shared` is False, in the shared tier.
+
+        :param key: A key from `make_retrieval_cache_key`.
+        :param hits: The (chunk id, score) hits.
+        :param project_id: The searched project.
+        :param shared: False for results of an index behind the project's version, which other workers must not reuse.
+        """
+        hits = [(chunk_id, float(score)) for chunk_id, score in hits]
+        self._put_local(key, hits)
+        if shared and self.store is not None:
+            try:
+                await self.store.put_entry(key, hits=hits, project_id=project_id, ttl_seconds=self.ttl_seconds)
+            except Exception as e:
+                logger.error(f"Shared retrieval cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else None,
+        }
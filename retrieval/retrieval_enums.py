@@ -0,0 +1,34 @@
+from enum import Enum
+
+
+class SearchMode(Enum):
+    """
+    An enumeration for the retrieval strategies supported by a project index.
+    """
+    LEXICAL = "lexical"
+    VECTOR = "vector"
+    HYBRID = "hybrid"
+
+
+class DedupMode(Enum):
+    """
+    An enumeration for what ingestion does with near-duplicate chunks.
+    """
+    DROP = "drop"
+    LINK = "link"
+
+
+class RerankBackend(Enum):
+    """
+    An enumeration for the second-stage reranker backends.
+    """
+    LOCAL = "local"
+    COHERE = "cohere"
+
+
+class SummarizerBackend(Enum):
+    """
+    An enumeration for what writes the section and file summaries of the summary index.
+    """
+    LLM = "llm"
+    EXTRACTIVE = "extractive"
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from .bitmap import Bitmap
+from .lexical_index import tokenize
+from .project_index import ProjectIndex
+from .retrieval_enums import SearchMode
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def fingerprint(texts: list[str]) -> str:
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def extractive_summary(texts: list[str], max_tokens: int) -> str:
+    """
+    Summarise texts without a model: the sentences sharing the most terms with the whole, in their original order.
+
+    Used when no summarisation LLM is configured. The result is deterministic,
+    so it also makes the summary index reproducible offline.
+
+    :param texts: The passages to summarise, in order.
+    :param max_tokens: The token budget of the summary.
+    :return: The selected sentences joined by spaces.
+    """
+    sentences = [sentence.strip() for text in texts for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+    if not sentences:
+        return ""
+    term_counts = Counter(term for sentence in sentences for term in tokenize(sentence))
+
+    def score(sentence: str) -> float:
+        terms = set(tokenize(sentence))
+        return sum(term_counts[term] for term in terms) / (1.0 + len(terms) ** 0.5)
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+    selected, used = [], 0
+    for i in ranked:
+        tokens = count_tokens(sentences[i])
+        if used + tokens > max_tokens:
+            continue
+        selected.append(i)
+        used += tokens
+    if not selected:
+        return sentences[ranked[0]][:max_tokens * 4]
+    return " ".join(sentences[i] for i in sorted(selected))
+
+
+@dataclass
+class SummarySection:
+    section_id: str
+    file_id: str
+    first_order: int
+    last_order: int
+    chunk_ids: list[str]
+    fingerprint: str
+    summary: str = ""
+    contents: list[str] = field(default_factory=list, repr=False)
+
+
+@dataclass
+class SummaryFile:
+    file_id: str
+    section_ids: list[str]
+    fingerprint: str
+    summary: str = ""
+
+
+class SummaryIndex:
+    """
+    Two-level summary index over a project's chunks: files, then sections of consecutive chunks.
+
+    Each file is cut into sections of `section_size` chunks in file order.
+    Sections and files carry a summary, indexed like chunks in a
+    `ProjectIndex` (BM25, and cosine similarity when summaries are embedded).
+    A query first selects the best files, then the best sections within
+    them, and chunk search is restricted to the chunks of those sections, so
+    chunk scoring costs O(section_k * section_size) instead of O(chunks).
+
+    Sections are keyed by file and position and fingerprinted by their chunk
+    contents: re-processing a file only summarises the sections whose text
+    changed, and sections that no longer exist are dropped.
+    """
+
+    DIR = "summaries"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, index_dir: str, section_size: int = 16):
+        self.index_dir = index_dir
+        self.section_size = section_size
+        self.sections = ProjectIndex(os.path.join(index_dir, self.DIR, "sections"))
+        self.files = ProjectIndex(os.path.join(index_dir, self.DIR, "files"))
+        self.section_entries: dict[str, SummarySection] = {}
+        self.file_entries: dict[str, SummaryFile] = {}
+
+    def __len__(self) -> int:
+        return len(self.section_entries)
+
+    def split_sections(self, file_id: str, chunk_ids: list[str], contents: list[str],
+                       chunk_orders: list[int]) -> list[SummarySection]:
+        """
+        Cut a file's chunks into sections of `section_size` consecutive chunks.
+
+        :param file_id: The file the chunks belong to.
+        :param chunk_ids: The chunk ids, in file order.
+        :param contents: The chunk contents, in file order.
+        :param chunk_orders: The chunks' `chunk_order`.
+        :return: The sections, without summaries.
+        """
+        sections = []
+        for start in range(0, len(chunk_ids), self.section_size):
+            end = start + self.section_size
+            sections.append(SummarySection(
+                section_id=f"{file_id}#{start // self.section_size}",
+                file_id=file_id,
+                first_order=chunk_orders[start],
+                last_order=chunk_orders[min(end, len(chunk_ids)) - 1],
+                chunk_ids=list(chunk_ids[start:end]),
+                fingerprint=fingerprint(contents[start:end]),
+                contents=list(contents[start:end])
+            ))
+        return sections
+
+    def plan_file(self, sections: list[SummarySection]) -> list[SummarySection]:
+        """
+        Carry over the summaries of unchanged sections.
+
+        :return: The sections that need a new summary.
+        """
+        changed = []
+        for section in sections:
+            known = self.section_entries.get(section.section_id)
+            if known is not None and known.fingerprint == section.fingerprint:
+                section.summary = known.summary
+            else:
+                changed.append(section)
+        return changed
+
+    def file_fingerprint(self, sections: list[SummarySection]) -> str:
+        return fingerprint([section.fingerprint for section in sections])
+
+    def file_changed(self, file_id: str, file_fingerprint: str) -> bool:
+        known = self.file_entries.get(file_id)
+        return known is None or known.fingerprint != file_fingerprint
+
+    def update_file(
+            self,
+            file_id: str,
+            sections: list[SummarySection],
+            changed: list[SummarySection],
+            section_vectors=None,
+            file_summary: Optional[str] = None,
+            file_vector=None
+    ):
+        """
+        Store a file's sections, re-indexing only the changed ones.
+
+        :param file_id: The file the sections belong to.
+        :param sections: All current sections of the file, summarised.
+        :param changed: The sections whose summary is new (see `plan_file`).
+        :param section_vectors: Optional embeddings of the changed sections' summaries, row-aligned.
+        :param file_summary: The new file summary, or None when the file is unchanged.
+        :param file_vector: Optional embedding of `file_summary`.
+        """
+        current_ids = {section.section_id for section in sections}
+        previous = self.file_entries.get(file_id)
+        stale_ids = [
+            section_id for section_id in (previous.section_ids if previous else [])
+            if section_id not in current_ids
+        ]
+        if stale_ids:
+            self.sections.remove_chunks(stale_ids)
+            for section_id in stale_ids:
+                self.section_entries.pop(section_id, None)
+
+        if changed:
+            # Vectors of a section re-summarised without embeddings must not outlive its old summary
+            self.sections.remove_chunks([section.section_id for section in changed])
+            self.sections.add_chunks(
+                chunk_ids=[section.section_id for section in changed],
+                contents=[section.summary for section in changed],
+                metadatas=[{"file_id": file_id} for _ in changed],
+                vectors=section_vectors
+            )
+        for section in sections:
+            section.contents = []
+            self.section_entries[section.section_id] = section
+
+        if file_summary is not None or previous is None:
+            self.files.remove_chunks([file_id])
+            self.files.add_chunks(
+                chunk_ids=[file_id],
+                contents=[file_summary or ""],
+                metadatas=[{"file_id": file_id}],
+                vectors=[file_vector] if file_vector is not None else None
+            )
+        self.file_entries[file_id] = SummaryFile(
+            file_id=file_id,
+            section_ids=[section.section_id for section in sections],
+            fingerprint=self.file_fingerprint(sections),
+            summary=file_summary if file_summary is not None else previous.summary
+        )
+
+    def remove_file(self, file_id: str) -> int:
+        entry = self.file_entries.pop(file_id, None)
+        if entry is None:
+            return 0
+        self.sections.remove_chunks(entry.section_ids)
+        for section_id in entry.section_ids:
+            self.section_entries.pop(section_id, None)
+        self.files.remove_chunks([file_id])
+        return len(entry.section_ids)
+
+    @staticmethod
+    def _search_level(level: ProjectIndex, query: str, query_vector, top_k: int,
+                      filters: Optional[dict] = None) -> list[tuple[str, float]]:
+        # Summaries are only embedded when an embedding LLM was configured at build time
+        if query_vector is None or len(level.vector) == 0:
+            return level.search(query, mode=SearchMode.LEXICAL, top_k=top_k, filters=filters)
+        return level.search(query, query_vector=query_vector, mode=SearchMode.HYBRID, top_k=top_k, filters=filters)
+
+    def select_sections(self, query: str, query_vector=None, section_k: int = 8,
+                        file_k: Optional[int] = None) -> list[tuple[str, float]]:
+        """
+        Pick the sections most relevant to a query, within the best files when there are more than `file_k`.
+
+        :param query: The query text.
+        :param query_vector: Optional query embedding, used when the summaries are embedded.
+        :param section_k: The number of sections to select.
+        :param file_k: The number of files to search sections in (default: all files).
+        :return: (section id, score) tuples, best first.
+        """
+        filters = None
+        if file_k and len(self.file_entries) > file_k:
+            files = self._search_level(self.files, query, query_vector, top_k=file_k)
+            if files:
+                filters = {"file_id": {"$in": [file_id for file_id, _ in files]}}
+        return self._search_level(self.sections, query, query_vector, top_k=section_k, filters=filters)
+
+    def _covers(self, project_index: ProjectIndex, file_id: str, file_chunks: Bitmap) -> bool:
+        # A file is covered when its sections hold exactly its indexed chunks; a re-ingest whose
+        # summarisation failed leaves sections pointing at the previous chunk ids
+        entry = self.file_entries.get(file_id)
+        if entry is None:
+            return False
+        sections = [self.section_entries[section_id] for section_id in entry.section_ids if section_id in self.section_entries]
+        if sum(len(section.chunk_ids) for section in sections) != len(file_chunks):
+            return False
+        first_doc_id = project_index.id_map.get_dense_id(sections[0].chunk_ids[0]) if sections else None
+        return first_doc_id is not None and first_doc_id in file_chunks
+
+    def chunk_mask(self, project_index: ProjectIndex, section_ids: list[str]) -> Bitmap:
+        """
+        The dense ids, in `project_index`, of the chunks of the given sections.
+
+        Chunks of files the summary index does not cover (ingested before it was
+        enabled, or whose summarisation failed) are always included, so section
+        selection never makes them unreachable.
+        """
+        with project_index.lock.read():
+            doc_ids = [
+                project_index.id_map.get_dense_id(chunk_id)
+                for section_id in section_ids if section_id in self.section_entries
+                for chunk_id in self.section_entries[section_id].chunk_ids
+            ]
+            mask = Bitmap(doc_id for doc_id in doc_ids if doc_id is not None)
+            for file_id, file_chunks in project_index.metadata.value_bitmaps("file_id").items():
+                if not self._covers(project_index, file_id, file_chunks):
+                    mask = mask | file_chunks
+        return mask
+
+    def save(self):
+        # Runs in a worker thread while builds replace entries: copy the entry lists first
+        sections, files = list(self.section_entries.values()), list(self.file_entries.values())
+        self.sections.save()
+        self.files.save()
+        with open(os.path.join(self.index_dir, self.DIR, self.MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "section_size": self.section_size,
+                "sections": [
+                    {key: value for key, value in asdict(section).items() if key != "contents"}
+                    for section in sections
+                ],
+                "files": [asdict(entry) for entry in files],
+            }, f)
+
+    @classmethod
+    def load(cls, index_dir: str, section_size: int = 16) -> "SummaryIndex":
+        """
+        Load a project's summary index, or return an empty one if none was saved yet.
+
+        An index built with another `section_size` is discarded; the next build re-summarises every file.
+        """
+        index = cls(index_dir, section_size=section_size)
+        manifest_path = os.path.join(index_dir, cls.DIR, cls.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return index
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["section_size"] != section_size:
+            logger.warning(f"Ignoring summary index in {index_dir}: built with sections of {manifest['section_size']} chunks")
+            return index
+        index.sections = ProjectIndex.load(index.sections.index_dir)
+        index.files = ProjectIndex.load(index.files.index_dir)
+        index.section_entries = {entry["section_id"]: SummarySection(**entry) for entry in manifest["sections"]}
+        index.file_entries = {entry["file_id"]: SummaryFile(**entry) for entry in manifest["files"]}
+        return index
+
+
+_project_summary_indexes: dict[str, SummaryIndex] = {}
+
+
+def get_project_summary_index(project_id: str, index_dir: str, section_size: int = 16) -> SummaryIndex:
+    """
+    Return the in-process summary index of a project, loading it from `index_dir` on first use.
+    """
+    index = _project_summary_indexes.get(project_id)
+    if index is None or index.section_size != section_size:
+        index = SummaryIndex.load(index_dir, section_size=section_size)
+        _project_summary_indexes[project_id] = index
+    return index
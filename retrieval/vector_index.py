@@ -0,0 +1,184 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+from .bitmap import Bitmap
+
+
+class VectorIndex:
+    """
+    Exact cosine-similarity index over chunk embeddings.
+
+    Vectors live in one preallocated float32 matrix whose row number is the
+    chunk's dense id from the project's `ChunkIdMap`; a boolean mask marks
+    which rows hold a live vector. Deleting a chunk only clears its mask bit.
+    """
+
+    DATA_FILE = "vectors.npy"
+    MASK_FILE = "vectors_mask.npy"
+
+    def __init__(self, dimension: Optional[int] = None, initial_capacity: int = 1024):
+        self.dimension = dimension
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._valid: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return int(self._valid.sum()) if self._valid is not None else 0
+
+    def __contains__(self, doc_id: int) -> bool:
+        return self._valid is not None and 0 <= doc_id < len(self._valid) and bool(self._valid[doc_id])
+
+    @property
+    def size(self) -> int:
+        """Number of rows addressed so far (live or deleted)."""
+        return len(self._valid) if self._valid is not None else 0
+
+    def _ensure_capacity(self, rows: int):
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self._matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+            self._valid = np.zeros(0, dtype=bool)
+        elif rows > self._matrix.shape[0]:
+            capacity = max(rows, self._matrix.shape[0] * 2)
+            matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+            matrix[:self._matrix.shape[0]] = self._matrix
+            self._matrix = matrix
+
+        if rows > len(self._valid):
+            valid = np.zeros(rows, dtype=bool)
+            valid[:len(self._valid)] = self._valid
+            self._valid = valid
+
+    def add(self, doc_ids: list[int], vectors) -> None:
+        """
+        Add or replace vectors for the given dense ids. Vectors are L2-normalised on insert.
+
+        :param doc_ids: Dense chunk ids, one per vector.
+        :param vectors: A (len(doc_ids), dimension) array-like of embeddings.
+        """
+        if not doc_ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(doc_ids):
+            raise ValueError("Expected one vector per doc id.")
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dimension}.")
+
+        rows = np.asarray(doc_ids, dtype=np.int64)
+        self._ensure_capacity(int(rows.max()) + 1)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._matrix[rows] = vectors / norms
+        self._valid[rows] = True
+
+    def remove(self, doc_id: int) -> bool:
+        if doc_id not in self:
+            return False
+        self._valid[doc_id] = False
+        return True
+
+    def search(self, query_vector, top_k: int = 10, mask: Bitmap = None) -> list[tuple[int, float]]:
+        """
+        Return the top_k rows by cosine similarity to the query vector.
+
+        With a mask only the allowed rows are gathered and scored, so a filter
+        selecting a small fraction of the project costs a small matmul.
+
+        :param query_vector: The query embedding.
+        :param top_k: The maximum number of results to return.
+        :param mask: Optional bitmap of the only doc ids allowed in the results.
+        :return: A list of (doc id, score) tuples sorted by descending score.
+        """
+        if self._matrix is None or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimension:
+            raise ValueError(f"Query dimension {query.shape[0]} does not match index dimension {self.dimension}.")
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if mask is None:
+            rows = np.flatnonzero(self._valid)
+        else:
+            rows = mask.to_array()
+            rows = rows[rows < self.size]
+            rows = rows[self._valid[rows]]
+        if not len(rows):
+            return []
+        scores = self._matrix[rows] @ query
+
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def search_batch(self, query_vectors, top_k: int = 10, mask: Bitmap = None) -> list[list[tuple[int, float]]]:
+        """
+        Score several queries with one matrix-matrix product instead of one matmul per query.
+
+        :param query_vectors: The query embeddings, one row per query.
+        :param top_k: The maximum number of results per query.
+        :param mask: Optional bitmap of the only doc ids allowed in the results.
+        :return: One list of (doc id, score) tuples per query, sorted by descending score.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if self._matrix is None or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != self.dimension:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {self.dimension}.")
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+
+        if mask is None:
+            rows = np.flatnonzero(self._valid)
+        else:
+            rows = mask.to_array()
+            rows = rows[rows < self.size]
+            rows = rows[self._valid[rows]]
+        if not len(rows):
+            return [[] for _ in range(len(queries))]
+        scores = self._matrix[rows] @ queries.T
+
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        top_scores = np.take_along_axis(scores, top, axis=0)
+        order = np.argsort(-top_scores, axis=0)
+        top = np.take_along_axis(top, order, axis=0)
+        top_scores = np.take_along_axis(top_scores, order, axis=0)
+        return [
+            [(int(rows[i]), float(score)) for i, score in zip(top[:, column], top_scores[:, column])]
+            for column in range(len(queries))
+        ]
+
+    def save(self, index_dir: str):
+        if self._matrix is None:
+            return
+        np.save(os.path.join(index_dir, self.DATA_FILE), self._matrix[:self.size])
+        np.save(os.path.join(index_dir, self.MASK_FILE), self._valid)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["VectorIndex"]:
+        """
+        Load an index saved with `save`.
+
+        :return: The loaded index, or None if nothing was saved in `index_dir`.
+        """
+        data_path = os.path.join(index_dir, cls.DATA_FILE)
+        mask_path = os.path.join(index_dir, cls.MASK_FILE)
+        if not (os.path.exists(data_path) and os.path.exists(mask_path)):
+            return None
+
+        matrix = np.load(data_path)
+        index = cls(dimension=matrix.shape[1])
+        index._matrix = np.array(matrix, dtype=np.float32)
+        index._valid = np.load(mask_path)
+        return index
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 import os
 
 from helpers.config import Settings, get_settings
@@ -15,3 +15,12 @@ async def health(app_settings: Settings = Depends(get_settings)):
         'app_name': app_settings.APP_NAME,
         'app_version': app_settings.APP_VERSION,
     }
+
+
+@base_router.get('/metrics')
+async def metrics(request: Request):
+    return {
+        'batching': request.app.embedding_llm.get_metrics(),
+        'retrieval_cache': request.app.retrieval_cache.stats() if request.app.retrieval_cache is not None else None,
+        'admission': request.app.admission_control.snapshot() if request.app.admission_control is not None else None,
+    }
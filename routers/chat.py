@@ -0,0 +1,105 @@
+import logging
+import time
+from typing import Awaitable, Callable
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from controllers import ConversationController
+from models import ChatRequest, ResponseSignal
+from models.conversation_model import ConversationModel
+from utils.sse import SSE_HEADERS, format_sse
+
+logger = logging.getLogger('fastapi')
+
+chat_router = APIRouter(
+    prefix="/v1/chat",
+    tags=["Chat"]
+)
+
+
+async def stream_llm_events(
+        request: Request,
+        stream,
+        started: float = None,
+        on_complete: Callable[[str], Awaitable] = None
+):
+    """
+    Forward an `LLMBase.stream` generator as SSE messages.
+
+    Each delta is sent as soon as it arrives; the generator is pulled only when
+    the previous message has been written, so a slow client slows the provider
+    stream down instead of buffering it. On client disconnect the provider
+    stream is closed, which cancels the upstream request. `on_complete` is
+    awaited with the full text of a stream that finished.
+    """
+    started = started if started is not None else time.perf_counter()
+    first_token_ms = None
+    parts = []
+    try:
+        async for event in stream:
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling LLM stream")
+                break
+
+            if event.is_final:
+                if on_complete is not None:
+                    await on_complete("".join(parts))
+                yield format_sse({
+                    "finish_reason": event.finish_reason,
+                    "usage": event.usage,
+                    "first_token_ms": first_token_ms,
+                    "total_ms": (time.perf_counter() - started) * 1000.0,
+                }, event="done")
+            elif event.text:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000.0
+                parts.append(event.text)
+                yield format_sse({"text": event.text}, event="delta")
+    except Exception as e:
+        logger.error(f"LLM stream failed: {e}")
+        yield format_sse({"signal": ResponseSignal.CHAT_STREAM_FAILED.value}, event="error")
+    finally:
+        await stream.aclose()
+
+
+@chat_router.post("/stream/{project_id}")
+async def stream_chat(
+        request: Request,
+        project_id: str,
+        chat_request: ChatRequest
+):
+    started = time.perf_counter()
+    messages, on_complete = chat_request.messages, None
+    if chat_request.conversation_id:
+        conversation_controller = ConversationController(
+            conversation_model=ConversationModel(db_client=request.app.db_client),
+            summarizer_llm=request.app.generation_llm
+        )
+        history = await conversation_controller.load_history(chat_request.conversation_id, project_id)
+        messages = history + (chat_request.messages or [])
+
+        async def on_complete(answer: str):
+            await conversation_controller.record_exchange(
+                conversation_id=chat_request.conversation_id,
+                project_id=project_id,
+                user_message=chat_request.message,
+                assistant_message=answer
+            )
+
+    cache_context = {"project_id": project_id} if request.app.generation_cache is not None else {}
+    stream = request.app.generation_llm.stream(
+        user_message=chat_request.message,
+        temperature=chat_request.temperature,
+        max_output_tokens=chat_request.max_output_tokens,
+        messages=messages,
+        # Scoped like the stored conversation, so projects reusing an id never share a driver session
+        conversation_id=f"{project_id}:{chat_request.conversation_id}" if chat_request.conversation_id else None,
+        **cache_context
+    )
+
+    return StreamingResponse(
+        stream_llm_events(request, stream, started=started, on_complete=on_complete),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
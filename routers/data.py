@@ -5,13 +5,17 @@ from fastapi import APIRouter, Depends, UploadFile, status, Request
 import os
 import logging
 
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
 from helpers.config import Settings, get_settings
-from controllers import DataController, ProjectController, ProcessController
+from controllers import DataController, ProjectController, ProcessController, SearchController, SummaryController
 from models import ResponseSignal, ProcessRequest
+from retrieval import DedupMode
 from langchain_community.document_loaders import TextLoader
 
+from bson import ObjectId
+
 from models.chunk_model import ChunkModel
 from models.file_model import FileModel
 from models.project_model import ProjectModel
@@ -54,10 +58,12 @@ async def upload_file(
         project_id=project_id
     )
 
+    file_size = 0
     try:
         async with aiofiles.open(file_path, "wb") as f:
             while chunk := await file.read(app_settings.FILE_DEFAULT_CHUNK_SIZE):
                 await f.write(chunk)
+                file_size += len(chunk)
     except Exception as e:
         logger.error(f"Error while uploading file: {e}")
         return JSONResponse(
@@ -72,6 +78,7 @@ async def upload_file(
         "project_id": project_id,
         "file_name": file_name,
         "file_path": file_path,
+        "file_size": file_size,
         "metadata": {
             "original_name": file.filename,
             "content_type": file.content_type
@@ -124,13 +131,135 @@ async def process_file(
             }
         )
 
+    dedup_mode = process_request.dedup_mode or app_settings.INGEST_DEDUP_MODE
+    if dedup_mode is not None and dedup_mode not in [mode.value for mode in DedupMode]:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.FILE_DEDUP_MODE_INVALID.value
+            }
+        )
+
+    search_controller = SearchController(project_id=project_id)
     chunk_model = ChunkModel(db_client=request.app.db_client)
-    inserted_chunks = await chunk_model.insert_chunk(
-        project_id=project_id,
+    # Processing a file again replaces its chunks; the previous ones are removed once the new ones are stored
+    replaced_chunk_ids = await chunk_model.get_file_chunk_ids(project_id, process_request.file_id)
+    chunk_ids = [str(ObjectId()) for _ in file_chunks]
+    chunk_orders = list(range(1, len(file_chunks) + 1))
+    duplicate_of = [None] * len(file_chunks)
+    dedup_stats = None
+    if dedup_mode is not None:
+        duplicate_of = await search_controller.find_near_duplicates(
+            chunk_ids=chunk_ids,
+            chunks=file_chunks,
+            replaced_chunk_ids=replaced_chunk_ids
+        )
+        duplicate_count = sum(duplicate is not None for duplicate in duplicate_of)
+        dedup_stats = {
+            "mode": dedup_mode,
+            "chunk_count": len(file_chunks),
+            "duplicate_count": duplicate_count,
+            "dedup_ratio": duplicate_count / len(file_chunks),
+        }
+        if dedup_mode == DedupMode.DROP.value:
+            # Dropped chunks leave gaps in chunk_order, so neighbours across a gap are not merged
+            kept = [i for i, duplicate in enumerate(duplicate_of) if duplicate is None]
+            file_chunks = [file_chunks[i] for i in kept]
+            chunk_ids = [chunk_ids[i] for i in kept]
+            chunk_orders = [chunk_orders[i] for i in kept]
+            duplicate_of = [None] * len(kept)
+        else:
+            for chunk, duplicate in zip(file_chunks, duplicate_of):
+                if duplicate is not None:
+                    chunk.metadata["duplicate_of"] = duplicate
+
+    # Linked duplicates stay stored for context windows but are kept out of the search indexes,
+    # so only the searchable chunks are embedded
+    indexed = [i for i, duplicate in enumerate(duplicate_of) if duplicate is None]
+    try:
+        vectors = await search_controller.embed_chunks(
+            embedding_llm=request.app.embedding_llm,
+            chunks=[file_chunks[i] for i in indexed]
+        )
+    except Exception as e:
+        logger.error(f"Embedding chunks of file {process_request.file_id} of project {project_id} failed: {e}")
+        if dedup_mode is not None:
+            await search_controller.discard_near_duplicates(chunk_ids)
+        return JSONResponse(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            content={
+                "signal": ResponseSignal.FILE_EMBEDDING_FAILED.value
+            }
+        )
+    embeddings = [None] * len(file_chunks)
+    if vectors is not None:
+        for i, vector in zip(indexed, vectors):
+            embeddings[i] = vector
+
+    project_model = ProjectModel(db_client=request.app.db_client)
+    base_version = await project_model.get_index_version(project_id)
+    try:
+        inserted_chunks = await chunk_model.insert_chunk(
+            project_id=project_id,
+            file_id=process_request.file_id,
+            chunk_data=file_chunks,
+            embeddings=embeddings,
+            chunk_ids=chunk_ids,
+            chunk_orders=chunk_orders
+            # batch_size=process_request.batch_size
+        )
+    except Exception:
+        if dedup_mode is not None:
+            await search_controller.discard_near_duplicates(chunk_ids)
+        raise
+
+    await search_controller.index_chunks(
+        chunk_ids=[chunk_ids[i] for i in indexed],
         file_id=process_request.file_id,
-        chunk_data=file_chunks,
-        # batch_size=process_request.batch_size
+        chunks=[file_chunks[i] for i in indexed],
+        vectors=vectors
     )
+    replaced_count = 0
+    if replaced_chunk_ids:
+        replaced_count = await chunk_model.delete_file_chunks(
+            project_id=project_id,
+            file_id=process_request.file_id,
+            chunk_ids=replaced_chunk_ids
+        )
+        await search_controller.remove_chunks(replaced_chunk_ids)
+    inserted_chunks["replaced_count"] = replaced_count
+    if app_settings.SUMMARY_INDEX_ENABLED:
+        summary_controller = SummaryController.from_app(request.app, project_id=project_id)
+        try:
+            inserted_chunks["summaries"] = await summary_controller.build_file(
+                file_id=process_request.file_id,
+                chunk_ids=[chunk_ids[i] for i in indexed],
+                contents=[file_chunks[i].page_content for i in indexed],
+                chunk_orders=[chunk_orders[i] for i in indexed]
+            )
+        except Exception as e:
+            # Its stale sections leave the file uncovered, so all its chunks stay searchable;
+            # POST /v1/search/summaries/{project_id} retries
+            logger.error(f"Summarising file {process_request.file_id} of project {project_id} failed: {e}")
+            inserted_chunks["summaries"] = None
+    if dedup_mode is not None:
+        search_controller.save_near_duplicates()
+        await FileModel(db_client=request.app.db_client).set_file_dedup_stats(
+            project_id=project_id,
+            file_name=process_request.file_id,
+            dedup_stats=dedup_stats
+        )
+        inserted_chunks["dedup"] = dedup_stats
+    # `insert_chunk` bumped the index version before the new chunks were searchable here;
+    # bump it again so results cached in between are never served
+    index_version = await project_model.bump_index_version(project_id)
+    # Bumped by `insert_chunk`, by `delete_file_chunks` when it deleted anything, and just above
+    search_controller.mark_applied(base_version, index_version, own_bumps=2 + (1 if replaced_count else 0))
+    search_controller.schedule_save()
+
+    if request.app.generation_cache is not None:
+        # Cached answers grounded on this project may now be stale
+        await request.app.generation_cache.invalidate_project(project_id)
 
     return inserted_chunks
 
@@ -140,3 +269,39 @@ async def get_project_files(project_id: str, request: Request):
     files = await file_model.get_project_files(project_id=project_id)
     return files
 
+
+
+@data_router.get("/stats/{project_id}")
+async def get_project_stats(project_id: str, request: Request):
+    # Served from the counters on the project document, never from collection counts
+    stats = await ProjectModel(db_client=request.app.db_client).get_project_stats(project_id=project_id)
+    if stats is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.PROJECT_NOT_FOUND.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.PROJECT_STATS_SUCCESS.value,
+            "project_id": project_id,
+            "stats": jsonable_encoder(stats)
+        }
+    )
+
+
+@data_router.get("/projects")
+async def list_projects(request: Request, page_size: int = 10, page_number: int = 1):
+    projects, total_pages = await ProjectModel(db_client=request.app.db_client).get_all_projects(
+        page_size=page_size,
+        page_number=page_number
+    )
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.PROJECT_LIST_SUCCESS.value,
+            "projects": jsonable_encoder([project.model_dump(exclude={"id"}) for project in projects]),
+            "total_pages": total_pages
+        }
+    )
@@ -0,0 +1,190 @@
+import logging
+import time
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from controllers import ConversationController, RAGController
+from llm.llm_enums import EmbeddingInputType
+from models import RAGQueryRequest, ResponseSignal
+from models.chunk_model import ChunkModel
+from models.conversation_model import ConversationModel
+from retrieval import SearchMode
+from routers.chat import stream_llm_events
+from utils.sse import SSE_HEADERS, format_sse
+
+logger = logging.getLogger('fastapi')
+
+rag_router = APIRouter(
+    prefix="/v1/rag",
+    tags=["RAG"]
+)
+
+
+def get_conversation_controller(request: Request, rag_request: RAGQueryRequest):
+    if not rag_request.conversation_id:
+        return None
+    return ConversationController(
+        conversation_model=ConversationModel(db_client=request.app.db_client),
+        summarizer_llm=request.app.generation_llm
+    )
+
+
+async def prepare_rag_context(request: Request, project_id: str, rag_request: RAGQueryRequest, conversation_controller):
+    messages = rag_request.messages
+    history_started = time.perf_counter()
+    if conversation_controller is not None:
+        history = await conversation_controller.load_history(rag_request.conversation_id, project_id)
+        messages = history + (rag_request.messages or [])
+    history_ms = (time.perf_counter() - history_started) * 1000.0
+
+    async def embed_query(query: str) -> list[float]:
+        response = await request.app.embedding_llm.embed_text([query], input_type=EmbeddingInputType.QUERY.value)
+        return response["embeddings"][0]
+
+    rag_controller = RAGController(project_id=project_id)
+    rag_context = await rag_controller.prepare(
+        query=rag_request.query,
+        embed_query=embed_query,
+        chunk_model=ChunkModel(db_client=request.app.db_client),
+        generation_llm=request.app.generation_llm,
+        mode=rag_request.mode,
+        top_k=rag_request.top_k,
+        candidate_k=rag_request.candidate_k,
+        filters=rag_request.filters,
+        neighbours=rag_request.neighbours,
+        messages=messages,
+        max_output_tokens=rag_request.max_output_tokens,
+        retrieval_cache=request.app.retrieval_cache,
+        section_k=rag_request.section_k
+    )
+    rag_context.timings["history_ms"] = history_ms
+    return rag_context
+
+
+def generation_kwargs(request: Request, project_id: str, rag_request: RAGQueryRequest, rag_context) -> dict:
+    kwargs = {
+        "user_message": rag_context.prompt,
+        "temperature": rag_request.temperature,
+        "max_output_tokens": rag_request.max_output_tokens,
+        "messages": rag_context.messages,
+        # Scoped like the stored conversation, so projects reusing an id never share a driver session
+        "conversation_id": f"{project_id}:{rag_request.conversation_id}" if rag_request.conversation_id else None,
+    }
+    if request.app.generation_cache is not None:
+        # The semantic tier compares the question itself; the packed prompt differs with every retrieval
+        kwargs.update(project_id=project_id, chunk_ids=rag_context.packed.chunk_ids, cache_query=rag_request.query)
+    return kwargs
+
+
+@rag_router.post("/query/{project_id}")
+async def rag_query(
+        request: Request,
+        project_id: str,
+        rag_request: RAGQueryRequest
+):
+    if rag_request.mode not in [mode.value for mode in SearchMode]:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_INVALID_MODE.value
+            }
+        )
+
+    started = time.perf_counter()
+    conversation_controller = get_conversation_controller(request, rag_request)
+    try:
+        rag_context = await prepare_rag_context(request, project_id, rag_request, conversation_controller)
+
+        generate_started = time.perf_counter()
+        response = await request.app.generation_llm.generate_text(
+            **generation_kwargs(request, project_id, rag_request, rag_context)
+        )
+        rag_context.timings["generate_ms"] = (time.perf_counter() - generate_started) * 1000.0
+
+        if conversation_controller is not None:
+            await conversation_controller.record_exchange(
+                conversation_id=rag_request.conversation_id,
+                project_id=project_id,
+                user_message=rag_request.query,
+                assistant_message=response["text"]
+            )
+    except Exception as e:
+        logger.error(f"RAG query failed: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "signal": ResponseSignal.RAG_QUERY_FAILED.value
+            }
+        )
+    rag_context.timings["total_ms"] = (time.perf_counter() - started) * 1000.0
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.RAG_QUERY_SUCCESS.value,
+            "answer": response["text"],
+            "usage": response.get("usage"),
+            "sources": rag_context.sources(),
+            "context_tokens": rag_context.packed.token_count,
+            "dropped_chunk_ids": rag_context.packed.dropped_chunk_ids,
+            "retrieval_cache_hit": rag_context.retrieval_cache_hit,
+            "search_mode": rag_context.search_mode,
+            "timings_ms": rag_context.timings,
+        }
+    )
+
+
+@rag_router.post("/query/stream/{project_id}")
+async def rag_query_stream(
+        request: Request,
+        project_id: str,
+        rag_request: RAGQueryRequest
+):
+    if rag_request.mode not in [mode.value for mode in SearchMode]:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_INVALID_MODE.value
+            }
+        )
+
+    conversation_controller = get_conversation_controller(request, rag_request)
+    try:
+        rag_context = await prepare_rag_context(request, project_id, rag_request, conversation_controller)
+    except Exception as e:
+        logger.error(f"RAG retrieval failed: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "signal": ResponseSignal.RAG_QUERY_FAILED.value
+            }
+        )
+
+    on_complete = None
+    if conversation_controller is not None:
+        async def on_complete(answer: str):
+            await conversation_controller.record_exchange(
+                conversation_id=rag_request.conversation_id,
+                project_id=project_id,
+                user_message=rag_request.query,
+                assistant_message=answer
+            )
+
+    async def events():
+        # Sources and retrieval timings go out before the first token; the done event carries the generation timings
+        yield format_sse({
+            "sources": rag_context.sources(),
+            "timings_ms": rag_context.timings,
+            "retrieval_cache_hit": rag_context.retrieval_cache_hit,
+            "search_mode": rag_context.search_mode,
+        }, event="context")
+        generate_started = time.perf_counter()
+        stream = request.app.generation_llm.stream(**generation_kwargs(request, project_id, rag_request, rag_context))
+        async for message in stream_llm_events(request, stream, started=generate_started, on_complete=on_complete):
+            yield message
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+import time
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from controllers import SearchController, SummaryController
+from helpers.config import get_settings
+from llm.llm_enums import EmbeddingInputType
+from models import BatchSearchRequest, ResponseSignal, SearchRequest
+from models.chunk_model import ChunkModel
+from models.file_model import FileModel
+from retrieval import RerankCandidate, SearchMode, assign_window_chunks, build_chunk_windows
+
+logger = logging.getLogger('fastapi')
+
+search_router = APIRouter(
+    prefix="/v1/search",
+    tags=["Search"]
+)
+
+
+@search_router.post("/rebuild/{project_id}")
+async def rebuild_project_vectors(
+        request: Request,
+        project_id: str
+):
+    search_controller = SearchController(project_id=project_id)
+    chunk_model = ChunkModel(db_client=request.app.db_client)
+
+    started = time.perf_counter()
+    vector_count = await search_controller.rebuild_vector_index(chunk_model=chunk_model)
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.INDEX_REBUILD_SUCCESS.value,
+            "vector_count": vector_count,
+            "rebuild_ms": (time.perf_counter() - started) * 1000.0
+        }
+    )
+
+
+@search_router.post("/summaries/{project_id}")
+async def build_project_summaries(
+        request: Request,
+        project_id: str
+):
+    summary_controller = SummaryController.from_app(request.app, project_id=project_id)
+    chunk_model = ChunkModel(db_client=request.app.db_client)
+    files = await FileModel(db_client=request.app.db_client).get_project_files(project_id=project_id)
+
+    started = time.perf_counter()
+    file_stats = await summary_controller.build_project(
+        chunk_model=chunk_model,
+        file_ids=[file["file_name"] for file in files]
+    )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.SUMMARY_INDEX_BUILD_SUCCESS.value,
+            "file_count": len(file_stats),
+            "section_count": sum(stats["section_count"] for stats in file_stats.values()),
+            "summarized_count": sum(stats["summarized_count"] for stats in file_stats.values()),
+            "build_ms": (time.perf_counter() - started) * 1000.0
+        }
+    )
+
+
+@search_router.post("/batch/{project_id}")
+async def batch_search_project(
+        request: Request,
+        project_id: str,
+        batch_request: BatchSearchRequest
+):
+    """
+    Search many queries against one project, streaming one NDJSON line per query.
+
+    Queries are processed in groups of `BATCH_SEARCH_GROUP_SIZE`: each group is
+    embedded with one call, scored against the project's vectors with one
+    matrix-matrix product and its chunks fetched with one `$in` query. A final
+    line carries the signal and the stage timings.
+    """
+    if batch_request.mode not in [mode.value for mode in SearchMode]:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_INVALID_MODE.value
+            }
+        )
+
+    search_controller = SearchController(project_id=project_id)
+    chunk_model = ChunkModel(db_client=request.app.db_client)
+    group_size = get_settings().BATCH_SEARCH_GROUP_SIZE
+    use_vectors = batch_request.mode != SearchMode.LEXICAL.value and len(search_controller.project_index.vector) > 0
+    # Hybrid runs lexical only, and vector not at all, while the project has no vectors
+    search_mode = batch_request.mode
+    if batch_request.mode != SearchMode.LEXICAL.value and not use_vectors:
+        search_mode = SearchMode.LEXICAL.value if batch_request.mode == SearchMode.HYBRID.value else None
+    projection = {"chunk_embedding": 0} if batch_request.include_content else {"chunk_embedding": 0, "chunk_content": 0}
+
+    async def lines():
+        timings = {"embed_ms": 0.0, "search_ms": 0.0, "fetch_ms": 0.0}
+        queries = batch_request.queries
+        try:
+            for start in range(0, len(queries), group_size):
+                group = queries[start:start + group_size]
+
+                if batch_request.mode == SearchMode.VECTOR.value and not use_vectors:
+                    group_hits = [[] for _ in group]
+                else:
+                    started = time.perf_counter()
+                    query_vectors = None
+                    if use_vectors:
+                        response = await request.app.embedding_llm.embed_text(
+                            group, input_type=EmbeddingInputType.QUERY.value
+                        )
+                        query_vectors = response["embeddings"]
+                    timings["embed_ms"] += (time.perf_counter() - started) * 1000.0
+
+                    started = time.perf_counter()
+                    group_hits = await asyncio.to_thread(
+                        search_controller.search_batch,
+                        queries=group,
+                        mode=batch_request.mode,
+                        top_k=batch_request.top_k,
+                        query_vectors=query_vectors,
+                        candidate_k=batch_request.candidate_k,
+                        filters=batch_request.filters
+                    )
+                    timings["search_ms"] += (time.perf_counter() - started) * 1000.0
+
+                started = time.perf_counter()
+                chunk_ids = list(dict.fromkeys(chunk_id for hits in group_hits for chunk_id, _ in hits))
+                chunks = await chunk_model.get_chunks_by_ids(project_id, chunk_ids, projection=projection)
+                chunks_by_id = {str(chunk["_id"]): chunk for chunk in chunks}
+                timings["fetch_ms"] += (time.perf_counter() - started) * 1000.0
+
+                for offset, (query, hits) in enumerate(zip(group, group_hits)):
+                    results = [
+                        {
+                            "chunk_id": chunk_id,
+                            "score": score,
+                            "file_id": chunks_by_id[chunk_id]["file_id"],
+                            "chunk_order": chunks_by_id[chunk_id]["chunk_order"],
+                            "chunk_content": chunks_by_id[chunk_id].get("chunk_content"),
+                            "chunk_metadata": chunks_by_id[chunk_id]["chunk_metadata"],
+                        }
+                        for chunk_id, score in hits
+                        if chunk_id in chunks_by_id
+                    ]
+                    yield json.dumps({"index": start + offset, "query": query, "results": results}, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Batch search failed: {e}")
+            yield json.dumps({"signal": ResponseSignal.BATCH_SEARCH_FAILED.value}) + "\n"
+            return
+
+        yield json.dumps({
+            "signal": ResponseSignal.BATCH_SEARCH_SUCCESS.value,
+            "query_count": len(queries),
+            "search_mode": search_mode,
+            "timings_ms": timings,
+        }) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@search_router.post("/{project_id}")
+async def search_project(
+        request: Request,
+        project_id: str,
+        search_request: SearchRequest
+):
+    if search_request.mode not in [mode.value for mode in SearchMode]:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_INVALID_MODE.value
+            }
+        )
+
+    first_stage_k = search_request.top_k
+    if search_request.rerank:
+        first_stage_k = max(search_request.top_k, search_request.rerank_candidates)
+
+    async def embed_query(query: str) -> list[float]:
+        # A client-supplied vector skips the embedding call
+        if search_request.query_vector is not None:
+            return search_request.query_vector
+        response = await request.app.embedding_llm.embed_text([query], input_type=EmbeddingInputType.QUERY.value)
+        return response["embeddings"][0]
+
+    search_controller = SearchController(project_id=project_id)
+    try:
+        # Same path as RAG: lexical overlaps the query embedding, legs score in worker threads
+        hits, timings, search_mode = await search_controller.search_concurrently(
+            query=search_request.query,
+            embed_query=embed_query,
+            mode=search_request.mode,
+            top_k=first_stage_k,
+            filters=search_request.filters,
+            section_k=search_request.section_k
+        )
+    except ValueError as e:
+        logger.error(f"Invalid search request: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.SEARCH_INVALID_REQUEST.value
+            }
+        )
+    except Exception as e:
+        # e.g. the query embedding failed
+        logger.error(f"Search failed: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "signal": ResponseSignal.SEARCH_FAILED.value
+            }
+        )
+
+    chunk_model = ChunkModel(db_client=request.app.db_client)
+    chunks = await chunk_model.get_chunks_by_ids(project_id, [chunk_id for chunk_id, _ in hits])
+    chunks_by_id = {str(chunk["_id"]): chunk for chunk in chunks}
+
+    candidates = [
+        RerankCandidate(chunk_id=chunk_id, content=chunks_by_id[chunk_id]["chunk_content"], score=score)
+        for chunk_id, score in hits
+        if chunk_id in chunks_by_id
+    ]
+
+    rerank_info = None
+    if search_request.rerank and candidates:
+        rerank_result = await request.app.rerank_stage.rerank(
+            query=search_request.query,
+            candidates=candidates,
+            budget_ms=search_request.rerank_budget_ms
+        )
+        candidates = rerank_result.candidates
+        rerank_info = {
+            "rerank_ms": rerank_result.rerank_ms,
+            "reranked_count": rerank_result.reranked_count,
+            "cached_count": rerank_result.cached_count,
+            "budget_exceeded": rerank_result.budget_exceeded,
+        }
+
+    results = []
+    for candidate in candidates[:search_request.top_k]:
+        chunk = chunks_by_id[candidate.chunk_id]
+        results.append({
+            "chunk_id": candidate.chunk_id,
+            "score": candidate.score,
+            "rerank_score": rerank_result.scores.get(candidate.chunk_id) if rerank_info else None,
+            "file_id": chunk["file_id"],
+            "chunk_order": chunk["chunk_order"],
+            "chunk_content": chunk["chunk_content"],
+            "chunk_metadata": chunk["chunk_metadata"],
+        })
+
+    windows = None
+    if search_request.neighbours > 0 and results:
+        # One indexed range scan for every hit's neighbourhood instead of a point read per neighbour
+        chunk_windows = build_chunk_windows(
+            [chunks_by_id[result["chunk_id"]] for result in results],
+            radius=search_request.neighbours
+        )
+        window_chunks = await chunk_model.get_chunk_windows(
+            project_id=project_id,
+            windows=chunk_windows,
+            projection={"chunk_embedding": 0}
+        )
+        windows = [
+            {
+                "file_id": window.file_id,
+                "first_order": window.first_order,
+                "last_order": window.last_order,
+                "hit_chunk_ids": window.hit_chunk_ids,
+                "chunks": [
+                    {
+                        "chunk_id": str(chunk["_id"]),
+                        "chunk_order": chunk["chunk_order"],
+                        "chunk_content": chunk["chunk_content"],
+                        "chunk_metadata": chunk["chunk_metadata"],
+                    }
+                    for chunk in window.chunks
+                ],
+            }
+            for window in assign_window_chunks(chunk_windows, window_chunks)
+        ]
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.SEARCH_SUCCESS.value,
+            "results": results,
+            "rerank": rerank_info,
+            "windows": windows,
+            "search_mode": search_mode,
+            "timings_ms": timings
+        }
+    )
@@ -0,0 +1,339 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+
+from models.enums.responses import ResponseSignal
+
+logger = logging.getLogger(__name__)
+
+
+class WorkClass(Enum):
+    """
+    An enumeration for the scheduling classes of admitted requests, highest priority first.
+    """
+    QUERY = "query"
+    BULK = "bulk"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, tenant: str, work_class: WorkClass, retry_after: int, reason: str):
+        super().__init__(f"Tenant {tenant} over {work_class.value} quota ({reason}), retry after {retry_after}s")
+        self.tenant = tenant
+        self.work_class = work_class
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass
+class _Waiter:
+    tenant: str
+    work_class: WorkClass
+    start_tag: float
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class Ticket:
+    tenant: str
+    work_class: WorkClass
+    admitted_at: float
+    wait_ms: float
+    released: bool = False
+
+
+class TenantStats:
+    def __init__(self, window: int = 1000):
+        self.admitted = {work_class: 0 for work_class in WorkClass}
+        self.rejected = {work_class: 0 for work_class in WorkClass}
+        self.waits_ms: dict[WorkClass, deque[float]] = {work_class: deque(maxlen=window) for work_class in WorkClass}
+
+    @staticmethod
+    def _percentile(values: deque, q: float) -> Optional[float]:
+        return float(np.percentile(np.fromiter(values, dtype=np.float64), q)) if values else None
+
+    def snapshot(self, queued: dict, running: dict) -> dict:
+        return {
+            work_class.value: {
+                "queued": queued.get(work_class, 0),
+                "running": running.get(work_class, 0),
+                "admitted": self.admitted[work_class],
+                "rejected": self.rejected[work_class],
+                "wait_ms_p50": self._percentile(self.waits_ms[work_class], 50),
+                "wait_ms_p95": self._percentile(self.waits_ms[work_class], 95),
+            }
+            for work_class in WorkClass
+        }
+
+
+class AdmissionControl:
+    """
+    Per-tenant admission control with a weighted fair queue per work class.
+
+    A request runs when a global slot is free, its tenant is under its
+    concurrency cap for the class and (for bulk work) fewer than
+    `max_bulk_concurrency` bulk requests run, which keeps slots free for
+    queries. Otherwise it waits in its tenant's queue. Freed slots go to
+    queries first; within a class, tenants are served by start-time fair
+    queuing, so a tenant with weight w gets w shares of the class whatever
+    its backlog. A tenant whose queue is full, or whose request waited
+    `max_queue_wait_seconds`, is rejected at once with a `Retry-After`
+    estimate instead of piling up work.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int = 64,
+            max_bulk_concurrency: int = 16,
+            tenant_query_concurrency: int = 16,
+            tenant_bulk_concurrency: int = 4,
+            tenant_queue_limit: int = 64,
+            max_queue_wait_seconds: float = 30.0,
+            tenant_weights: dict[str, float] = None
+    ):
+        """
+        :param max_concurrency: Requests running at once across all tenants.
+        :param max_bulk_concurrency: Bulk requests running at once across all tenants.
+        :param tenant_query_concurrency: Queries one tenant may run at once.
+        :param tenant_bulk_concurrency: Bulk requests one tenant may run at once.
+        :param tenant_queue_limit: Requests one tenant may have waiting per class.
+        :param max_queue_wait_seconds: Queue wait after which a request is rejected.
+        :param tenant_weights: Fair-queue weight per tenant (default 1).
+        """
+        self.max_concurrency = max_concurrency
+        self.max_bulk_concurrency = max_bulk_concurrency
+        self.tenant_concurrency = {WorkClass.QUERY: tenant_query_concurrency, WorkClass.BULK: tenant_bulk_concurrency}
+        self.tenant_queue_limit = tenant_queue_limit
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.tenant_weights = tenant_weights or {}
+
+        self._running_total = 0
+        self._running_by_class = {work_class: 0 for work_class in WorkClass}
+        self._running: dict[str, dict[WorkClass, int]] = {}
+        self._queues: dict[WorkClass, dict[str, deque[_Waiter]]] = {work_class: {} for work_class in WorkClass}
+        self._virtual_time = {work_class: 0.0 for work_class in WorkClass}
+        self._last_finish: dict[WorkClass, dict[str, float]] = {work_class: {} for work_class in WorkClass}
+        # Exponentially weighted mean service time, for Retry-After estimates
+        self._service_seconds = {work_class: 1.0 for work_class in WorkClass}
+        self.stats: dict[str, TenantStats] = {}
+
+    def _tenant_running(self, tenant: str, work_class: WorkClass) -> int:
+        return self._running.get(tenant, {}).get(work_class, 0)
+
+    def _queue_depth(self, tenant: str, work_class: WorkClass) -> int:
+        return len(self._queues[work_class].get(tenant, ()))
+
+    def _can_run(self, tenant: str, work_class: WorkClass) -> bool:
+        if self._running_total >= self.max_concurrency:
+            return False
+        if work_class == WorkClass.BULK and self._running_by_class[WorkClass.BULK] >= self.max_bulk_concurrency:
+            return False
+        return self._tenant_running(tenant, work_class) < self.tenant_concurrency[work_class]
+
+    def _retry_after(self, tenant: str, work_class: WorkClass) -> int:
+        backlog = self._queue_depth(tenant, work_class) + self._tenant_running(tenant, work_class) + 1
+        seconds = backlog * self._service_seconds[work_class] / max(1, self.tenant_concurrency[work_class])
+        return max(1, math.ceil(seconds))
+
+    def _tenant_stats(self, tenant: str) -> TenantStats:
+        stats = self.stats.get(tenant)
+        if stats is None:
+            stats = self.stats[tenant] = TenantStats()
+        return stats
+
+    def _reject(self, tenant: str, work_class: WorkClass, reason: str) -> AdmissionRejected:
+        self._tenant_stats(tenant).rejected[work_class] += 1
+        return AdmissionRejected(tenant, work_class, self._retry_after(tenant, work_class), reason)
+
+    def _start(self, tenant: str, work_class: WorkClass, enqueued_at: float) -> Ticket:
+        self._running_total += 1
+        self._running_by_class[work_class] += 1
+        running = self._running.setdefault(tenant, {})
+        running[work_class] = running.get(work_class, 0) + 1
+
+        now = time.perf_counter()
+        stats = self._tenant_stats(tenant)
+        stats.admitted[work_class] += 1
+        stats.waits_ms[work_class].append((now - enqueued_at) * 1000.0)
+        return Ticket(tenant=tenant, work_class=work_class, admitted_at=now, wait_ms=(now - enqueued_at) * 1000.0)
+
+    def _start_tag(self, tenant: str, work_class: WorkClass, cost: float) -> float:
+        start = max(self._virtual_time[work_class], self._last_finish[work_class].get(tenant, 0.0))
+        self._last_finish[work_class][tenant] = start + cost / self.tenant_weights.get(tenant, 1.0)
+        return start
+
+    def _dispatch(self):
+        """Hand freed slots to waiters: queries first, then bulk work, each by smallest start tag."""
+        for work_class in WorkClass:
+            queues = self._queues[work_class]
+            while queues:
+                eligible = [
+                    queue[0] for tenant, queue in queues.items()
+                    if self._can_run(tenant, work_class)
+                ]
+                if not eligible:
+                    break
+                waiter = min(eligible, key=lambda candidate: candidate.start_tag)
+                queue = queues[waiter.tenant]
+                queue.popleft()
+                if not queue:
+                    del queues[waiter.tenant]
+                self._virtual_time[work_class] = waiter.start_tag
+                waiter.future.set_result(self._start(waiter.tenant, work_class, waiter.enqueued_at))
+
+    async def acquire(self, tenant: str, work_class: WorkClass, cost: float = 1.0) -> Ticket:
+        """
+        Wait for a slot for one request.
+
+        :param tenant: The tenant key, e.g. the project id.
+        :param work_class: The request's `WorkClass`.
+        :param cost: The request's share of the fair queue, e.g. its expected work.
+        :return: A ticket to pass to `release`.
+        :raises AdmissionRejected: When the tenant's queue is full or the wait timed out.
+        """
+        enqueued_at = time.perf_counter()
+        if not self._queues[work_class] and self._can_run(tenant, work_class):
+            self._virtual_time[work_class] = self._start_tag(tenant, work_class, cost)
+            return self._start(tenant, work_class, enqueued_at)
+
+        if self._queue_depth(tenant, work_class) >= self.tenant_queue_limit:
+            raise self._reject(tenant, work_class, "queue full")
+
+        start_tag = self._start_tag(tenant, work_class, cost)
+        waiter = _Waiter(
+            tenant=tenant,
+            work_class=work_class,
+            start_tag=start_tag,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=enqueued_at
+        )
+        self._queues[work_class].setdefault(tenant, deque()).append(waiter)
+        self._dispatch()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_queue_wait_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the wait ended: give the slot back
+                self.release(waiter.future.result())
+            else:
+                waiter.future.cancel()
+                queue = self._queues[work_class].get(tenant)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[work_class][tenant]
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(tenant, work_class, "queue wait timed out")
+
+    def release(self, ticket: Ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        self._running_total -= 1
+        self._running_by_class[ticket.work_class] -= 1
+        self._running[ticket.tenant][ticket.work_class] -= 1
+
+        elapsed = time.perf_counter() - ticket.admitted_at
+        self._service_seconds[ticket.work_class] += 0.1 * (elapsed - self._service_seconds[ticket.work_class])
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        tenants = {}
+        for tenant, stats in self.stats.items():
+            queued = {work_class: self._queue_depth(tenant, work_class) for work_class in WorkClass}
+            tenants[tenant] = stats.snapshot(queued=queued, running=self._running.get(tenant, {}))
+        return {
+            "running": self._running_total,
+            "running_by_class": {work_class.value: count for work_class, count in self._running_by_class.items()},
+            "queued_by_class": {
+                work_class.value: sum(len(queue) for queue in self._queues[work_class].values())
+                for work_class in WorkClass
+            },
+            "tenants": tenants,
+        }
+
+
+# Heavy routes and their class; the tenant is the last path segment (the project id)
+ADMISSION_ROUTES = [
+    ("/v1/data/upload/", WorkClass.BULK),
+    ("/v1/data/process/", WorkClass.BULK),
+    ("/v1/search/rebuild/", WorkClass.BULK),
+    ("/v1/search/batch/", WorkClass.BULK),
+    ("/v1/search/summaries/", WorkClass.BULK),
+    ("/v1/search/", WorkClass.QUERY),
+    ("/v1/rag/", WorkClass.QUERY),
+    ("/v1/chat/", WorkClass.QUERY),
+]
+
+
+def classify_request(method: str, path: str) -> Optional[tuple[str, WorkClass]]:
+    """
+    Map a request to its (tenant, work class), or None when it is not admission controlled.
+    """
+    if method != "POST":
+        return None
+    for prefix, work_class in ADMISSION_ROUTES:
+        if path.startswith(prefix):
+            tenant = path.rstrip("/").rsplit("/", 1)[-1]
+            return (tenant, work_class) if tenant else None
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying `app.admission_control` to the heavy routes.
+
+    The slot is held until the response body has been sent, so streamed
+    responses (SSE, NDJSON) count for as long as they run. Rejected requests
+    get a 429 with `Retry-After` before their body is read.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        admission_control = getattr(scope.get("app"), "admission_control", None) if scope["type"] == "http" else None
+        route = classify_request(scope["method"], scope["path"]) if admission_control is not None else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        tenant, work_class = route
+        try:
+            ticket = await admission_control.acquire(tenant, work_class)
+        except AdmissionRejected as e:
+            logger.warning(str(e))
+            await self._send_rejection(send, e)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_control.release(ticket)
+
+    @staticmethod
+    async def _send_rejection(send, rejection: AdmissionRejected):
+        body = json.dumps({
+            "signal": ResponseSignal.TOO_MANY_REQUESTS.value,
+            "retry_after": rejection.retry_after,
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(rejection.retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -127,6 +127,30 @@ async def setup_database_indexes(db_client):
             name="idx_chunk_file_order"
         )
 
+        # Shard key index (see `ChunkModel.SHARD_KEY`), also built on a single node so query plans match
+        await create_index_safely(
+            db_client[Collections.CHUNK_COLLECTION.value],
+            [("project_id", "hashed"), ("file_id", 1)],
+            background=True,
+            name="idx_chunk_shard_key"
+        )
+
+        # Snapshot catch-up: a project's chunks written since a server-time watermark
+        await create_index_safely(
+            db_client[Collections.CHUNK_COLLECTION.value],
+            [("project_id", 1), ("updated_at", 1)],
+            background=True,
+            name="idx_chunk_project_updated"
+        )
+
+        # Neighbour windows: project-scoped so they stay targeted once sharded
+        await create_index_safely(
+            db_client[Collections.CHUNK_COLLECTION.value],
+            [("project_id", 1), ("file_id", 1), ("chunk_order", 1)],
+            background=True,
+            name="idx_chunk_project_file_order"
+        )
+
         # Files collection
         await create_index_safely(
             db_client[Collections.FILE_COLLECTION.value],
@@ -143,6 +167,46 @@ async def setup_database_indexes(db_client):
             name="idx_file_project_name"
         )
 
+        await create_index_safely(
+            db_client[Collections.FILE_COLLECTION.value],
+            [("project_id", "hashed")],
+            background=True,
+            name="idx_file_shard_key"
+        )
+
+        # Generation cache collection: entries are dropped by MongoDB once expired
+        await create_index_safely(
+            db_client[Collections.GENERATION_CACHE_COLLECTION.value],
+            [("expires_at", 1)],
+            expireAfterSeconds=0,
+            background=True,
+            name="idx_generation_cache_expiry"
+        )
+
+        await create_index_safely(
+            db_client[Collections.GENERATION_CACHE_COLLECTION.value],
+            [("project_id", 1)],
+            background=True,
+            name="idx_generation_cache_project_id"
+        )
+
+        # Retrieval cache collection: keys embed the index version, so entries only need to expire
+        await create_index_safely(
+            db_client[Collections.RETRIEVAL_CACHE_COLLECTION.value],
+            [("expires_at", 1)],
+            expireAfterSeconds=0,
+            background=True,
+            name="idx_retrieval_cache_expiry"
+        )
+
+        # Conversations collection: documents are read by `_id`, listed per project
+        await create_index_safely(
+            db_client[Collections.CONVERSATION_COLLECTION.value],
+            [("project_id", 1), ("updated_at", -1)],
+            background=True,
+            name="idx_conversation_project_updated"
+        )
+
         logger.info("All database indexes have been set up successfully")
 
         # For verification, list indexes again after setup
@@ -0,0 +1,73 @@
+"""
+Fail when app startup imports regress.
+
+Imports the app in a fresh interpreter with `-X importtime` and exits with
+status 1 when the cumulative import time of the module is over budget, or
+when a provider SDK is imported at startup (drivers must load lazily, see
+`llm.llm_drivers`). The app settings (.env or environment) must be available.
+
+Usage:
+    python -m utils.import_time_check [--module main] [--budget-ms 2500] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+PROVIDER_SDKS = ("openai", "anthropic", "cohere", "mistralai", "google.generativeai")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure_imports(module: str) -> dict[str, int]:
+    """
+    Import a module in a fresh interpreter.
+
+    :param module: The module to import.
+    :return: Cumulative import time in microseconds of every module imported on the way.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the app's import time against a budget.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=2500.0)
+    parser.add_argument("--runs", type=int, default=3, help="The fastest run is compared, to damp noise")
+    args = parser.parse_args()
+
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    import_ms = min(run[args.module] for run in runs) / 1000.0
+    eager_sdks = sorted(sdk for sdk in PROVIDER_SDKS if sdk in runs[0])
+
+    print(f"import {args.module}: {import_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if import_ms > args.budget_ms:
+        slowest = sorted(runs[0].items(), key=lambda item: item[1], reverse=True)[1:11]
+        print("Over budget. Slowest imports:")
+        for name, microseconds in slowest:
+            print(f"  {microseconds / 1000.0:8.1f} ms  {name}")
+        failed = True
+    if eager_sdks:
+        print(f"Provider SDKs imported at startup: {', '.join(eager_sdks)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
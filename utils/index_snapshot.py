@@ -0,0 +1,68 @@
+"""
+Export or import a project's index snapshot.
+
+Usage:
+    python -m utils.index_snapshot export <project_id> <snapshot_dir>
+    python -m utils.index_snapshot import <project_id> <snapshot_dir>
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from controllers import SnapshotController
+from helpers.config import get_settings
+from models.chunk_model import ChunkModel
+
+logger = logging.getLogger(__name__)
+
+
+async def import_snapshots(db_client, snapshot_root: str) -> dict:
+    """
+    Import every project snapshot found under `snapshot_root` (one sub-directory per project id).
+
+    Meant for node bootstrap: call it from the app lifespan before serving.
+    """
+    chunk_model = ChunkModel(db_client=db_client)
+    results = {}
+    for project_id in sorted(os.listdir(snapshot_root)):
+        snapshot_dir = os.path.join(snapshot_root, project_id)
+        if not os.path.exists(os.path.join(snapshot_dir, SnapshotController.MANIFEST_FILE)):
+            continue
+        try:
+            results[project_id] = await SnapshotController(project_id=project_id).import_snapshot(
+                chunk_model=chunk_model,
+                snapshot_dir=snapshot_dir
+            )
+        except Exception as e:
+            logger.error(f"Failed to import snapshot for project {project_id}: {e}")
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Export or import a project's index snapshot.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("project_id")
+    parser.add_argument("snapshot_dir")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    mongo_conn = AsyncIOMotorClient(settings.DB_URL)
+    chunk_model = ChunkModel(db_client=mongo_conn[settings.DB_NAME])
+    snapshot_controller = SnapshotController(project_id=args.project_id)
+
+    try:
+        if args.command == "export":
+            result = await snapshot_controller.export_snapshot(chunk_model=chunk_model, snapshot_dir=args.snapshot_dir)
+        else:
+            result = await snapshot_controller.import_snapshot(chunk_model=chunk_model, snapshot_dir=args.snapshot_dir)
+        print(result)
+    finally:
+        mongo_conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
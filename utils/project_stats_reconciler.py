@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+from models.project_model import ProjectModel
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_project_stats(db_client, pending: dict = None) -> dict[str, dict]:
+    """
+    Run one reconciliation pass over every project's materialised stats.
+
+    Each project costs one indexed chunk count and one file aggregation, so a
+    pass is spread over time by the caller rather than run per request.
+
+    :param pending: Drift measured on the previous pass, see `ProjectModel.reconcile_stats`.
+        Without it nothing is ever corrected, since drift must be seen on two passes.
+    :return: The corrections applied per project, for projects that had drifted.
+    """
+    pending = pending if pending is not None else {}
+    project_model = ProjectModel(db_client=db_client)
+    corrections = {}
+    async for project_id in project_model.iter_project_ids():
+        drift = await project_model.reconcile_stats(project_id, pending)
+        if drift:
+            logger.warning(f"Corrected drift in stats of project {project_id}: {drift}")
+            corrections[project_id] = drift
+    return corrections
+
+
+async def run_project_stats_reconciler(db_client, interval_seconds: float):
+    """
+    Reconcile project stats every `interval_seconds` until cancelled.
+    """
+    pending = {}
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            corrections = await reconcile_project_stats(db_client, pending)
+            logger.info(f"Project stats reconciled, {len(corrections)} projects corrected")
+        except Exception as e:
+            # Counters keep being maintained incrementally; the next pass retries
+            logger.error(f"Project stats reconciliation failed: {e}")
@@ -0,0 +1,235 @@
+"""
+Check that the hot chunk and file queries stay targeted under sharding.
+
+Runs `explain()` for every query shape `ChunkModel` and `FileModel` send and
+reports, per shape, how a mongos routes it with the shard keys
+(`ChunkModel.SHARD_KEY`, `FileModel.SHARD_KEY`), which shards and indexes the
+plan uses, and whether it scans the whole collection. Against a mongos the
+routing comes from the plan itself; against a single node (the local
+stand-in) it is derived from the filter, and the plan still shows whether the
+shape is served by an index. Exits with status 1 when a shape would be
+broadcast to every shard or needs a collection scan. The app settings (.env
+or environment) must be available.
+
+Usage:
+    python -m utils.shard_targeting --project-id 1 [--shard]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from helpers.config import get_settings
+from models.chunk_model import ChunkModel
+from models.enums.db_collections import Collections
+from models.file_model import FileModel
+from retrieval.chunk_windows import ChunkWindow
+
+logger = logging.getLogger(__name__)
+
+SINGLE_SHARD = "single_shard"
+TARGETED = "targeted"
+BROADCAST = "broadcast"
+
+
+def _is_equality(value) -> bool:
+    if not isinstance(value, dict):
+        return True
+    return set(value) == {"$eq"} or set(value) == {"$in"}
+
+
+def shard_key_routing(query_filter: dict, shard_key: list[tuple]) -> str:
+    """
+    Tell how a mongos routes a filter with a (hashed prefix) shard key.
+
+    A hashed field only routes on equality (or `$in`), so the filter must pin
+    the first shard key field in every `$or` branch to avoid a broadcast; it
+    reaches a single shard when one branch pins every shard key field to one value.
+
+    :param query_filter: A MongoDB filter.
+    :param shard_key: The shard key as (field, kind) pairs, e.g. `ChunkModel.SHARD_KEY`.
+    :return: One of `SINGLE_SHARD`, `TARGETED` or `BROADCAST`.
+    """
+    base = {field: value for field, value in query_filter.items() if field != "$or"}
+    branches = [{**base, **branch} for branch in query_filter.get("$or", [])] or [base]
+    fields = [field for field, _ in shard_key]
+
+    pinned = []
+    for branch in branches:
+        if not (fields[0] in branch and _is_equality(branch[fields[0]])):
+            return BROADCAST
+        pinned.append(all(
+            field in branch and _is_equality(branch[field])
+            and not (isinstance(branch[field], dict) and len(branch[field].get("$in", [None])) != 1)
+            for field in fields
+        ))
+    return SINGLE_SHARD if len(branches) == 1 and all(pinned) else TARGETED
+
+
+def _plan_stages(plan: dict, stages: list, indexes: list):
+    stages.append(plan.get("stage"))
+    if plan.get("stage") == "IXSCAN":
+        indexes.append(plan.get("indexName"))
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            _plan_stages(plan[key], stages, indexes)
+    for child in plan.get("inputStages", []):
+        _plan_stages(child, stages, indexes)
+
+
+def summarize_plan(explain: dict) -> dict:
+    """
+    Reduce a `queryPlanner` explain output, from a mongos or a single node, to its routing and access path.
+    """
+    winning_plan = explain["queryPlanner"]["winningPlan"]
+    stages, indexes = [], []
+    if "shards" in winning_plan:
+        shards = [shard["shardName"] for shard in winning_plan["shards"]]
+        for shard in winning_plan["shards"]:
+            _plan_stages(shard["winningPlan"], stages, indexes)
+    else:
+        shards = None
+        _plan_stages(winning_plan, stages, indexes)
+    return {
+        "stage": winning_plan.get("stage"),
+        "shards": shards,
+        "indexes": sorted(set(indexes)),
+        "collscan": "COLLSCAN" in stages,
+    }
+
+
+async def explain_query(collection, query_filter: dict, sort: list[tuple] = None) -> dict:
+    command = {"find": collection.name, "filter": query_filter}
+    if sort:
+        command["sort"] = dict(sort)
+    return await collection.database.command("explain", command, verbosity="queryPlanner")
+
+
+async def check_query(collection, name: str, query_filter: dict, shard_key: list[tuple], sort: list[tuple] = None,
+                      shard_count: int = None) -> dict:
+    """
+    Explain one query shape and judge its targeting.
+
+    :param collection: The Motor collection the query runs against.
+    :param name: A label for the report.
+    :param query_filter: The filter as the model sends it.
+    :param shard_key: The collection's shard key.
+    :param sort: The sort as the model sends it.
+    :param shard_count: The cluster's shard count, or None on a single node.
+    :return: The routing, shards, indexes and whether the shape passes.
+    """
+    plan = summarize_plan(await explain_query(collection, query_filter, sort=sort))
+    routing = shard_key_routing(query_filter, shard_key)
+    if plan["shards"] is not None:
+        # On a mongos the plan says where the query actually went
+        if len(plan["shards"]) == 1:
+            routing = SINGLE_SHARD
+        elif len(plan["shards"]) < shard_count or routing != BROADCAST:
+            # A large project may legitimately span every shard
+            routing = TARGETED
+        else:
+            routing = BROADCAST
+    return {
+        "query": name,
+        "routing": routing,
+        "shards": plan["shards"],
+        "indexes": plan["indexes"],
+        "collscan": plan["collscan"],
+        "ok": routing != BROADCAST and not plan["collscan"],
+    }
+
+
+async def is_mongos(db_client) -> bool:
+    hello = await db_client.client.admin.command("hello")
+    return hello.get("msg") == "isdbgrid"
+
+
+async def shard_collections(db_client) -> bool:
+    """
+    Shard the chunks and files collections on their shard keys when connected to a mongos.
+
+    :return: False on a single node, where there is nothing to shard.
+    """
+    if not await is_mongos(db_client):
+        logger.info("Not connected to a mongos, collections are left unsharded")
+        return False
+    admin = db_client.client.admin
+    await admin.command("enableSharding", db_client.name)
+    for collection, shard_key in (
+            (Collections.CHUNK_COLLECTION.value, ChunkModel.SHARD_KEY),
+            (Collections.FILE_COLLECTION.value, FileModel.SHARD_KEY),
+    ):
+        await admin.command("shardCollection", f"{db_client.name}.{collection}", key=dict(shard_key))
+        logger.info(f"Sharded {collection} on {shard_key}")
+    return True
+
+
+async def verify_query_targeting(db_client, project_id: str) -> list[dict]:
+    """
+    Explain every hot chunk and file query shape for one project.
+
+    The file and chunk ids come from a stored chunk of the project, so the
+    project must have at least one processed file.
+    """
+    chunks = db_client[Collections.CHUNK_COLLECTION.value]
+    files = db_client[Collections.FILE_COLLECTION.value]
+    sample = await chunks.find_one({"project_id": project_id}, projection={"file_id": 1, "chunk_order": 1})
+    if sample is None:
+        raise ValueError(f"Project {project_id} has no chunks to sample query shapes from")
+    chunk_id, file_id = sample["_id"], sample["file_id"]
+    window = ChunkWindow(file_id=file_id, first_order=max(1, sample["chunk_order"] - 2),
+                         last_order=sample["chunk_order"] + 2, rank=0)
+
+    shard_count = None
+    if await is_mongos(db_client):
+        shard_count = len((await db_client.client.admin.command("listShards"))["shards"])
+
+    shapes = [
+        (chunks, "chunk by id", ChunkModel.chunk_filter(project_id, chunk_id), ChunkModel.SHARD_KEY, None),
+        (chunks, "chunks by ids", ChunkModel.chunks_filter(project_id, [chunk_id]), ChunkModel.SHARD_KEY, None),
+        (chunks, "file chunks", ChunkModel.file_filter(project_id, file_id), ChunkModel.SHARD_KEY,
+         [("chunk_order", 1)]),
+        (chunks, "chunk windows", ChunkModel.windows_filter(project_id, [window]), ChunkModel.SHARD_KEY,
+         [("file_id", 1), ("chunk_order", 1)]),
+        (chunks, "project chunks", {"project_id": project_id}, ChunkModel.SHARD_KEY, [("_id", 1)]),
+        (chunks, "project vectors", {"project_id": project_id, "chunk_embedding": {"$exists": True}},
+         ChunkModel.SHARD_KEY, None),
+        (files, "project files", {"project_id": project_id}, FileModel.SHARD_KEY, None),
+    ]
+    return [
+        await check_query(collection, name, query_filter, shard_key, sort=sort, shard_count=shard_count)
+        for collection, name, query_filter, shard_key, sort in shapes
+    ]
+
+
+async def run(project_id: str, shard: bool) -> int:
+    settings = get_settings()
+    mongo_conn = AsyncIOMotorClient(settings.DB_URL)
+    try:
+        db_client = mongo_conn[settings.DB_NAME]
+        if shard:
+            await shard_collections(db_client)
+        reports = await verify_query_targeting(db_client, project_id)
+    finally:
+        mongo_conn.close()
+
+    for report in reports:
+        status = "ok  " if report["ok"] else "FAIL"
+        shards = f" shards={','.join(report['shards'])}" if report["shards"] is not None else ""
+        print(f"{status} {report['query']:<16} {report['routing']:<12} "
+              f"indexes={','.join(report['indexes']) or '-'}{' COLLSCAN' if report['collscan'] else ''}{shards}")
+    return 0 if all(report["ok"] for report in reports) else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify shard targeting of the chunk and file queries.")
+    parser.add_argument("--project-id", required=True, help="A project with processed files to sample ids from")
+    parser.add_argument("--shard", action="store_true", help="Shard the collections first (mongos only)")
+    args = parser.parse_args()
+    return asyncio.run(run(args.project_id, args.shard))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import json
+
+
+def format_sse(data: dict, event: str = None) -> str:
+    """
+    Encode one Server-Sent Events message.
+
+    :param data: JSON-serialisable payload, sent on a single `data:` line.
+    :param event: Optional event name.
+    :return: The message, terminated by a blank line.
+    """
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop reverse proxies (nginx) from buffering the stream and delaying the first token
+    "X-Accel-Buffering": "no",
+}
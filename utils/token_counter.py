@@ -0,0 +1,8 @@
+def count_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text, at about four characters per token.
+
+    Cheap enough to run on every chunk at ingest; used for context-window
+    budgets and rate-limit reservations, where a close estimate is enough.
+    """
+    return len(text) // 4 + 1
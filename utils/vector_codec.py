@@ -0,0 +1,46 @@
+import numpy as np
+from bson.binary import Binary
+
+# BSON binary subtype 9 ("vector"): a dtype byte, a padding byte, then the packed values.
+VECTOR_SUBTYPE = 9
+VECTOR_HEADER_SIZE = 2
+
+VECTOR_DTYPES = {
+    "float32": (0x27, np.float32),
+    "int8": (0x03, np.int8),
+}
+VECTOR_DTYPE_BY_CODE = {code: dtype for code, dtype in VECTOR_DTYPES.values()}
+
+
+def pack_vector(vector, dtype: str = "float32") -> Binary:
+    """
+    Pack an embedding into a BSON Binary vector.
+
+    int8 vectors are scaled so the largest component maps to 127. The scale is
+    not stored: vectors are only compared by cosine similarity, which ignores it.
+
+    :param vector: The embedding, as a list or NumPy array.
+    :param dtype: "float32" or "int8".
+    :return: A `Binary` with subtype 9.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}. Supported: {list(VECTOR_DTYPES)}")
+    code, np_dtype = VECTOR_DTYPES[dtype]
+
+    values = np.asarray(vector, dtype=np.float32).reshape(-1)
+    if np_dtype == np.int8:
+        peak = float(np.abs(values).max()) if len(values) else 0.0
+        values = np.round(values * (127.0 / peak)) if peak else values
+    packed = values.astype(np_dtype).tobytes()
+
+    return Binary(bytes([code, 0]) + packed, subtype=VECTOR_SUBTYPE)
+
+
+def unpack_vector(data: bytes) -> np.ndarray:
+    """
+    Return a read-only NumPy view over a BSON Binary vector, without copying.
+    """
+    np_dtype = VECTOR_DTYPE_BY_CODE.get(data[0])
+    if np_dtype is None:
+        raise ValueError(f"Unsupported vector dtype code: {data[0]:#x}")
+    return np.frombuffer(data, dtype=np_dtype, offset=VECTOR_HEADER_SIZE)